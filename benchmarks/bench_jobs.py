@@ -0,0 +1,36 @@
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_parser import make_ddl
+from sql_convert.batch import generate_tables
+from sql_convert.generator import TARGETS
+from sql_convert.parser import parse_ddl
+
+# Parallel generation benchmark, 300 tables for all targets with growing number of jobs.
+#   py benchmarks/bench_jobs.py
+
+
+def main():
+    tables = parse_ddl(make_ddl(300, 40))
+    cwd = os.getcwd()
+    print(f'{"jobs":>5} {"seconds":>8} {"speedup":>8}')
+    base = None
+    for jobs in [1, 2, 4, 8]:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                start = time.perf_counter()
+                generate_tables(tables, TARGETS, jobs)
+                elapsed = time.perf_counter() - start
+            finally:
+                os.chdir(cwd)
+        base = base or elapsed
+        print(f'{jobs:5d} {elapsed:8.2f} {base / elapsed:8.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+import os
+import re
+import sys
+import json
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sql_convert.generator import render
+from sql_convert.options import GeneratorOptions, set_options
+from sql_convert.parser import parse_ddl
+
+# Generated _save, _get and _search with large rows against local PostgreSQL: functions with JSON text parameter
+# and result (default) compared with --jsonb functions. Client is the same as NestJS service: text parameter is
+# JSON.stringify-ed before the call and text result parsed after it, jsonb parameter and result are converted by
+# driver (psycopg2 like pg). CPU of server process is read from /proc, so it is shown only for server on the same
+# host. Needs psycopg2 and database where schemas bench_text and bench_jsonb can be created.
+#   BENCH_DSN="dbname=postgres user=postgres" py benchmarks/bench_jsonb_sql.py [row KB] [calls]
+
+DDL = """CREATE TABLE {schema}.account (
+    id serial NOT NULL,
+    login varchar(50) NOT NULL,
+    notes text,
+    active boolean DEFAULT true
+);"""
+
+ROWS = 1000
+
+FUNCTIONS = ['save', 'get', 'search']
+
+SEARCH = {
+    'filter': [],
+    'sort': ['login'],
+    'sort_direction': 'asc',
+    'page_size': 25,
+    'page_index': 0,
+}
+
+
+# Function source without OWNER and GRANT statements, users from constants.py may not exist
+def function_source(sql: str) -> str:
+    return re.split(r'\n(?:COMMENT ON|ALTER) FUNCTION', sql)[0]
+
+
+# Generated functions of table in schema, with options
+def functions(schema: str, options: GeneratorOptions) -> dict:
+    set_options(options)
+    try:
+        files = render(parse_ddl(DDL.format(schema=schema))[0], 'sql')
+    finally:
+        set_options(GeneratorOptions())
+    return dict((name, function_source(files[f'sql/fnc_{schema}.account_{name}.sql'])) for name in FUNCTIONS)
+
+
+# User and system CPU seconds of server process, None for remote server
+def server_cpu(pid: int):
+    try:
+        with open(f'/proc/{pid}/stat') as file:
+            fields = file.read().rsplit(')', 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def main():
+    try:
+        import psycopg2
+        from psycopg2.extras import Json
+    except ImportError:
+        print('psycopg2 is needed: pip install psycopg2-binary')
+        sys.exit(-1)
+    size = int(sys.argv[1]) * 1024 if len(sys.argv) > 1 else 32 * 1024
+    calls = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    connection = psycopg2.connect(os.environ.get('BENCH_DSN', 'dbname=postgres'))
+    connection.autocommit = True
+    cursor = connection.cursor()
+    sources = dict(bench_text=functions('bench_text', GeneratorOptions()),
+                   bench_jsonb=functions('bench_jsonb', GeneratorOptions(jsonb=True)))
+    for schema, source in sources.items():
+        cursor.execute(f'DROP SCHEMA IF EXISTS {schema} CASCADE; CREATE SCHEMA {schema};')
+        cursor.execute(DDL.format(schema=schema))
+        # Random text is not compressed by TOAST, row is read and written in full size
+        cursor.execute(f"""ALTER TABLE {schema}.account ADD PRIMARY KEY (id);
+                           INSERT INTO {schema}.account (login, notes, active)
+                           SELECT 'user' || i, (SELECT string_agg(md5(random()::text || i || j), '')
+                                                  FROM generate_series(1, {size // 32}) j), i % 2 = 0
+                             FROM generate_series(1, {ROWS}) i;
+                           ANALYZE {schema}.account;""")
+        for sql in source.values():
+            cursor.execute(sql)
+    cursor.execute('SELECT pg_backend_pid()')
+    pid = cursor.fetchone()[0]
+
+    notes = ''.join(random.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(size))
+    # Existing rows are updated, save does not insert
+    arguments = {
+        'save': lambda: dict(id=random.randint(1, ROWS), login='user', notes=notes, active=True),
+        'get': lambda: random.randint(1, ROWS),
+        'search': lambda: dict(SEARCH, page_index=random.randint(0, ROWS // 25 - 1)),
+    }
+    print(f'{"function":<28} {"ms/call":>10} {"client CPU ms":>14} {"server CPU ms":>14}')
+    try:
+        for name in FUNCTIONS:
+            for schema in sources:
+                jsonb = schema == 'bench_jsonb'
+                sql = f'SELECT {schema}.account_{name}(%s)'
+                values = [arguments[name]() for _ in range(calls)]
+                # JSON text like JSON.stringify of NestJS service, jsonb parameter gets object
+                parameters = [(Json(value) if jsonb else json.dumps(value)) if isinstance(value, dict) else value
+                              for value in values]
+                cursor.execute(sql, [parameters[0]])
+                server_start = server_cpu(pid)
+                client_start = time.process_time()
+                start = time.perf_counter()
+                for parameter in parameters:
+                    cursor.execute(sql, [parameter])
+                    result = cursor.fetchone()[0]
+                    if not jsonb:
+                        result = json.loads(result)
+                    if 'error' in result:
+                        raise RuntimeError(f'{schema}.account_{name}: {result["error"]}')
+                elapsed = time.perf_counter() - start
+                client = time.process_time() - client_start
+                server_end = server_cpu(pid)
+                server = f'{(server_end - server_start) / calls * 1000:14.3f}' if server_start is not None \
+                    else f'{"-":>14}'
+                label = f'{schema}.account_{name}'
+                print(f'{label:<28} {elapsed / calls * 1000:10.3f} {client / calls * 1000:14.3f} {server}')
+    finally:
+        for schema in sources:
+            cursor.execute(f'DROP SCHEMA {schema} CASCADE')
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sql_convert.common import get_description
+from sql_convert.parser import parse_ddl
+
+# Parser benchmark: time per line should stay flat while the DDL grows,
+# legacy get_description() per column grows with columns x lines.
+#   py benchmarks/bench_parser.py
+
+
+def make_ddl(tables: int, columns: int) -> str:
+    lines = []
+    for t in range(tables):
+        lines.append(f'CREATE TABLE audit.tbl_{t}')
+        lines.append('(')
+        lines.append(f"  id integer NOT NULL DEFAULT NEXTVAL('tbl_{t}_serial'::regclass),")
+        for c in range(columns):
+            lines.append(f'  col_{c} varchar NOT NULL,')
+        lines.append('  notes varchar')
+        lines.append(');')
+        for c in range(columns):
+            lines.append(f"COMMENT ON COLUMN audit.tbl_{t}.col_{c} IS 'Column {c} of table {t}';")
+    return '\n'.join(lines)
+
+
+def measure(fnc, *args) -> float:
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        fnc(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def legacy(sql_file_content: str):
+    for table in parse_ddl(sql_file_content):
+        for item in table.field_array:
+            get_description(table.tbl_name, item['field'], sql_file_content)
+
+
+def main():
+    print(f'{"tables":>7} {"lines":>8} {"parse ms":>10} {"us/line":>8} {"legacy ms":>10}')
+    for tables in [1, 2, 4, 8, 16, 32]:
+        ddl = make_ddl(tables, 400)
+        lines = ddl.count('\n') + 1
+        parse_time = measure(parse_ddl, ddl)
+        legacy_time = f'{measure(legacy, ddl) * 1000:10.1f}' if tables <= 4 else f'{"-":>10}'
+        print(f'{tables:7d} {lines:8d} {parse_time * 1000:10.2f} {parse_time / lines * 1e6:8.2f} {legacy_time}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+import os
+import re
+import sys
+import subprocess
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sql_convert.generator import render
+from sql_convert.parser import parse_ddl
+
+# Generated _get and _delete against local PostgreSQL with pgbench: one statement compared with the previous
+# version, which checked existence of row by PERFORM first. Needs psycopg2, pgbench in PATH and database where
+# schema bench_probe can be created.
+#   BENCH_DSN="dbname=postgres user=postgres" py benchmarks/bench_probe_sql.py [seconds]
+
+DDL = """CREATE TABLE bench_probe.account (
+    id serial NOT NULL,
+    login varchar(50) NOT NULL,
+    notes varchar(200),
+    active boolean DEFAULT true
+);"""
+
+PROBE = """BEGIN
+  PERFORM 1 FROM bench_probe.account WHERE id = a_id;
+  IF NOT FOUND THEN
+    RETURN jsonb_build_object('error', 'Account do not exists', 'code', 404);
+  END IF;
+"""
+
+ROWS = 100000
+
+# Ids up to 10% over ROWS, part of calls returns 404. Delete is rolled back, table stays the same
+SCRIPTS = {
+    'get': """\\set id random(1, {ids})
+SELECT bench_probe.{fnc}(:id);
+""",
+    'delete': """\\set id random(1, {ids})
+BEGIN;
+SELECT bench_probe.{fnc}(:id);
+ROLLBACK;
+""",
+}
+
+
+# Function source without OWNER and GRANT statements, users from constants.py may not exist
+def function_source(sql: str) -> str:
+    return sql[:sql.index('COMMENT ON FUNCTION')]
+
+
+# Previous version of function: existence probe before the statement, always VOLATILE
+def legacy_source(sql: str, name: str) -> str:
+    sql = re.sub(rf'account_{name}\s*\(', f'account_{name}_legacy(', sql).replace('STABLE', 'VOLATILE')
+    body = sql.index('BEGIN\n')
+    return sql[:body] + PROBE + sql[body + len('BEGIN\n'):]
+
+
+def pgbench(dsn: str, script: str, seconds: int) -> float:
+    with tempfile.NamedTemporaryFile('w', suffix='.pgbench', delete=False) as file:
+        file.write(script)
+    try:
+        output = subprocess.run(['pgbench', '-n', '-f', file.name, '-T', str(seconds), dsn],
+                                check=True, capture_output=True, text=True).stdout
+    finally:
+        os.remove(file.name)
+    return float(re.search(r'^tps = ([\d.]+)', output, re.MULTILINE).group(1))
+
+
+def main():
+    try:
+        import psycopg2
+    except ImportError:
+        print('psycopg2 is needed: pip install psycopg2-binary')
+        sys.exit(-1)
+    seconds = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    dsn = os.environ.get('BENCH_DSN', 'dbname=postgres')
+
+    table = parse_ddl(DDL)[0]
+    files = render(table, 'sql')
+    connection = psycopg2.connect(dsn)
+    connection.autocommit = True
+    cursor = connection.cursor()
+    cursor.execute('DROP SCHEMA IF EXISTS bench_probe CASCADE; CREATE SCHEMA bench_probe;')
+    cursor.execute(DDL)
+    cursor.execute(f"""ALTER TABLE bench_probe.account ADD PRIMARY KEY (id);
+                       INSERT INTO bench_probe.account (login, notes, active)
+                       SELECT 'user' || i, 'note ' || i, i % 2 = 0 FROM generate_series(1, {ROWS}) i;
+                       ANALYZE bench_probe.account;""")
+    for name in SCRIPTS:
+        source = function_source(files[f'sql/fnc_bench_probe.account_{name}.sql'])
+        cursor.execute(source)
+        cursor.execute(legacy_source(source, name))
+
+    print(f'{"function":<24} {"tps":>10}')
+    try:
+        for name, script in SCRIPTS.items():
+            for fnc in [f'account_{name}_legacy', f'account_{name}']:
+                tps = pgbench(dsn, script.format(ids=ROWS * 11 // 10, fnc=fnc), seconds)
+                print(f'{fnc:<24} {tps:10.1f}')
+    finally:
+        cursor.execute('DROP SCHEMA bench_probe CASCADE')
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_parser import make_ddl
+from sql_convert.generator import TARGETS, render
+from sql_convert.parser import parse_ddl
+
+# Rendering benchmark for wide tables, time per column should stay flat.
+#   py benchmarks/bench_render.py
+
+
+def main():
+    print(f'{"columns":>8} {"render ms":>10} {"us/column":>10}')
+    for columns in [100, 200, 400, 800, 1600, 3200]:
+        table = parse_ddl(make_ddl(1, columns))[0]
+        best = None
+        for _ in range(3):
+            start = time.perf_counter()
+            for target in TARGETS:
+                render(table, target)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print(f'{columns:8d} {best * 1000:10.2f} {best / columns * 1e6:10.2f}')
+
+
+if __name__ == '__main__':
+    main()
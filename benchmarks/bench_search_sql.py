@@ -0,0 +1,87 @@
+import os
+import sys
+import json
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sql_convert.generator import render
+from sql_convert.parser import parse_ddl
+
+# Generated _search against local PostgreSQL: filter field type from CASE compared with the previous
+# information_schema.columns lookup. Needs psycopg2 and database where schema bench_search can be created.
+#   BENCH_DSN="dbname=postgres user=postgres" py benchmarks/bench_search_sql.py [calls]
+
+DDL = """CREATE TABLE bench_search.account (
+    id serial NOT NULL,
+    login varchar(50) NOT NULL,
+    notes varchar(200),
+    active boolean DEFAULT true
+);"""
+
+LOOKUP = """(SELECT data_type
+      FROM information_schema.columns
+     WHERE table_name = 'account'
+       AND table_schema = 'bench_search'
+       AND column_name = CAST(f_filter->>'field' as varchar))"""
+
+ROWS = 100000
+
+FILTER = {
+    'filter': [{'field': 'login', 'value': 'USER1%'}, {'field': 'notes', 'value': '%'}],
+    'sort': ['login'],
+    'sort_direction': 'asc',
+    'page_size': 25,
+    'page_index': 0,
+}
+
+
+# Function source without OWNER and GRANT statements, users from constants.py may not exist
+def function_source(sql: str) -> str:
+    return sql[:sql.index('COMMENT ON FUNCTION')]
+
+
+def main():
+    try:
+        import psycopg2
+    except ImportError:
+        print('psycopg2 is needed: pip install psycopg2-binary')
+        sys.exit(-1)
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+    table = parse_ddl(DDL)[0]
+    search = function_source(render(table, 'sql')['sql/fnc_bench_search.account_search.sql'])
+    case = search[search.index('f_filter_field_type = CASE') + len('f_filter_field_type = '):]
+    case = case[:case.index('END;') + len('END')]
+    legacy = search.replace(case, LOOKUP).replace('account_search(', 'account_search_legacy(')
+
+    connection = psycopg2.connect(os.environ.get('BENCH_DSN', 'dbname=postgres'))
+    connection.autocommit = True
+    cursor = connection.cursor()
+    cursor.execute('DROP SCHEMA IF EXISTS bench_search CASCADE; CREATE SCHEMA bench_search;')
+    cursor.execute(DDL)
+    cursor.execute(f"""INSERT INTO bench_search.account (login, notes, active)
+                       SELECT 'user' || i, 'note ' || i, i % 2 = 0 FROM generate_series(1, {ROWS}) i;
+                       CREATE INDEX ON bench_search.account (login);
+                       ANALYZE bench_search.account;""")
+    cursor.execute(search)
+    cursor.execute(legacy)
+
+    filter_json = json.dumps(FILTER)
+    print(f'{"function":<24} {"ms/call":>10}')
+    try:
+        for name in ['account_search_legacy', 'account_search']:
+            cursor.execute(f'SELECT bench_search.{name}(%s)', [filter_json])
+            start = time.perf_counter()
+            for _ in range(calls):
+                cursor.execute(f'SELECT bench_search.{name}(%s)', [filter_json])
+                cursor.fetchone()
+            elapsed = time.perf_counter() - start
+            print(f'{name:<24} {elapsed / calls * 1000:10.3f}')
+    finally:
+        cursor.execute('DROP SCHEMA bench_search CASCADE')
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,97 +1,185 @@
 import sys
 import os
-import re
-import shutil
 import argparse
-from sql_convert.common import get_description
-from sql_convert.rest.nestjs import generate_nestjs_api
-from sql_convert.sql.pgsql import generate_pgsql
-from sql_convert.web.ng import generate_angular_module
-
-parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
-parser.add_argument("-b", "--rest", action="store_true", help="Destination backend rest api")
-parser.add_argument("-f", "--web", action="store_true", help="Destination frontend framework")
-parser.add_argument("-s", "--sql", action="store_true", help="Destination SQL language")
-parser.add_argument("<path_to_sql>", help="Path to SQL generation table")
-args = parser.parse_args()
-config = vars(args)
-
-# Remove dist directory if exists
-if os.path.exists('dist'):
-    shutil.rmtree('dist', ignore_errors=True)
-
-# Check if sql table file defined in command line arguments
-sql_file_path = config['<path_to_sql>']
-
-if not config['<path_to_sql>']:
-    print('Add SQL file with table definition')
-    sys.exit(-1)
-
-# Check if the input file exists
-if not os.path.exists(sql_file_path):
-    print('File not exist')
-    sys.exit(-1)
-
-# Check if the input file is a SQL file
-if not sql_file_path.upper().endswith('.SQL'):
-    print('File is not SQL file')
-    sys.exit(-1)
-
-# Read the input SQL file
-with open(sql_file_path, 'r') as f:
-    sql_file = f.read()
-
-# Analyze and process SQL table definition
-tbl_name = ''
-schema_name = ''
-sequence_name = ''
-
-field_array = list()
-for line in sql_file.split('\n'):
-    elems = re.split(r'\s+', line.strip())
-    if elems[0].upper() == 'COMMENT':
-        continue
-    elif elems[0].upper() == 'CREATE':
-        if not elems[2].split('.')[1]:
-            schema_name = 'public'
-            tbl_name = elems[2].split('.')[0]
-        else:
-            schema_name = elems[2].split('.')[0]
-            tbl_name = elems[2].split('.')[1]
-        continue
-    elif elems[0] in ['(', ')', '', ');']:
-        continue
+from sql_convert.batch import check_output, load_tables, generate_tables
+from sql_convert.generator import TARGETS, TARGET_NAMES
+from sql_convert.options import CACHE_MODES, COUNT_STRATEGIES, PAGINATION_MODES, SEARCH_MODES, GeneratorOptions, set_options
+from sql_convert.output import ArchiveSink, FileSystemSink
+from sql_convert.profiling import profiling
+from sql_convert.templates import set_template_dir
+from sql_convert.watch import Watcher
+
+
+def main():
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("-b", "--rest", action="store_true", help="Destination backend rest api")
+    parser.add_argument("-f", "--web", action="store_true", help="Destination frontend framework")
+    parser.add_argument("-s", "--sql", action="store_true", help="Destination SQL language")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Number of parallel generation processes, 0 uses all CPU cores")
+    parser.add_argument("-o", "--output", default='dist', help="Output directory")
+    parser.add_argument("--archive",
+                        help="Write all files into one archive (.zip, .tar, .tar.gz, .tar.bz2, .tar.xz) "
+                             "instead of output directory")
+    parser.add_argument("-t", "--templates",
+                        help="Directory with own templates (<destination>/<name>.tpl), used instead of builtin")
+    parser.add_argument("--force", action="store_true",
+                        help="Generate all tables, do not use manifest of previous run. Output directory is removed only "
+                             "when it has manifest, non-empty directory without manifest is generated into")
+    parser.add_argument("--pagination", choices=PAGINATION_MODES, default='offset',
+                        help="List pagination of generated code, keyset uses cursor of last row instead of OFFSET")
+    parser.add_argument("--count", choices=COUNT_STRATEGIES, default='exact',
+                        help="Total count of list: exact, estimated by planner or exact up to --count-cap rows")
+    parser.add_argument("--count-cap", type=int, default=1000, help="Maximal count of capped count strategy")
+    parser.add_argument("--table-count", action="append", default=[], metavar="TABLE=STRATEGY",
+                        help="Count strategy of one table, for example auth.user=estimated, can be repeated")
+    parser.add_argument("--search", choices=SEARCH_MODES, default='dynamic',
+                        help="List SQL: dynamic EXECUTE or static query with optional filters, planned once")
+    parser.add_argument("--static-sort-limit", type=int, default=16,
+                        help="Tables with more sortable columns use dynamic search")
+    parser.add_argument("--bulk", action="store_true",
+                        help="Generate _save_many and _delete_many functions with batch endpoints")
+    parser.add_argument("--export", action="store_true",
+                        help="Generate _export function returning rows and streaming NDJSON/CSV export endpoint")
+    parser.add_argument("--cache", choices=CACHE_MODES, default='none',
+                        help="Read-through cache of get and list in NestJS service, invalidated by writes")
+    parser.add_argument("--cache-ttl", type=int, default=60, help="Seconds before cached response expires")
+    parser.add_argument("--cache-size", type=int, default=10000, help="Maximal entries of memory cache")
+    parser.add_argument("--coalesce", action="store_true",
+                        help="Concurrent identical get and list calls of NestJS service share one database query")
+    parser.add_argument("--loader", action="store_true",
+                        help="Generate _get_many function and NestJS loader batching get(id) calls into one query")
+    parser.add_argument("--etag", action="store_true",
+                        help="ETag of get and list responses, 304 Not Modified for matching If-None-Match")
+    parser.add_argument("--jsonb", action="store_true",
+                        help="SQL functions take and return jsonb, NestJS service passes objects without JSON text")
+    parser.add_argument("--bench", action="store_true",
+                        help="Generate pgbench scripts, seed data and runner of SQL functions into bench directory")
+    parser.add_argument("--stats", action="store_true",
+                        help="Print time and calls of generation phases and generator functions, files and bytes written")
+    parser.add_argument("--profile",
+                        help="Write Chrome trace (.json, chrome://tracing) or cProfile statistics (other extension, "
+                             "main process only) into file")
+    parser.add_argument("-w", "--watch", action="store_true",
+                        help="Watch SQL files and generate changed tables again until interrupted")
+    parser.add_argument("<path_to_sql>", nargs='+',
+                        help="Path to SQL generation table, schema dump or directory with SQL files")
+    args = parser.parse_args()
+    config = vars(args)
+
+    targets = [target for target in TARGETS if config[target] is True]
+    if not targets:
+        print('No options selected. Please select an option to generate [-b, -f, -s]')
+        sys.exit(-1)
+
+    if config['jobs'] < 0:
+        print('Number of jobs should be 0 or more')
+        sys.exit(-1)
+
+    if config['watch'] and config['archive']:
+        print('Watch mode cannot be used with archive')
+        sys.exit(-1)
+
+    if config['templates']:
+        if not os.path.isdir(config['templates']):
+            print(f'Templates directory not exist: {config["templates"]}')
+            sys.exit(-1)
+        set_template_dir(config['templates'])
+
+    table_count = []
+    for item in config['table_count']:
+        name, _, strategy = item.partition('=')
+        if strategy not in COUNT_STRATEGIES:
+            print(f'Wrong count strategy of table {name}: {strategy}, use one of {", ".join(COUNT_STRATEGIES)}')
+            sys.exit(-1)
+        table_count.append((name if '.' in name else f'public.{name}', strategy))
+
+    if config['count_cap'] < 1:
+        print('Count cap should be 1 or more')
+        sys.exit(-1)
+
+    if config['cache_ttl'] < 1 or config['cache_size'] < 1:
+        print('Cache TTL and size should be 1 or more')
+        sys.exit(-1)
+
+    set_options(GeneratorOptions(pagination=config['pagination'], count=config['count'],
+                                 count_cap=config['count_cap'], table_count=tuple(table_count),
+                                 search=config['search'], static_sort_limit=config['static_sort_limit'],
+                                 bulk=config['bulk'], export=config['export'],
+                                 cache=config['cache'], cache_ttl=config['cache_ttl'],
+                                 cache_size=config['cache_size'], coalesce=config['coalesce'],
+                                 loader=config['loader'], etag=config['etag'], jsonb=config['jsonb'],
+                                 bench=config['bench']))
+
+    if config['watch']:
+        watch(config, targets)
+        return
+
+    if config['stats'] or config['profile']:
+        with profiling(config['profile']) as profile:
+            status = generate(config, targets)
+        if config['stats']:
+            print(profile.report())
+    else:
+        status = generate(config, targets)
+    if status:
+        sys.exit(status)
+
+
+# Returns exit status
+def generate(config: dict, targets: list) -> int:
+    # Analyze and process SQL table definitions
+    try:
+        tables = load_tables(config['<path_to_sql>'])
+    except ValueError as e:
+        print(e)
+        sys.exit(-1)
+
+    if not tables:
+        print('No CREATE TABLE definition found')
+        sys.exit(-1)
+
+    if config['archive']:
+        try:
+            sink = ArchiveSink(config['archive'])
+        except ValueError as e:
+            print(e)
+            sys.exit(-1)
     else:
-        field_array.append({
-            "field": elems[0],
-            "type": elems[1].upper(),
-            "not_null": 'NOT NULL' in line.upper(),
-            "description": get_description(tbl_name, elems[0], sql_file)
-        })
-        # Check sequence name
-        nextVal = line.upper().find('NEXTVAL(')
-        if nextVal >= 0:
-            lastElem = line.find("'", nextVal + 9)
-            sequence_name = line[nextVal + 9:lastElem]
-            # print('line: ', line)
-            # print('Sequence line', nextVal, lastElem, sequenceName)
-
-if not schema_name:
-    print('Table should have schema defined')
-    sys.exit(-1)
-
-if config['sql'] is False and config['web'] is False and config['rest'] is False:
-    print('No options selected. Please select an option to generate [-b, -f, -s]')
-    sys.exit(-1)
-
-if config['rest'] is True:
-    generate_nestjs_api(schema_name, tbl_name, field_array)
-    print('NestJS API successfully generated')
-
-if config['web'] is True:
-    generate_angular_module(schema_name, tbl_name, field_array)
-    print('Angular module successfully generated')
-
-if config['sql'] is True:
-    generate_pgsql(schema_name, tbl_name, sequence_name, field_array)
-    print('PostgreSQL functions successfully generated')
+        sink = FileSystemSink(config['output'])
+    try:
+        result = generate_tables(tables, targets, config['jobs'], force=config['force'], sink=sink)
+    except ValueError as e:
+        print(e)
+        sys.exit(-1)
+    finally:
+        sink.close()
+    for target, error in result.errors:
+        print(error)
+    for target in targets:
+        failed = len([error for error in result.errors if error[0] == target])
+        print(f'{TARGET_NAMES[target]} successfully generated for {len(tables) - failed} table(s)')
+    print(f'Table outputs generated: {result.generated}, unchanged: {result.skipped}')
+    print(f'Files written: {result.files.written}, unchanged: {result.files.unchanged}, removed: {result.files.removed}')
+    if result.errors:
+        print(f'Generation finished with {len(result.errors)} error(s)')
+        return -1
+    return 0
+
+
+def watch(config: dict, targets: list):
+    sink = FileSystemSink(config['output'])
+    try:
+        check_output(sink, config['force'])
+    except ValueError as e:
+        print(e)
+        sys.exit(-1)
+    print(f'Watching {", ".join(config["<path_to_sql>"])}, press Ctrl+C to stop', flush=True)
+    try:
+        Watcher(config['<path_to_sql>'], targets, config['jobs'], sink, force=config['force']).run()
+    except KeyboardInterrupt:
+        print('Watch stopped')
+
+
+if __name__ == '__main__':
+    main()
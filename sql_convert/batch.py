@@ -0,0 +1,229 @@
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sql_convert.common import snake_to_dash
+from sql_convert.generator import TARGETS, TARGET_NAMES, render, render_shared
+from sql_convert.includes.table_definition import TableDefinition
+from sql_convert.manifest import empty_manifest, generator_version, load_manifest, remove_orphans, save_manifest, \
+    table_hash, table_key
+from sql_convert.output import FileSystemSink, OutputSink, OutputStats, Recording, record_outputs, use_sink, \
+    write_file
+from sql_convert.options import GeneratorOptions, get_options, options_dict, set_options
+from sql_convert.parser import parse_file
+from sql_convert.profiling import Profile, current_profile, enable_profiling, phase, profiling
+from sql_convert.templates import get_template_dir, set_template_dir, templates_fingerprint
+
+
+@dataclass
+class BatchResult:
+    # Counts of (table, target) pairs, table generated for three targets is counted three times
+    generated: int = 0
+    skipped: int = 0
+    files: OutputStats = field(default_factory=OutputStats)
+    errors: List[Tuple[str, str]] = field(default_factory=list)
+
+
+# Rendered files, error and timings of one (table, target) unit
+UnitResult = Tuple[Dict[str, str], Optional[str], Optional[Profile]]
+
+
+# List of SQL files from command line paths, directories are searched recursively
+def collect_sql_files(paths: List[str]) -> List[str]:
+    result = []
+    for path in paths:
+        if not os.path.exists(path):
+            raise ValueError(f'File not exist: {path}')
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                result += [os.path.join(root, name) for name in sorted(files) if name.upper().endswith('.SQL')]
+            continue
+        if not path.upper().endswith('.SQL'):
+            raise ValueError(f'File is not SQL file: {path}')
+        result.append(path)
+    return result
+
+
+# Tables from all parsed files, (file path, tables) in order of files
+def merge_tables(parsed: List[Tuple[str, List[TableDefinition]]]) -> List[TableDefinition]:
+    tables = []
+    known = dict()
+    for sql_file_path, file_tables in parsed:
+        for table in file_tables:
+            key = (table.schema_name, table.tbl_name)
+            if key in known:
+                raise ValueError(f'Table {table.schema_name}.{table.tbl_name} defined in {known[key]} '
+                                 f'and {sql_file_path}')
+            known[key] = sql_file_path
+            tables.append(table)
+    return tables
+
+
+# NestJS and Angular files are named by table without schema (api/<table>/, www/<table>-...), tables of the same
+# name in different schemas would overwrite files of each other
+def check_output_paths(tables: List[TableDefinition], targets: List[str]):
+    targets = [target for target in ['rest', 'web'] if target in targets]
+    if not targets:
+        return
+    known = dict()
+    for table in tables:
+        name = snake_to_dash(table.tbl_name)
+        if name in known:
+            raise ValueError(f'Tables {known[name]} and {table.schema_name}.{table.tbl_name} have the same '
+                             f'{" and ".join(TARGET_NAMES[target] for target in targets)} files ({name}), '
+                             f'generate them in separate runs with different output directories')
+        known[name] = f'{table.schema_name}.{table.tbl_name}'
+
+
+def load_tables(paths: List[str]) -> List[TableDefinition]:
+    with phase('parse'):
+        return merge_tables([(sql_file_path, parse_file(sql_file_path))
+                             for sql_file_path in collect_sql_files(paths)])
+
+
+def render_unit(unit: Tuple[TableDefinition, str]) -> Tuple[Dict[str, str], Optional[str]]:
+    table, target = unit
+    try:
+        with phase(f'render.{target}'):
+            return render(table, target), None
+    except Exception as e:
+        return dict(), f'{TARGET_NAMES[target]} {table.schema_name}.{table.tbl_name}: {type(e).__name__}: {e}'
+
+
+# One generation unit rendered in memory, error is returned instead of raised so whole batch is completed.
+# When profiling, timings of the unit are returned to be merged by the calling process
+def run_unit(unit: Tuple[TableDefinition, str]) -> UnitResult:
+    if current_profile() is None:
+        return *render_unit(unit), None
+    with profiling(trace=current_profile().trace) as profile:
+        files, error = render_unit(unit)
+    return files, error, profile
+
+
+# Worker processes use the same template directory, generator options and profiling as calling process
+def init_worker(template_dir: Optional[str], options: GeneratorOptions, profile_trace: Optional[bool]):
+    set_template_dir(template_dir)
+    set_options(options)
+    if profile_trace is not None:
+        enable_profiling(profile_trace)
+
+
+def create_executor(jobs: int) -> ProcessPoolExecutor:
+    profile = current_profile()
+    return ProcessPoolExecutor(max_workers=jobs or os.cpu_count() or 1, initializer=init_worker,
+                               initargs=(get_template_dir(), get_options(), profile.trace if profile else None))
+
+
+def chunk_size(units: list, jobs: int) -> int:
+    return max(1, len(units) // ((jobs or os.cpu_count() or 1) * 4))
+
+
+# Results in the order of units, available as soon as unit and all before it are rendered.
+# Executor can be shared between batches, otherwise new one is created for jobs > 1
+def run_units(units: List[Tuple[TableDefinition, str]], jobs: int,
+              executor: Optional[Executor] = None) -> Iterator[UnitResult]:
+    if len(units) < 2 or (jobs == 1 and executor is None):
+        yield from map(run_unit, units)
+        return
+
+    if executor is not None:
+        yield from executor.map(run_unit, units, chunksize=chunk_size(units, jobs))
+        return
+
+    with create_executor(jobs) as executor:
+        yield from executor.map(run_unit, units, chunksize=chunk_size(units, jobs))
+
+
+def write_unit(files: Dict[str, str]) -> Recording:
+    with record_outputs() as recording:
+        for file_path, content in files.items():
+            write_file(file_path, content)
+    return recording
+
+
+# Directory without manifest of previous run, which is not empty, is not removed: generation into it needs
+# force, then only generated files are written
+def check_output(sink: OutputSink, force: bool = False):
+    if isinstance(sink, FileSystemSink) and not force and not sink.owned():
+        raise ValueError(f'Output directory {sink.root} is not empty and was not generated by sql_convert '
+                         f'(no manifest), use --force to generate into it')
+
+
+# Generate tables into sink (dist directory by default). Each (table, target) pair is independent and is
+# rendered in separate process when jobs > 1, jobs=0 uses all CPU cores; files are written by this process
+# in the order of pairs. For directory sink pairs with the same table definition, generator version and
+# options as in the manifest of previous run are skipped, files not generated anymore are removed.
+# With force all pairs are generated, files of previous manifest not generated anymore are still removed.
+# Without manifest everything is generated, output directory is cleared only when it is empty or has broken
+# manifest, see check_output
+def generate_tables(tables: List[TableDefinition], targets: List[str], jobs: int = 1, options: dict = None,
+                    force: bool = False, sink: Optional[OutputSink] = None,
+                    executor: Optional[Executor] = None) -> BatchResult:
+    options = dict(options or {})
+    options['generator'] = options_dict()
+    if get_template_dir():
+        options['templates'] = templates_fingerprint(get_template_dir())
+    sink = sink or FileSystemSink()
+    incremental = isinstance(sink, FileSystemSink)
+    result = BatchResult()
+    check_output_paths(tables, targets)
+    check_output(sink, force)
+    with phase('manifest'):
+        previous = load_manifest(sink.root) if incremental else None
+    if previous is None:
+        sink.clear()
+        previous = empty_manifest(options)
+    unchanged = not force and previous.get('version') == generator_version() and previous.get('options') == options
+    manifest = empty_manifest(options)
+
+    with phase('manifest'):
+        hashes = dict((table_key(table), table_hash(table)) for table in tables)
+    with use_sink(sink):
+        units = []
+        for target in TARGETS:
+            if target not in targets:
+                continue
+            recording = write_unit(render_shared(target))
+            result.files.update(recording.stats)
+            if recording.outputs:
+                manifest['shared'][target] = recording.outputs
+            for table in tables:
+                key = table_key(table)
+                entry = previous['tables'].get(key, {}).get(target)
+                if unchanged and entry and entry['hash'] == hashes[key] \
+                        and all(os.path.exists(os.path.join(sink.root, file_path)) for file_path in entry['outputs']):
+                    manifest['tables'].setdefault(key, {})[target] = entry
+                    result.skipped += 1
+                    continue
+                units.append((table, target))
+
+        for (table, target), (files, error, profile) in zip(units, run_units(units, jobs, executor)):
+            if profile is not None:
+                current_profile().merge(profile)
+            if error:
+                # Keep previous files and generate again in next run
+                previous_entry = previous['tables'].get(table_key(table), {}).get(target, {})
+                manifest['tables'].setdefault(table_key(table), {})[target] = {
+                    'hash': '',
+                    'outputs': previous_entry.get('outputs', []),
+                }
+                result.errors.append((target, error))
+                continue
+            with phase('write'):
+                recording = write_unit(files)
+            result.files.update(recording.stats)
+            manifest['tables'].setdefault(table_key(table), {})[target] = {
+                'hash': hashes[table_key(table)],
+                'outputs': recording.outputs,
+            }
+            result.generated += 1
+
+        if incremental:
+            with phase('manifest'):
+                save_manifest(manifest, sink.root)
+                with record_outputs() as recording:
+                    remove_orphans(previous, manifest)
+            result.files.update(recording.stats)
+    return result
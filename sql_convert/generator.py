@@ -0,0 +1,77 @@
+from typing import Dict, List, Optional
+
+from sql_convert.includes.table_definition import TableDefinition
+from sql_convert.options import get_options
+from sql_convert.output import MemorySink, OutputSink, use_sink, write_file
+from sql_convert.rest.nestjs import generate_nestjs_api, generate_nestjs_shared
+from sql_convert.sql.pgbench import generate_bench, generate_bench_runner
+from sql_convert.sql.pgsql import generate_pgsql
+from sql_convert.web.ng import generate_angular_module, generate_angular_shared
+
+# Generation destinations in order of execution
+TARGETS = ['rest', 'web', 'sql']
+
+TARGET_NAMES = {
+    'rest': 'NestJS API',
+    'web': 'Angular module',
+    'sql': 'PostgreSQL functions',
+}
+
+
+def generate_table(table: TableDefinition, target: str):
+    match target:
+        case 'rest':
+            generate_nestjs_api(table.schema_name, table.tbl_name, table.field_array, shared=False)
+        case 'web':
+            generate_angular_module(table.schema_name, table.tbl_name, table.field_array)
+        case 'sql':
+            generate_pgsql(table.schema_name, table.tbl_name, table.sequence_name, table.field_array)
+            if get_options().bench:
+                generate_bench(table.schema_name, table.tbl_name, table.sequence_name, table.field_array)
+
+
+# Files common for all tables, generated once per batch
+def generate_shared(target: str):
+    if target == 'rest':
+        generate_nestjs_shared()
+    if target == 'web':
+        generate_angular_shared()
+    if target == 'sql' and get_options().bench:
+        generate_bench_runner()
+
+
+# Files of one table and destination, path -> content
+def render(table: TableDefinition, target: str) -> Dict[str, str]:
+    sink = MemorySink()
+    with use_sink(sink):
+        generate_table(table, target)
+    return sink.files
+
+
+def render_shared(target: str) -> Dict[str, str]:
+    sink = MemorySink()
+    with use_sink(sink):
+        generate_shared(target)
+    return sink.files
+
+
+def write_files(files: Dict[str, str], sink: OutputSink):
+    with use_sink(sink):
+        for file_path, content in files.items():
+            write_file(file_path, content)
+
+
+# Generate table for destinations, returns path -> content. Files are also written to sink if given.
+#   files = generate(parse_file('table.generate.sql')[0], ['sql'])
+def generate(table_model: TableDefinition, targets: Optional[List[str]] = None, sink: Optional[OutputSink] = None,
+             shared: bool = True) -> Dict[str, str]:
+    files = dict()
+    for target in TARGETS:
+        if targets is not None and target not in targets:
+            continue
+        if shared:
+            files.update(render_shared(target))
+        files.update(render(table_model, target))
+    if sink is not None:
+        write_files(files, sink)
+    return files
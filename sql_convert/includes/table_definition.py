@@ -0,0 +1,12 @@
+from typing import List
+from dataclasses import dataclass, field
+
+from sql_convert.includes.field_definition import FieldDefinition
+
+
+@dataclass
+class TableDefinition:
+    schema_name: str
+    tbl_name: str
+    sequence_name: str = ''
+    field_array: List[FieldDefinition] = field(default_factory=list)
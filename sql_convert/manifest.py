@@ -0,0 +1,76 @@
+import os
+import json
+import hashlib
+from functools import lru_cache
+
+from sql_convert.includes.table_definition import TableDefinition
+from sql_convert.output import MANIFEST_NAME, remove_file
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# Hash of generator sources and constants.py, any change in generator code changes all outputs
+@lru_cache(maxsize=None)
+def generator_version() -> str:
+    digest = hashlib.sha256()
+    sources = [os.path.join(ROOT_PATH, 'constants.py')]
+    for root, dirs, files in os.walk(os.path.join(ROOT_PATH, 'sql_convert')):
+        dirs.sort()
+        sources += [os.path.join(root, name) for name in sorted(files) if name.endswith('.py')]
+    for source in sources:
+        digest.update(os.path.relpath(source, ROOT_PATH).encode())
+        with open(source, 'rb') as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+def table_key(table: TableDefinition) -> str:
+    return f'{table.schema_name}.{table.tbl_name}'
+
+
+def table_hash(table: TableDefinition) -> str:
+    definition = [table.schema_name, table.tbl_name, table.sequence_name, table.field_array]
+    return hashlib.sha256(json.dumps(definition, sort_keys=True).encode()).hexdigest()
+
+
+def empty_manifest(options: dict) -> dict:
+    return {
+        'version': generator_version(),
+        'options': options,
+        'shared': {},
+        'tables': {},
+    }
+
+
+# Manifest from previous run, None if not exists or broken
+def load_manifest(root: str = 'dist'):
+    manifest_path = os.path.join(root, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return None
+    try:
+        with open(manifest_path, 'r') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def save_manifest(manifest: dict, root: str = 'dist'):
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, MANIFEST_NAME), 'w') as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+
+
+def manifest_outputs(manifest: dict) -> set:
+    result = set()
+    for outputs in manifest['shared'].values():
+        result.update(outputs)
+    for entry in manifest['tables'].values():
+        for target in entry.values():
+            result.update(target['outputs'])
+    return result
+
+
+# Remove files generated previously which are not part of new generation, with empty directories
+def remove_orphans(previous: dict, current: dict):
+    for file_path in sorted(manifest_outputs(previous) - manifest_outputs(current)):
+        remove_file(file_path)
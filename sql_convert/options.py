@@ -0,0 +1,69 @@
+import json
+from dataclasses import asdict, dataclass
+from typing import Tuple
+
+# Options of generated code, the same for all tables in batch. Options are part of the manifest, change of
+# any option generates all tables again
+
+PAGINATION_MODES = ['offset', 'keyset']
+
+COUNT_STRATEGIES = ['exact', 'estimated', 'capped']
+
+SEARCH_MODES = ['dynamic', 'static']
+
+CACHE_MODES = ['none', 'memory', 'redis']
+
+
+@dataclass(frozen=True)
+class GeneratorOptions:
+    # List pagination: offset - LIMIT/OFFSET by page index, keyset - cursor of last row ("after")
+    pagination: str = 'offset'
+    # Total count of list: exact - count(*) OVER () in page query, estimated - planner estimate,
+    # capped - exact up to count_cap rows
+    count: str = 'exact'
+    count_cap: int = 1000
+    # Count strategy of single tables, (schema.table, strategy)
+    table_count: Tuple[Tuple[str, str], ...] = ()
+    # Search function: dynamic - query built by format() and EXECUTE, static - prepared query with optional
+    # predicates, used for offset pagination of tables with at most static_sort_limit sortable columns
+    search: str = 'dynamic'
+    static_sort_limit: int = 16
+    # Bulk functions _save_many and _delete_many with batch endpoints
+    bulk: bool = False
+    # Streaming export: SETOF function _export and NDJSON/CSV endpoint reading it by cursor
+    export: bool = False
+    # Read-through cache of get and list in NestJS service: memory - LRU of process, redis - Redis compatible
+    # server. Entries expire after cache_ttl seconds, memory cache keeps at most cache_size entries
+    cache: str = 'none'
+    cache_ttl: int = 60
+    cache_size: int = 10000
+    # Concurrent identical get and list calls of NestJS service share one database query
+    coalesce: bool = False
+    # Function _get_many and request scoped NestJS loader batching get(id) calls of one tick
+    loader: bool = False
+    # ETag (_etag of _get and _search) with 304 Not Modified in NestJS and If-None-Match in Angular
+    etag: bool = False
+    # Functions take and return jsonb instead of JSON text, NestJS service passes objects to pg driver
+    jsonb: bool = False
+    # pgbench scripts, seed data and runner in bench directory
+    bench: bool = False
+
+    def count_strategy(self, schema_name: str, tbl_name: str) -> str:
+        return dict(self.table_count).get(f'{schema_name}.{tbl_name}', self.count)
+
+
+_options = GeneratorOptions()
+
+
+def set_options(options: GeneratorOptions):
+    global _options
+    _options = options
+
+
+def get_options() -> GeneratorOptions:
+    return _options
+
+
+# Options as stored in JSON manifest
+def options_dict() -> dict:
+    return json.loads(json.dumps(asdict(_options)))
@@ -0,0 +1,246 @@
+import io
+import os
+import time
+import shutil
+import locale
+import tarfile
+import zipfile
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from sql_convert.profiling import count_output
+
+# Same encoding as open(file_path, 'w')
+ENCODING = locale.getpreferredencoding(False)
+
+# Manifest of last generation inside output directory, used for incremental regeneration
+MANIFEST_NAME = '.sql_convert-manifest.json'
+
+
+@dataclass
+class OutputStats:
+    written: int = 0
+    unchanged: int = 0
+    removed: int = 0
+
+    def update(self, other: 'OutputStats'):
+        self.written += other.written
+        self.unchanged += other.unchanged
+        self.removed += other.removed
+
+
+@dataclass
+class Recording:
+    outputs: List[str] = field(default_factory=list)
+    stats: OutputStats = field(default_factory=OutputStats)
+
+
+# Destination of generated files, paths are relative to output root
+class OutputSink(ABC):
+    # Returns True if content was changed
+    @abstractmethod
+    def write(self, file_path: str, content: str) -> bool:
+        pass
+
+    # Returns True if file existed
+    def remove(self, file_path: str) -> bool:
+        return False
+
+    # Remove all files
+    def clear(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def encode(content: str) -> bytes:
+    if os.linesep != '\n':
+        content = content.replace('\n', os.linesep)
+    return content.encode(ENCODING)
+
+
+def same_content(file_path: str, data: bytes) -> bool:
+    try:
+        if os.stat(file_path).st_size != len(data):
+            return False
+        with open(file_path, 'rb') as file:
+            return file.read() == data
+    except OSError:
+        return False
+
+
+# Files in root directory, written only if content is different so modification time changes only with content
+class FileSystemSink(OutputSink):
+    def __init__(self, root: str = 'dist'):
+        self.root = root
+        # Directories already created
+        self.directories = set()
+
+    def write(self, file_path: str, content: str) -> bool:
+        full_path = os.path.join(self.root, file_path)
+        data = encode(content)
+        if same_content(full_path, data):
+            return False
+        directory = os.path.dirname(full_path)
+        if directory not in self.directories:
+            os.makedirs(directory, exist_ok=True)
+            self.directories.add(directory)
+        try:
+            with open(full_path, 'wb') as file:
+                file.write(data)
+        except FileNotFoundError:
+            # Directory removed outside of generator
+            os.makedirs(directory, exist_ok=True)
+            with open(full_path, 'wb') as file:
+                file.write(data)
+        count_output(len(data))
+        return True
+
+    # Remove file and directories left empty, up to root directory
+    def remove(self, file_path: str) -> bool:
+        full_path = os.path.join(self.root, file_path)
+        if not os.path.exists(full_path):
+            return False
+        os.remove(full_path)
+        directory = os.path.dirname(full_path)
+        while directory and directory != self.root and not os.listdir(directory):
+            os.rmdir(directory)
+            self.directories.discard(directory)
+            directory = os.path.dirname(directory)
+        return True
+
+    # Directory written by generator: not existing, empty or with manifest of previous run
+    def owned(self) -> bool:
+        if not os.path.isdir(self.root):
+            return not os.path.exists(self.root)
+        return not os.listdir(self.root) or os.path.exists(os.path.join(self.root, MANIFEST_NAME))
+
+    # Only directory written by generator is removed, other directories are kept as they are
+    def clear(self):
+        if os.path.exists(self.root) and self.owned():
+            shutil.rmtree(self.root, ignore_errors=True)
+        self.directories.clear()
+
+
+# Files kept in dictionary, path -> content
+class MemorySink(OutputSink):
+    def __init__(self):
+        self.files: Dict[str, str] = dict()
+
+    def write(self, file_path: str, content: str) -> bool:
+        changed = self.files.get(file_path) != content
+        self.files[file_path] = content
+        return changed
+
+    def remove(self, file_path: str) -> bool:
+        return self.files.pop(file_path, None) is not None
+
+    def clear(self):
+        self.files.clear()
+
+
+# Files streamed into one archive, format from file name: .zip, .tar, .tar.gz/.tgz, .tar.bz2, .tar.xz
+class ArchiveSink(OutputSink):
+    TAR_MODES = {
+        '.tar': 'w',
+        '.tar.gz': 'w:gz',
+        '.tgz': 'w:gz',
+        '.tar.bz2': 'w:bz2',
+        '.tar.xz': 'w:xz',
+    }
+
+    def __init__(self, archive_path: str):
+        self.archive_path = archive_path
+        self.mtime = time.time()
+        # Names already in archive, members cannot be replaced
+        self.names = set()
+        self.zip = None
+        self.tar = None
+        if archive_path.lower().endswith('.zip'):
+            self.zip = zipfile.ZipFile(archive_path, 'w', compression=zipfile.ZIP_DEFLATED)
+            return
+        for extension, mode in self.TAR_MODES.items():
+            if archive_path.lower().endswith(extension):
+                self.tar = tarfile.open(archive_path, mode)
+                return
+        raise ValueError(f'Unknown archive format: {archive_path}')
+
+    def write(self, file_path: str, content: str) -> bool:
+        name = file_path.replace(os.sep, '/')
+        if name in self.names:
+            return False
+        self.names.add(name)
+        data = content.encode('utf-8')
+        if self.zip is not None:
+            info = zipfile.ZipInfo(name, time.localtime(self.mtime)[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = 0o644 << 16
+            self.zip.writestr(info, data)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = int(self.mtime)
+            info.mode = 0o644
+            self.tar.addfile(info, io.BytesIO(data))
+        count_output(len(data))
+        return True
+
+    def close(self):
+        if self.zip is not None:
+            self.zip.close()
+        if self.tar is not None:
+            self.tar.close()
+
+
+# Sink used by generators
+_sink: OutputSink = FileSystemSink()
+
+# Files written and removed while recording is active
+_recording: Optional[Recording] = None
+
+
+def current_sink() -> OutputSink:
+    return _sink
+
+
+# Redirect generated files to sink inside the block
+@contextmanager
+def use_sink(sink: OutputSink):
+    global _sink
+    previous = _sink
+    _sink = sink
+    try:
+        yield sink
+    finally:
+        _sink = previous
+
+
+def write_file(file_path: str, content: str) -> bool:
+    changed = _sink.write(file_path, content)
+    if _recording is not None:
+        _recording.outputs.append(file_path)
+        if changed:
+            _recording.stats.written += 1
+        else:
+            _recording.stats.unchanged += 1
+    return changed
+
+
+def remove_file(file_path: str):
+    if _sink.remove(file_path) and _recording is not None:
+        _recording.stats.removed += 1
+
+
+# Collect written files with statistics inside the block
+@contextmanager
+def record_outputs():
+    global _recording
+    previous = _recording
+    _recording = Recording()
+    try:
+        yield _recording
+    finally:
+        _recording = previous
@@ -0,0 +1,219 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+from sql_convert.includes.table_definition import TableDefinition
+
+# Single pass DDL parser. Reads CREATE TABLE bodies, COMMENT ON COLUMN and
+# ALTER TABLE ... SET DEFAULT nextval() statements once, indexes comments by
+# (schema, table, column) and resolves descriptions at the end, so the cost
+# grows with the file size and not with columns x lines.
+
+CREATE_TABLE = re.compile(
+    r'^CREATE\s+(?:(?:GLOBAL|LOCAL)\s+)?(?:(?:TEMP|TEMPORARY|UNLOGGED)\s+)?TABLE\s+'
+    r'(?:IF\s+NOT\s+EXISTS\s+)?([\w."]+)\s*(\(?)',
+    re.IGNORECASE)
+COMMENT_ON_COLUMN = re.compile(r'^COMMENT\s+ON\s+COLUMN\s+([\w."]+)\s+IS\s+', re.IGNORECASE)
+SET_DEFAULT = re.compile(
+    r'^ALTER\s+TABLE\s+(?:ONLY\s+)?([\w."]+)\s+ALTER\s+COLUMN\s+([\w"]+)\s+SET\s+DEFAULT\s+',
+    re.IGNORECASE)
+NEXTVAL = re.compile(r"NEXTVAL\(\s*'([^']+)'", re.IGNORECASE)
+# String literals and characters which split CREATE TABLE body into column definitions
+BODY_TOKEN = re.compile(r"'[^']*'|[(),]")
+# String literals and start of -- comment
+COMMENT_TOKEN = re.compile(r"'[^']*'|--")
+# String literals and end of statement
+STATEMENT_TOKEN = re.compile(r"'[^']*'|;")
+# SQL string literal, quote inside is doubled
+STRING_LITERAL = re.compile(r"'((?:[^']|'')*)'")
+# Generator annotation in column comment, for example: COMMENT ON COLUMN auth.user.login IS 'Login @index=prefix,sort'
+ANNOTATION = re.compile(r'\s*@(\w+)=([\w,]+)')
+
+# Annotations stored in field definition as list of values
+ANNOTATIONS = ['index']
+
+# Lines inside CREATE TABLE body which are not columns
+TABLE_CONSTRAINTS = ['CONSTRAINT', 'PRIMARY', 'UNIQUE', 'CHECK', 'FOREIGN', 'EXCLUDE', 'LIKE']
+
+# Words which end column type definition
+COLUMN_KEYWORDS = ['NOT', 'NULL', 'DEFAULT', 'PRIMARY', 'REFERENCES', 'UNIQUE', 'CHECK', 'CONSTRAINT',
+                   'COLLATE', 'GENERATED']
+
+# pg_dump writes SQL standard type names, generators use short PostgreSQL names
+TYPE_ALIASES = {
+    'CHARACTER VARYING': 'VARCHAR',
+    'CHARACTER': 'BPCHAR',
+    'CHAR': 'BPCHAR',
+    'TIMESTAMP WITHOUT TIME ZONE': 'TIMESTAMP',
+    'TIMESTAMP WITH TIME ZONE': 'TIMESTAMPTZ',
+    'TIME WITHOUT TIME ZONE': 'TIME',
+    'TIME WITH TIME ZONE': 'TIMETZ',
+    'DOUBLE PRECISION': 'FLOAT8',
+}
+
+CommentKey = Tuple[Optional[str], str, str]
+
+
+def split_name(name: str) -> List[str]:
+    return [part.strip('"') for part in name.split('.')]
+
+
+def table_name(name: str) -> Tuple[str, str]:
+    parts = split_name(name)
+    if len(parts) == 1 or not parts[1]:
+        return 'public', parts[0]
+    return parts[-2], parts[-1]
+
+
+def column_type(elems: List[str]) -> str:
+    words = []
+    for elem in elems:
+        if elem.upper() in COLUMN_KEYWORDS:
+            break
+        words.append(elem)
+    col_type = re.sub(r'\(.*?\)', '', ' '.join(words)).strip().upper()
+    return TYPE_ALIASES.get(col_type, col_type)
+
+
+# Line without -- comment, -- inside string literal is kept
+def strip_comment(line: str) -> str:
+    for token in COMMENT_TOKEN.finditer(line):
+        if token.group() == '--':
+            return line[:token.start()]
+    return line
+
+
+# First statement of line and rest of line after semicolon
+def split_statement(line: str) -> Tuple[str, str]:
+    for token in STATEMENT_TOKEN.finditer(line):
+        if token.group() == ';':
+            return line[:token.start()].strip(), line[token.end():].strip()
+    return line, ''
+
+
+# Column definitions of CREATE TABLE body text, split on commas outside of parentheses and string literals, so
+# body can be on one line or column on more lines. Text of unfinished definition and depth of parentheses are
+# carried to the next line. Returns definitions, unfinished text, depth and text after closing parenthesis (None
+# when body is not closed)
+def split_body(text: str, pending: str, depth: int) -> Tuple[List[str], str, int, Optional[str]]:
+    items = []
+    start = 0
+    for token in BODY_TOKEN.finditer(text):
+        char = token.group()
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            if depth == 0:
+                items.append(pending + text[start:token.start()])
+                return [item.strip() for item in items if item.strip()], '', 0, text[token.end():]
+            depth -= 1
+        elif char == ',' and depth == 0:
+            items.append(pending + text[start:token.start()])
+            pending = ''
+            start = token.end()
+    return [item.strip() for item in items if item.strip()], pending + text[start:] + ' ', depth, None
+
+
+def add_column(table: TableDefinition, definition: str):
+    elems = re.split(r'\s+', definition)
+    if elems[0].upper() in TABLE_CONSTRAINTS:
+        return
+    table.field_array.append({
+        "field": elems[0].strip('"'),
+        "type": column_type(elems[1:]),
+        "not_null": 'NOT NULL' in definition.upper(),
+        "description": ''
+    })
+    # Check sequence name
+    sequence = NEXTVAL.search(definition)
+    if sequence and not table.sequence_name:
+        table.sequence_name = sequence.group(1)
+
+
+def parse_ddl(sql_file_content: str) -> List[TableDefinition]:
+    tables: List[TableDefinition] = []
+    comments: Dict[CommentKey, str] = dict()
+    sequences: Dict[Tuple[str, str, str], str] = dict()
+
+    current: Optional[TableDefinition] = None
+    in_body = False
+    pending = ''
+    depth = 0
+    for line in sql_file_content.split('\n'):
+        stripped = line.strip()
+        if '--' in stripped:
+            stripped = strip_comment(stripped).strip()
+        # Line can have more statements, each part is read until the line is consumed
+        while stripped:
+            if current is None:
+                match = CREATE_TABLE.match(stripped)
+                if match:
+                    schema_name, tbl_name = table_name(match.group(1))
+                    current = TableDefinition(schema_name, tbl_name)
+                    tables.append(current)
+                    in_body = match.group(2) == '('
+                    pending, depth = '', 0
+                    # Rest of line, columns of one line body
+                    stripped = stripped[match.end():].strip()
+                    continue
+
+            if current is not None:
+                if not in_body:
+                    # CREATE TABLE ... AS / PARTITION OF, no column list
+                    if not stripped.startswith('('):
+                        tables.remove(current)
+                        current = None
+                        stripped = split_statement(stripped)[1]
+                        continue
+                    in_body = True
+                    stripped = stripped[1:].strip()
+                    continue
+                items, pending, depth, rest = split_body(stripped, pending, depth)
+                for item in items:
+                    add_column(current, item)
+                stripped = ''
+                if rest is not None:
+                    current = None
+                    # Table options up to semicolon are skipped, next statements of the line are read
+                    stripped = split_statement(rest)[1]
+                continue
+
+            statement, stripped = split_statement(stripped)
+            match = COMMENT_ON_COLUMN.match(statement)
+            if match:
+                parts = split_name(match.group(1).upper())
+                literal = STRING_LITERAL.match(statement, match.end())
+                # Column without table or comment without text, not finished statement of edited file
+                if len(parts) < 2 or not literal:
+                    continue
+                schema_name = parts[-3] if len(parts) > 2 else None
+                comments[(schema_name, parts[-2], parts[-1])] = literal.group(1).replace("''", "'")
+                continue
+
+            match = SET_DEFAULT.match(statement)
+            if match:
+                sequence = NEXTVAL.search(statement)
+                if sequence:
+                    schema_name, tbl_name = table_name(match.group(1))
+                    sequences[(schema_name, tbl_name, match.group(2).strip('"'))] = sequence.group(1)
+
+    for table in tables:
+        for item in table.field_array:
+            # Names are compared case insensitive
+            schema_name, tbl_name, field = table.schema_name.upper(), table.tbl_name.upper(), item['field'].upper()
+            description = comments.get((schema_name, tbl_name, field),
+                                       comments.get((None, tbl_name, field), item['field']))
+            annotations = ANNOTATION.findall(description)
+            if annotations:
+                description = ANNOTATION.sub('', description).strip() or item['field']
+            for name, value in annotations:
+                if name in ANNOTATIONS:
+                    item[name] = [part for part in value.lower().split(',') if part]
+            item['description'] = description
+        if not table.sequence_name and table.field_array:
+            table.sequence_name = sequences.get((table.schema_name, table.tbl_name, table.field_array[0]['field']), '')
+    return tables
+
+
+def parse_file(file_path: str) -> List[TableDefinition]:
+    with open(file_path, 'r') as f:
+        return parse_ddl(f.read())
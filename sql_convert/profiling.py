@@ -0,0 +1,149 @@
+import os
+import json
+import time
+import cProfile
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Dict, List, Optional, Tuple
+
+# Timing of generation phases and generator functions. Collected only inside profiling() block, otherwise
+# decorated functions are called directly. Times are inclusive (generate_pgsql includes generate_get) and
+# with jobs > 1 summed over all processes.
+#   with profiling() as profile:
+#       generate_tables(tables, ['sql'])
+#   print(profile.report())
+
+
+@dataclass
+class PhaseStats:
+    calls: int = 0
+    nanoseconds: int = 0
+
+
+@dataclass
+class Profile:
+    trace: bool = False
+    phases: Dict[str, PhaseStats] = field(default_factory=dict)
+    files: int = 0
+    bytes: int = 0
+    start: int = 0
+    end: int = 0
+    # Chrome trace events: (name, process id, start, duration) in nanoseconds
+    events: List[Tuple[str, int, int, int]] = field(default_factory=list)
+
+    def add(self, name: str, start: int, end: int):
+        stats = self.phases.get(name)
+        if stats is None:
+            stats = self.phases[name] = PhaseStats()
+        stats.calls += 1
+        stats.nanoseconds += end - start
+        if self.trace:
+            self.events.append((name, os.getpid(), start, end - start))
+
+    def merge(self, other: 'Profile'):
+        for name, other_stats in other.phases.items():
+            stats = self.phases.setdefault(name, PhaseStats())
+            stats.calls += other_stats.calls
+            stats.nanoseconds += other_stats.nanoseconds
+        self.files += other.files
+        self.bytes += other.bytes
+        self.events += other.events
+
+    def report(self) -> str:
+        lines = [f'{"Phase / function":<40}{"calls":>8}{"total ms":>12}{"avg ms":>10}']
+        for name, stats in sorted(self.phases.items(), key=lambda item: -item[1].nanoseconds):
+            total = stats.nanoseconds / 1e6
+            lines.append(f'{name:<40}{stats.calls:>8}{total:>12.2f}{total / stats.calls:>10.3f}')
+        lines.append(f'Files written: {self.files}, bytes written: {self.bytes}, '
+                     f'wall time: {(self.end - self.start) / 1e6:.2f} ms')
+        return '\n'.join(lines)
+
+    # Trace Event Format, opens in chrome://tracing or https://ui.perfetto.dev
+    def save_trace(self, file_path: str):
+        events = [{
+            'name': name,
+            'cat': name.split('.')[0],
+            'ph': 'X',
+            'pid': pid,
+            'tid': pid,
+            'ts': (start - self.start) / 1000,
+            'dur': duration / 1000,
+        } for name, pid, start, duration in self.events]
+        with open(file_path, 'w') as file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, file)
+
+
+_profile: Optional[Profile] = None
+
+
+def current_profile() -> Optional[Profile]:
+    return _profile
+
+
+# Collect timings inside the block (nested block collects separately). If output path is given, Chrome trace
+# is written for .json file, otherwise cProfile statistics of this process (pstats / snakeviz format)
+@contextmanager
+def profiling(output_path: Optional[str] = None, trace: bool = False):
+    global _profile
+    profile = Profile(trace=trace or bool(output_path and output_path.lower().endswith('.json')))
+    profiler = None
+    if output_path and not profile.trace:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    previous = _profile
+    _profile = profile
+    profile.start = time.perf_counter_ns()
+    try:
+        yield profile
+    finally:
+        profile.end = time.perf_counter_ns()
+        _profile = previous
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(output_path)
+        elif output_path:
+            profile.save_trace(output_path)
+
+
+# Start collecting for the whole process, used by worker processes
+def enable_profiling(trace: bool = False):
+    global _profile
+    _profile = Profile(trace=trace)
+
+
+@contextmanager
+def phase(name: str):
+    profile = _profile
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        profile.add(name, start, time.perf_counter_ns())
+
+
+# Decorator of generator functions, name is <module>.<function>, for example pgsql.generate_get
+def timed(function):
+    name = f'{function.__module__.split(".")[-1]}.{function.__name__}'
+
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        if _profile is None:
+            return function(*args, **kwargs)
+        profile = _profile
+        start = time.perf_counter_ns()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profile.add(name, start, time.perf_counter_ns())
+    return wrapper
+
+
+# File written by output sink
+def count_output(size: int):
+    if _profile is not None:
+        _profile.files += 1
+        _profile.bytes += size
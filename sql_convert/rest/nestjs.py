@@ -2,142 +2,116 @@ import os
 from typing import List
 
 from sql_convert.includes.field_definition import FieldDefinition
-from sql_convert.common import capitalize, is_number, is_boolean, is_string, snake_to_camel, snake_to_dash
+from sql_convert.common import is_number, is_boolean, is_string, snake_to_camel, snake_to_dash
+from sql_convert.options import get_options
+from sql_convert.output import write_file
+from sql_convert.profiling import timed
+from sql_convert.templates import register, render
 
-
-# Generate API NestJS templates
-def generate_model_dto(schema_name: str, tbl_name: str, field_array: List[FieldDefinition]):
-    # model dto
-    dto_name = f"{snake_to_camel(tbl_name)}Dto"
-    ts_dto = f"""import {{ ApiProperty }} from '@nestjs/swagger';
+MODEL_DTO_TEMPLATE = register('rest/model_dto', """import {{ ApiProperty }} from '@nestjs/swagger';
 import {{ IsNotEmpty, IsNumber, IsString, IsOptional }} from 'class-validator';
-export class {dto_name} {{\n"""
-    for item in field_array:
-        # Set swagger decorators
-        ts_type = 'string'
-        if is_number(item):
-            ts_type = 'number'
-        if is_boolean(item):
-            ts_type = 'boolean'
-        if item['not_null'] is True:
-            ts_dto += '   @IsNotEmpty()\n'
-        if is_number(item):
-            ts_dto += '   @IsNumber()\n'
-        if is_string(item):
-            ts_dto += '   @IsString()\n'
-        if item['not_null'] is not True and (is_number(item) or is_string(item)):
-            ts_dto += '   @IsOptional()\n'
-        ts_dto += f"""   @ApiProperty({{
-    description: '{item['description']}',
+export class {dto_name} {{
+{fields}}}""")
+
+MODEL_DTO_FIELD_TEMPLATE = register('rest/model_dto_field', """{decorators}   @ApiProperty({{
+    description: '{description}',
     type: '{ts_type}',
     example: '',
-  }})\n"""
-        ts_dto += f' {item["field"]}: {ts_type}\n\n'
-    ts_dto += '}'
-    file_path = os.path.join('dist', 'api', snake_to_dash(tbl_name), 'dto', f'{snake_to_dash(tbl_name)}.dto.ts')
-    os.makedirs(os.path.join('dist', 'api', snake_to_dash(tbl_name), 'dto'), exist_ok=True)
-    with open(file_path, 'w') as file:
-        file.write(ts_dto)
-
+  }})
+ {field}: {ts_type}
 
-# FilterItem.dto.ts - NestJS global definition
-def generate_filter_item_dto():
-    # FilterItem Dto
-    ts_filter_dto = (
-        "import { ApiProperty } from '@nestjs/swagger';\n"
-        "import { IsString } from 'class-validator';\n"
-        
-        "export class FilterItemDto {\n"
-        "  @IsString()\n"
-        "  @ApiProperty({\n"
-        "    description: 'Field name to be search on',\n"
-        "    type: 'string',\n"
-        "    example: 'name',\n"
-        "  })\n"
-        "  field: string;\n"
-        "  @IsString()\n"
-        "  @ApiProperty({\n"
-        "    description: 'Search value',\n"
-        "    type: 'string',\n"
-        "    example: 'Kowalski',\n"
-        "  })\n"
-        "  value: string;\n"
-        "}\n"
-    )
-    file_path = os.path.join('dist', 'api', 'shared', 'dto', 'filter-item.dto.ts')
-    os.makedirs(os.path.join('dist', 'api', 'shared', 'dto'), exist_ok=True)
-    with open(file_path, 'w') as file:
-        file.write(ts_filter_dto)
+""")
 
+FILTER_ITEM_DTO_TEMPLATE = register('rest/filter_item_dto', """import {{ ApiProperty }} from '@nestjs/swagger';
+import {{ IsString }} from 'class-validator';
+export class FilterItemDto {{
+  @IsString()
+  @ApiProperty({{
+    description: 'Field name to be search on',
+    type: 'string',
+    example: 'name',
+  }})
+  field: string;
+  @IsString()
+  @ApiProperty({{
+    description: 'Search value',
+    type: 'string',
+    example: 'Kowalski',
+  }})
+  value: string;
+}}
+""")
 
-# ListFilterRequest.dto  - NestJS global definition
-def generate_list_filter_request_dto():
-    ts_item = """import { ApiProperty } from '@nestjs/swagger';
-import { IsArray, IsNotEmpty, IsNumber, IsString, IsOptional } from 'class-validator';
-import { FilterItemDto } from './FilterItem.dto';
+LIST_FILTER_REQUEST_DTO_TEMPLATE = register('rest/list_filter_request_dto', """import {{ ApiProperty }} from '@nestjs/swagger';
+import {{ IsArray, IsNotEmpty, IsNumber, IsString, IsOptional }} from 'class-validator';
+import {{ FilterItemDto }} from './FilterItem.dto';
 
-export class ListFilterRequestDto {
+export class ListFilterRequestDto {{
   @IsArray()
-  @ApiProperty({
+  @ApiProperty({{
     description: 'List filtered fields with search values',
     type: [FilterItemDto],
     required: false,
-  })
+  }})
   filter: FilterItemDto[];
   
   @IsString()
-  @ApiProperty({
+  @ApiProperty({{
     description: 'Sort direction',
     type: 'string',
     enum: ['asc', 'desc', ''],
     example: 'asc',
-  })
+  }})
   sort_direction: string;
   
   @IsArray()
   @IsOptional()
-  @ApiProperty({
+  @ApiProperty({{
     description: 'Fields to be sorted',
     type: 'array',
-    items: {
+    items: {{
       type: 'string',
-    },
+    }},
     example: '[\\'name\\', \\'surname\\']',
     required: false,
-  })
+  }})
   sort?: string[];
   
   @IsNotEmpty()
   @IsNumber()
-  @ApiProperty({
+  @ApiProperty({{
     description: 'Page index',
     type: 'number',
     example: 1,
-  })
+  }})
   page_index: number;
   
   @IsNotEmpty()
   @IsNumber()
-  @ApiProperty({
+  @ApiProperty({{
     description: 'Page size',
     type: 'number',
     example: 25,
-  })
+  }})
   page_size: number;
-}"""
-    file_path = os.path.join('dist', 'api', 'shared', 'dto', 'list-filter-request.dto.ts')
-    os.makedirs(os.path.join('dist', 'api', 'shared', 'dto'), exist_ok=True)
-    with open(file_path, 'w') as file:
-        file.write(ts_item)
+{after}}}""")
 
+LIST_FILTER_REQUEST_AFTER_TEMPLATE = register('rest/list_filter_request_after', """  
+  @IsOptional()
+  @ApiProperty({{
+    description: 'Keyset pagination cursor, "after" from response of previous page',
+    type: 'object',
+    example: {{ name: 'Kowalski', id: 125 }},
+    required: false,
+  }})
+  after?: Record<string, any>;
+""")
 
-# List Response Dto
-def generate_list_response_dto(schema_name: str, tbl_name: str):
-    ts_list_response_dto = f"""import {{ IsNumber }} from 'class-validator';
+LIST_RESPONSE_DTO_TEMPLATE = register('rest/list_response_dto', """import {{ IsNumber, IsString }} from 'class-validator';
 import {{ ApiProperty }} from '@nestjs/swagger';
-import {{ {snake_to_camel(tbl_name)}Dto }} from './{snake_to_camel(tbl_name)}.dto';\
+import {{ {class_name}Dto }} from './{class_name}.dto';\
 
-export class {snake_to_camel(tbl_name)}ListResponseDto {{
+export class {class_name}ListResponseDto {{
   @IsNumber()
   @ApiProperty({{
     description: 'Table item count',
@@ -146,38 +120,51 @@ export class {snake_to_camel(tbl_name)}ListResponseDto {{
   }})
   cnt: number;
   
+  @IsString()
+  @ApiProperty({{
+    description: '{count_description}',
+    type: 'string',
+    enum: ['exact', 'estimated', 'capped'],
+    example: '{count_strategy}',
+  }})
+  cnt_type: string;
+  
   @ApiProperty({{
     description: 'Response item array',
-    type: [{snake_to_camel(tbl_name)}Dto],
+    type: [{class_name}Dto],
     example: [],
   }})
-  data: {snake_to_camel(tbl_name)}Dto[];
-}}"""
-    file_path = os.path.join('dist', 'api', snake_to_dash(tbl_name), 'dto', f'{snake_to_dash(tbl_name)}-list-response.dto.ts')
-    os.makedirs(os.path.join('dist', 'api', snake_to_dash(tbl_name), 'dto'), exist_ok=True)
-    with open(file_path, 'w') as file:
-        file.write(ts_list_response_dto)
+  data: {class_name}Dto[];
+{after}}}""")
 
+LIST_RESPONSE_AFTER_TEMPLATE = register('rest/list_response_after', """  
+  @ApiProperty({{
+    description: 'Keyset pagination cursor of next page, sort fields and primary key of last item',
+    type: 'object',
+    example: {{ name: 'Kowalski', id: 125 }},
+    required: false,
+  }})
+  after?: Record<string, any>;
+""")
 
-# Controller
-def generate_controller(schema_name: str, tbl_name: str):
-    ts_controller = f"""import {{ ApiBearerAuth, ApiResponse, ApiTags }} from '@nestjs/swagger';
+CONTROLLER_TEMPLATE = register('rest/controller', """import {{ ApiBearerAuth, ApiResponse, ApiTags }} from '@nestjs/swagger';
 import {{
   Body, Controller, Delete, Get, HttpCode, HttpStatus, Param, Post, UseGuards,
-}} from '@nestjs/common';
+{extra_imports}}} from '@nestjs/common';
 import {{ Observable }} from 'rxjs';
 import {{ AuthGuard }} from '../shared/guards/auth.guard';
-import {{ {snake_to_camel(tbl_name)}Dto }} from './dto/{snake_to_camel(tbl_name)}.dto';
-import {{ {snake_to_camel(tbl_name)}ListResponseDto }} from './dto/{snake_to_dash(tbl_name)}-list-response.dto';
+import {{ {class_name}Dto }} from './dto/{class_name}.dto';
+import {{ {class_name}ListResponseDto }} from './dto/{dash_name}-list-response.dto';
 import {{ ListFilterRequestDto }} from '../shared/dto/list-filter-request.dto';
-import {{ {snake_to_camel(tbl_name)}Service }} from './{snake_to_dash(tbl_name)}.service';\n
+import {{ {class_name}Service }} from './{dash_name}.service';
+{export_import}{etag_import}
 @ApiTags('{tbl_name}')
 @ApiBearerAuth('Bearer')
 @UseGuards(AuthGuard)
 @Controller('{tbl_name}')
-export class {snake_to_camel(tbl_name)}Controller {{
+export class {class_name}Controller {{
   constructor(
-    private {snake_to_camel(tbl_name, False)}Service: {snake_to_camel(tbl_name)}Service,
+    private {var_name}Service: {class_name}Service,
   ) {{}}
     
   @Post('list')
@@ -185,18 +172,18 @@ export class {snake_to_camel(tbl_name)}Controller {{
   @ApiResponse({{ status: HttpStatus.INTERNAL_SERVER_ERROR, description: 'Database error' }})
   @ApiResponse({{ status: HttpStatus.FORBIDDEN, description: 'Invalid credentials' }})
   @ApiResponse({{ status: HttpStatus.TOO_MANY_REQUESTS, description: 'Too many requests' }})
-  @ApiResponse({{ status: HttpStatus.OK, description: 'Response with list', type: {snake_to_camel(tbl_name)}ListResponseDto }})
-  list(@Body() filter: ListFilterRequestDto): Observable< {snake_to_camel(tbl_name)}ListResponseDto > {{
-    return this.{snake_to_camel(tbl_name, False)}Service.list(filter);
+  @ApiResponse({{ status: HttpStatus.OK, description: 'Response with list', type: {class_name}ListResponseDto }})
+{etag_decorators}  list(@Body() filter: ListFilterRequestDto): Observable< {class_name}ListResponseDto > {{
+    return this.{var_name}Service.list(filter);
   }}
   @Get(':id')
   @HttpCode(HttpStatus.OK)
   @ApiResponse({{ status: HttpStatus.INTERNAL_SERVER_ERROR, description: 'Database error' }})
   @ApiResponse({{ status: HttpStatus.FORBIDDEN, description: 'Invalid credentials' }})
   @ApiResponse({{ status: HttpStatus.TOO_MANY_REQUESTS, description: 'Too many requests' }})
-  @ApiResponse({{ status: HttpStatus.OK, description: 'Response description', type: {snake_to_camel(tbl_name)}Dto }})
-  get(@Param('id') id: number): Observable< {snake_to_camel(tbl_name)}Dto > {{
-    return this.{snake_to_camel(tbl_name, False)}Service.get(id);
+  @ApiResponse({{ status: HttpStatus.OK, description: 'Response description', type: {class_name}Dto }})
+{etag_decorators}  get(@Param('id') id: number): Observable< {class_name}Dto > {{
+    return this.{var_name}Service.get(id);
   }}
   @Post()
   @HttpCode(HttpStatus.OK)
@@ -205,8 +192,8 @@ export class {snake_to_camel(tbl_name)}Controller {{
   @ApiResponse({{ status: HttpStatus.TOO_MANY_REQUESTS, description: 'Too many requests' }})
   @ApiResponse({{ status: HttpStatus.NOT_FOUND, description: 'Item not found' }})
   @ApiResponse({{ status: HttpStatus.OK, description: 'Response with id' }})
-  save(@Body() {snake_to_camel(tbl_name, False)}: {capitalize(snake_to_camel(tbl_name))}Dto) {{
-    return this.{snake_to_camel(tbl_name, False)}Service.save({snake_to_camel(tbl_name, False)});
+  save(@Body() {var_name}: {class_name}Dto) {{
+    return this.{var_name}Service.save({var_name});
   }}
   @Delete(':id')
   @HttpCode(HttpStatus.OK)
@@ -216,34 +203,47 @@ export class {snake_to_camel(tbl_name)}Controller {{
   @ApiResponse({{ status: HttpStatus.NOT_FOUND, description: 'Item not found' }})
   @ApiResponse({{ status: HttpStatus.OK, description: 'Deleted' }})
   delete(@Param('id') id: number) {{
-    return this.{snake_to_camel(tbl_name, False)}Service.delete(id);
+    return this.{var_name}Service.delete(id);
   }}
-}}"""
-    file_path = os.path.join('dist', 'api', snake_to_dash(tbl_name), f'{snake_to_dash(tbl_name)}.controller.ts')
-    os.makedirs(os.path.join('dist', 'api', snake_to_dash(tbl_name)), exist_ok=True)
-    with open(file_path, 'w') as file:
-        file.write(ts_controller)
+{bulk_endpoints}{export_endpoint}}}""")
 
+# Batch endpoints, with bulk option
+CONTROLLER_BULK_TEMPLATE = register('rest/controller_bulk', """  @Post('bulk')
+  @HttpCode(HttpStatus.OK)
+  @ApiResponse({{ status: HttpStatus.INTERNAL_SERVER_ERROR, description: 'Database error' }})
+  @ApiResponse({{ status: HttpStatus.FORBIDDEN, description: 'Invalid credentials' }})
+  @ApiResponse({{ status: HttpStatus.BAD_REQUEST, description: 'Batch not saved, all or nothing: database error of any item (constraint, type) rolls back whole batch, index (from 0) of the failing item is returned with the error' }})
+  @ApiResponse({{ status: HttpStatus.OK, description: 'Response with id and code of every item, only not existing items (404) are reported per item' }})
+  saveMany(@Body(new ParseArrayPipe({{ items: {class_name}Dto }})) items: {class_name}Dto[]) {{
+    return this.{var_name}Service.saveMany(items);
+  }}
+  @Post('bulk/delete')
+  @HttpCode(HttpStatus.OK)
+  @ApiResponse({{ status: HttpStatus.INTERNAL_SERVER_ERROR, description: 'Database error' }})
+  @ApiResponse({{ status: HttpStatus.FORBIDDEN, description: 'Invalid credentials' }})
+  @ApiResponse({{ status: HttpStatus.OK, description: 'Response with id and code of every item, item which cannot be deleted rolls back whole batch (403)' }})
+  deleteMany(@Body(new ParseArrayPipe({{ items: Number }})) ids: number[]) {{
+    return this.{var_name}Service.deleteMany(ids);
+  }}
+""")
 
-def generate_service(schema_name: str, tbl_name: str):
-    ts_service = f"""import {{ HttpException, Injectable }} from '@nestjs/common';
+SERVICE_TEMPLATE = register('rest/service', """import {{ HttpException, Injectable }} from '@nestjs/common';
 import {{ Observable }} from 'rxjs';
-import {{ {snake_to_camel(tbl_name)}Dto }} from './dto/{snake_to_dash(tbl_name)}.dto';
-import {{ {snake_to_camel(tbl_name)}ListResponseDto }} from './dto/{snake_to_dash(tbl_name)}-list-response.dto';
+import {{ {class_name}Dto }} from './dto/{dash_name}.dto';
+import {{ {class_name}ListResponseDto }} from './dto/{dash_name}-list-response.dto';
 import {{ ListFilterRequestDto }} from '../shared/dto/list-filter-request.dto';
 import {{ DatabaseWorker }} from '../shared/db.worker.service';
 import {{ AppLogger }} from '../shared/app-logger';
-@Injectable()
-export class {snake_to_camel(tbl_name)}Service {{
+{export_import}{read_import}@Injectable()
+export class {class_name}Service {{
   constructor(
     private worker: DatabaseWorker,
     private logger: AppLogger,
   ) {{
-    this.logger.setContext('{snake_to_camel(tbl_name)}Service');
-  }}"""
-    ts_service += f"""list(filter: ListFilterRequestDto): Observable< {snake_to_camel(tbl_name)}ListResponseDto > {{
-    return new Observable<{snake_to_camel(tbl_name)}ListResponseDto>((observer) => {{
-      this.worker.query('SELECT {schema_name}.{tbl_name}_list($1)', [filter]).subscribe({{
+    this.logger.setContext('{class_name}Service');
+  }}{list_name}(filter: ListFilterRequestDto): Observable< {class_name}ListResponseDto > {{
+    return new Observable<{class_name}ListResponseDto>((observer) => {{
+      this.worker.query('SELECT {schema_name}.{tbl_name}_search($1)', [filter]).subscribe({{
         next: (response) => {{
           if (response.error) {{
             observer.error(new HttpException(response.error, response.code));
@@ -256,9 +256,9 @@ export class {snake_to_camel(tbl_name)}Service {{
       }});
     }});
   }} \n
-  save({snake_to_camel(tbl_name, False)}: {snake_to_camel(tbl_name)}Dto): Observable<any> {{
+  {save_name}({var_name}: {class_name}Dto): Observable<any> {{
     return new Observable<any>((observer) => {{
-      this.worker.query('SELECT {schema_name}.{tbl_name}_save($1)', [JSON.stringify({snake_to_camel(tbl_name, False)})]).subscribe({{
+      this.worker.query('SELECT {schema_name}.{tbl_name}_save($1)', [{save_param}]).subscribe({{
         next: (response) => {{
           if (response.error) {{
             observer.error(new HttpException(response.error, response.code));
@@ -271,7 +271,7 @@ export class {snake_to_camel(tbl_name)}Service {{
       }});
     }});
   }}
-  get(id: number): Observable<{snake_to_camel(tbl_name)}Dto> {{
+  {get_name}(id: number): Observable<{class_name}Dto> {{
     return new Observable((observer) => {{
       this.worker.query('SELECT {schema_name}.{tbl_name}_get($1)', [id]).subscribe({{
         next: (response) => {{
@@ -286,7 +286,7 @@ export class {snake_to_camel(tbl_name)}Service {{
       }});
     }});
   }} \n
-  delete(id: number) {{
+  {delete_name}(id: number) {{
     return new Observable((observer) => {{
       this.worker.query('SELECT {schema_name}.{tbl_name}_delete($1)', [id]).subscribe({{
         next: (response) => {{
@@ -301,45 +301,719 @@ export class {snake_to_camel(tbl_name)}Service {{
       }});
     }});
   }}
-}}"""
-    file_path = os.path.join('dist', 'api', snake_to_dash(tbl_name), f'{snake_to_dash(tbl_name)}.service.ts')
-    os.makedirs(os.path.join('dist', 'api', snake_to_dash(tbl_name)), exist_ok=True)
-    with open(file_path, 'w') as file:
-        file.write(ts_service)
+{wrapper_methods}{get_many_method}{bulk_methods}{export_method}}}""")
+
+SERVICE_BULK_TEMPLATE = register('rest/service_bulk', """  {save_many_name}(items: {class_name}Dto[]): Observable<any> {{
+    return new Observable<any>((observer) => {{
+      this.worker.query('SELECT {schema_name}.{tbl_name}_save_many($1::jsonb)', [JSON.stringify(items)]).subscribe({{
+        next: (response) => {{
+          if (response.error) {{
+            observer.error(new HttpException(response.error, response.code));
+            return;
+          }}
+          observer.next(response);
+          observer.complete();
+        }},
+        error: (error) => observer.error(error),
+      }});
+    }});
+  }}
+  {delete_many_name}(ids: number[]): Observable<any> {{
+    return new Observable<any>((observer) => {{
+      this.worker.query('SELECT {schema_name}.{tbl_name}_delete_many($1::integer[])', [ids]).subscribe({{
+        next: (response) => {{
+          if (response.error) {{
+            observer.error(new HttpException(response.error, response.code));
+            return;
+          }}
+          observer.next(response);
+          observer.complete();
+        }},
+        error: (error) => observer.error(error),
+      }});
+    }});
+  }}
+{cache_bulk_methods}""")
 
+# Conditional requests, with etag option: _etag of function response is sent as ETag header
+CONTROLLER_ETAG_IMPORT_TEMPLATE = register('rest/controller_etag_import', """import {{ EtagInterceptor }} from '../shared/etag.interceptor';
+""")
 
-def generate_module(schema_name: str, tbl_name: str):
-    ts_module = f"""import {{ Module }} from '@nestjs/common';
+CONTROLLER_ETAG_DECORATORS_TEMPLATE = register('rest/controller_etag_decorators', """  @ApiResponse({{ status: HttpStatus.NOT_MODIFIED, description: 'Not modified, If-None-Match matches ETag' }})
+  @UseInterceptors(EtagInterceptor)
+""")
+
+# _etag of response body is removed and sent as ETag header, matching If-None-Match gets 304 without body
+ETAG_INTERCEPTOR_TEMPLATE = register('rest/etag_interceptor', """import {{ CallHandler, ExecutionContext, HttpException, HttpStatus, Injectable, NestInterceptor }} from '@nestjs/common';
+import {{ Request, Response }} from 'express';
+import {{ Observable }} from 'rxjs';
+import {{ map }} from 'rxjs/operators';
+
+function matches(ifNoneMatch: string | undefined, etag: string): boolean {{
+  if (!ifNoneMatch) {{
+    return false;
+  }}
+  return ifNoneMatch.split(',').some((item) => {{
+    const tag = item.trim().replace(/^W\\//, '');
+    return tag === '*' || tag === etag;
+  }});
+}}
+
+@Injectable()
+export class EtagInterceptor implements NestInterceptor {{
+  intercept(context: ExecutionContext, next: CallHandler): Observable<unknown> {{
+    const http = context.switchToHttp();
+    const request = http.getRequest<Request>();
+    const response = http.getResponse<Response>();
+    return next.handle().pipe(map((body) => {{
+      if (!body || typeof body !== 'object' || typeof body._etag !== 'string') {{
+        return body;
+      }}
+      const {{ _etag, ...result }} = body;
+      const etag = `"${{_etag}}"`;
+      response.setHeader('ETag', etag);
+      if (matches(request.headers['if-none-match'], etag)) {{
+        // Status set on response would be replaced by @HttpCode of route (POST list), status of exception is
+        // kept for GET and POST. Express sends 304 without body, ETag header stays
+        throw new HttpException('Not Modified', HttpStatus.NOT_MODIFIED);
+      }}
+      return result;
+    }}));
+  }}
+}}
+""")
+
+# Read-through cache of get and list (cache option) and coalescing of concurrent identical reads (coalesce
+# option). Queries of database are renamed to query<Method>, public methods with original names read cache
+# first, then one query shared by identical reads in flight. Writes invalidate the item and all lists of table
+SERVICE_READ_TEMPLATE = register('rest/service_read', """  list(filter: ListFilterRequestDto): Observable<{class_name}ListResponseDto> {{
+    return {list_read};
+  }}
+  get(id: number): Observable<{class_name}Dto> {{
+    return {get_read};
+  }}
+""")
+
+SERVICE_COALESCE_IMPORT_TEMPLATE = register('rest/service_coalesce_import', """import {{ coalescedGet, coalescedList }} from '../shared/single-flight';
+""")
+
+SERVICE_CACHE_IMPORT_TEMPLATE = register('rest/service_cache_import', """import {{ cachedGet, cachedList, invalidateAfter }} from '../shared/response-cache';
+""")
+
+SERVICE_CACHE_TEMPLATE = register('rest/service_cache', """  save({var_name}: {class_name}Dto): Observable<any> {{
+    return invalidateAfter('{schema_name}.{tbl_name}', [{var_name}.{pk}], this.querySave({var_name}));
+  }}
+  delete(id: number): Observable<unknown> {{
+    return invalidateAfter('{schema_name}.{tbl_name}', [id], this.queryDelete(id));
+  }}
+""")
+
+SERVICE_CACHE_BULK_TEMPLATE = register('rest/service_cache_bulk', """  saveMany(items: {class_name}Dto[]): Observable<any> {{
+    return invalidateAfter('{schema_name}.{tbl_name}', items.map((item) => item.{pk}), this.querySaveMany(items));
+  }}
+  deleteMany(ids: number[]): Observable<any> {{
+    return invalidateAfter('{schema_name}.{tbl_name}', ids, this.queryDeleteMany(ids));
+  }}
+""")
+
+# Cache shared by all services of process: keys <schema>.<table>:get:<id> and
+# <schema>.<table>:list:<version>:<hash of filter>, writes delete item and increment version of table lists
+RESPONSE_CACHE_TEMPLATE = register('rest/response_cache', """import {{ from, Observable, of }} from 'rxjs';
+import {{ catchError, concatMap, map, switchMap, tap }} from 'rxjs/operators';
+import {{ filterHash }} from './filter-hash';
+{store_import}
+export interface ResponseCache {{
+  get(key: string): Promise<string | undefined>;
+  set(key: string, value: string): Promise<void>;
+  delete(key: string): Promise<void>;
+  // Version of table lists, increment makes all cached lists of table obsolete
+  version(table: string): Promise<number>;
+  invalidate(table: string): Promise<void>;
+}}
+
+const CACHE_TTL = Number(process.env.CACHE_TTL ?? {cache_ttl});
+{store}
+// Response from cache or loaded and stored, unavailable cache is skipped
+function cached<T>(key: Promise<string>, load: () => Observable<T>): Observable<T> {{
+  return from(key.then(async (cacheKey) => ({{ cacheKey, value: await responseCache.get(cacheKey) }}))).pipe(
+    catchError(() => of({{ cacheKey: undefined, value: undefined }})),
+    switchMap(({{ cacheKey, value }}) => {{
+      if (value !== undefined) {{
+        return of(JSON.parse(value) as T);
+      }}
+      return load().pipe(tap((response) => {{
+        if (cacheKey !== undefined) {{
+          responseCache.set(cacheKey, JSON.stringify(response)).catch(() => undefined);
+        }}
+      }}));
+    }}),
+  );
+}}
+
+export function cachedGet<T>(table: string, id: number, load: () => Observable<T>): Observable<T> {{
+  return cached(Promise.resolve(`${{table}}:get:${{id}}`), load);
+}}
+
+export function cachedList<T>(table: string, filter: object, load: () => Observable<T>): Observable<T> {{
+  return cached(responseCache.version(table).then((version) => `${{table}}:list:${{version}}:${{filterHash(filter)}}`), load);
+}}
+
+// After successful write, items (ids > 0) and lists of table are invalidated. When cache is unavailable entries
+// expire after CACHE_TTL seconds
+export function invalidateAfter<T>(table: string, ids: number[], write: Observable<T>): Observable<T> {{
+  return write.pipe(concatMap((response) => from(
+    Promise.all([
+      ...ids.filter((id) => id > 0).map((id) => responseCache.delete(`${{table}}:get:${{id}}`)),
+      responseCache.invalidate(table),
+    ]).catch(() => undefined),
+  ).pipe(map(() => response))));
+}}
+""")
+
+# Key of list request: same filter in other key order or with other order of filter items has the same hash
+FILTER_HASH_TEMPLATE = register('rest/filter_hash', """import {{ createHash }} from 'crypto';
+
+function normalize(value: any): any {{
+  if (Array.isArray(value)) {{
+    return value.map(normalize);
+  }}
+  if (value && typeof value === 'object') {{
+    const result: Record<string, unknown> = {{}};
+    for (const key of Object.keys(value).sort()) {{
+      if (value[key] !== undefined) {{
+        result[key] = normalize(value[key]);
+      }}
+    }}
+    return result;
+  }}
+  return value;
+}}
+
+export function filterHash(filter: object): string {{
+  const normalized = normalize(filter);
+  if (Array.isArray(normalized.filter)) {{
+    normalized.filter = normalized.filter.map((item) => JSON.stringify(item)).sort();
+  }}
+  return createHash('sha1').update(JSON.stringify(normalized)).digest('hex');
+}}
+""")
+
+# Identical reads in flight share one query: first call subscribes to the query, calls with the same key
+# during the query get its result, key is removed when the query completes, fails or all callers unsubscribe
+SINGLE_FLIGHT_TEMPLATE = register('rest/single_flight', """import {{ defer, Observable }} from 'rxjs';
+import {{ finalize, share }} from 'rxjs/operators';
+import {{ filterHash }} from './filter-hash';
+
+const inFlight = new Map<string, Observable<unknown>>();
+
+export function singleFlight<T>(key: string, load: () => Observable<T>): Observable<T> {{
+  return defer(() => {{
+    let shared = inFlight.get(key) as Observable<T> | undefined;
+    if (shared === undefined) {{
+      shared = load().pipe(finalize(() => inFlight.delete(key)), share());
+      inFlight.set(key, shared);
+    }}
+    return shared;
+  }});
+}}
+
+export function coalescedGet<T>(table: string, id: number, load: () => Observable<T>): Observable<T> {{
+  return singleFlight(`${{table}}:get:${{id}}`, load);
+}}
+
+export function coalescedList<T>(table: string, filter: object, load: () => Observable<T>): Observable<T> {{
+  return singleFlight(`${{table}}:list:${{filterHash(filter)}}`, load);
+}}
+""")
+
+# In-process LRU, entries over CACHE_SIZE remove least recently used
+RESPONSE_CACHE_MEMORY_TEMPLATE = register('rest/response_cache_memory', """
+const CACHE_SIZE = Number(process.env.CACHE_SIZE ?? {cache_size});
+
+export class MemoryCache implements ResponseCache {{
+  private entries = new Map<string, {{ value: string; expires: number }}>();
+  private versions = new Map<string, number>();
+
+  async get(key: string): Promise<string | undefined> {{
+    const entry = this.entries.get(key);
+    if (entry === undefined) {{
+      return undefined;
+    }}
+    this.entries.delete(key);
+    if (entry.expires < Date.now()) {{
+      return undefined;
+    }}
+    // Map keeps insertion order, last used entry is moved to the end
+    this.entries.set(key, entry);
+    return entry.value;
+  }}
+
+  async set(key: string, value: string): Promise<void> {{
+    this.entries.delete(key);
+    this.entries.set(key, {{ value, expires: Date.now() + CACHE_TTL * 1000 }});
+    if (this.entries.size > CACHE_SIZE) {{
+      this.entries.delete(this.entries.keys().next().value as string);
+    }}
+  }}
+
+  async delete(key: string): Promise<void> {{
+    this.entries.delete(key);
+  }}
+
+  async version(table: string): Promise<number> {{
+    return this.versions.get(table) ?? 0;
+  }}
+
+  async invalidate(table: string): Promise<void> {{
+    this.versions.set(table, (this.versions.get(table) ?? 0) + 1);
+  }}
+}}
+
+export const responseCache: ResponseCache = new MemoryCache();
+""")
+
+# Redis or compatible server (REDIS_URL), shared by all processes
+RESPONSE_CACHE_REDIS_TEMPLATE = register('rest/response_cache_redis', """
+export class RedisCache implements ResponseCache {{
+  constructor(private redis: Redis) {{}}
+
+  async get(key: string): Promise<string | undefined> {{
+    return (await this.redis.get(key)) ?? undefined;
+  }}
+
+  async set(key: string, value: string): Promise<void> {{
+    await this.redis.set(key, value, 'EX', CACHE_TTL);
+  }}
+
+  async delete(key: string): Promise<void> {{
+    await this.redis.del(key);
+  }}
+
+  async version(table: string): Promise<number> {{
+    return Number((await this.redis.get(`${{table}}:version`)) ?? 0);
+  }}
+
+  async invalidate(table: string): Promise<void> {{
+    await this.redis.incr(`${{table}}:version`);
+  }}
+}}
+
+export const responseCache: ResponseCache = new RedisCache(new Redis(process.env.REDIS_URL ?? 'redis://localhost:6379'));
+""")
+
+# Streaming export, with export option
+CONTROLLER_EXPORT_IMPORT_TEMPLATE = register('rest/controller_export_import', """import {{ Response }} from 'express';
+import {{ pipeline }} from 'stream';
+import {{ FilterItemDto }} from '../shared/dto/filter-item.dto';
+""")
+
+# Closed connection of client destroys the stream, cursor is closed and database connection released
+CONTROLLER_EXPORT_TEMPLATE = register('rest/controller_export', """  @Post('export')
+  @HttpCode(HttpStatus.OK)
+  @ApiResponse({{ status: HttpStatus.INTERNAL_SERVER_ERROR, description: 'Database error' }})
+  @ApiResponse({{ status: HttpStatus.FORBIDDEN, description: 'Invalid credentials' }})
+  @ApiResponse({{ status: HttpStatus.TOO_MANY_REQUESTS, description: 'Too many requests' }})
+  @ApiResponse({{ status: HttpStatus.OK, description: 'Rows matching filter, NDJSON or CSV (?format=csv) stream' }})
+  export(
+    @Body(new ParseArrayPipe({{ items: FilterItemDto }})) filter: FilterItemDto[],
+    @Query('format') format: string,
+    @Res() response: Response,
+  ): void {{
+    const csv = format === 'csv';
+    response.setHeader('Content-Type', csv ? 'text/csv' : 'application/x-ndjson');
+    response.setHeader('Content-Disposition', `attachment; filename="{tbl_name}.${{csv ? 'csv' : 'ndjson'}}"`);
+    pipeline(this.{var_name}Service.export(filter, csv ? 'csv' : 'ndjson'), response, () => undefined);
+  }}
+""")
+
+SERVICE_EXPORT_IMPORT_TEMPLATE = register('rest/service_export_import', """import {{ Readable }} from 'stream';
+import {{ FilterItemDto }} from '../shared/dto/filter-item.dto';
+import {{ ExportFormat, exportRows }} from '../shared/export-stream';
+""")
+
+SERVICE_EXPORT_TEMPLATE = register('rest/service_export', """  export(filter: FilterItemDto[], format: ExportFormat): Readable {{
+    return exportRows('SELECT * FROM {schema_name}.{tbl_name}_export($1)', [{export_param}],
+      [{columns}], format);
+  }}
+""")
+
+# Rows of query read by cursor (pg-query-stream) and written as NDJSON or CSV lines, memory does not depend on
+# number of rows. Pool of export connections is separate from DatabaseWorker, configured by PG* variables
+EXPORT_STREAM_TEMPLATE = register('rest/export_stream', """import {{ Pool }} from 'pg';
+import QueryStream from 'pg-query-stream';
+import {{ pipeline, Readable, Transform }} from 'stream';
+
+export type ExportFormat = 'ndjson' | 'csv';
+
+const BATCH_SIZE = 1000;
+
+let pool: Pool;
+
+function csvValue(value: unknown): string {{
+  if (value === null || value === undefined) {{
+    return '';
+  }}
+  const text = value instanceof Date ? value.toISOString() : String(value);
+  return /[",\\r\\n]/.test(text) ? '"' + text.replace(/"/g, '""') + '"' : text;
+}}
+
+export function exportRows(sql: string, params: unknown[], columns: string[], format: ExportFormat): Readable {{
+  pool = pool ?? new Pool({{ max: Number(process.env.EXPORT_POOL_SIZE ?? 4) }});
+  let header = format === 'csv';
+  const output = new Transform({{
+    writableObjectMode: true,
+    transform(row, encoding, callback) {{
+      let line = '';
+      if (header) {{
+        line = columns.join(',') + '\\n';
+        header = false;
+      }}
+      if (format === 'csv') {{
+        line += columns.map((column) => csvValue(row[column])).join(',') + '\\n';
+      }} else {{
+        line += JSON.stringify(row) + '\\n';
+      }}
+      callback(null, line);
+    }},
+    flush(callback) {{
+      callback(null, header ? columns.join(',') + '\\n' : undefined);
+    }},
+  }});
+  pool.connect().then(
+    (client) => {{
+      const rows = client.query(new QueryStream(sql, params, {{ batchSize: BATCH_SIZE }}));
+      // Connection of interrupted export is closed, not returned to pool
+      pipeline(rows, output, (error) => client.release(error ?? undefined));
+    }},
+    (error) => output.destroy(error),
+  );
+  return output;
+}}
+""")
+
+# Batching of get(id), with loader option
+SERVICE_GET_MANY_TEMPLATE = register('rest/service_get_many', """  getMany(ids: number[]): Observable<{class_name}Dto[]> {{
+    return new Observable<{class_name}Dto[]>((observer) => {{
+      this.worker.query('SELECT {schema_name}.{tbl_name}_get_many($1::integer[])', [ids]).subscribe({{
+        next: (response) => {{
+          if (response.error) {{
+            observer.error(new HttpException(response.error, response.code));
+            return;
+          }}
+          observer.next(response.data);
+          observer.complete();
+        }},
+        error: (error) => observer.error(error),
+      }});
+    }});
+  }}
+""")
+
+# One loader per request: load(id) calls of one tick are read by one getMany, results are cached for the request
+LOADER_TEMPLATE = register('rest/loader', """import {{ Injectable, NotFoundException, Scope }} from '@nestjs/common';
+import DataLoader from 'dataloader';
+import {{ lastValueFrom }} from 'rxjs';
+import {{ {class_name}Dto }} from './dto/{dash_name}.dto';
+import {{ {class_name}Service }} from './{dash_name}.service';
+
+@Injectable({{ scope: Scope.REQUEST }})
+export class {class_name}Loader {{
+  private loader = new DataLoader<number, {class_name}Dto>(async (ids) => {{
+    const rows = await lastValueFrom(this.{var_name}Service.getMany([...ids]));
+    const byId = new Map(rows.map((row) => [row.{pk}, row]));
+    return ids.map((id) => byId.get(id) ?? new NotFoundException('{title} do not exists'));
+  }});
+
+  constructor(
+    private {var_name}Service: {class_name}Service,
+  ) {{}}
+
+  load(id: number): Promise<{class_name}Dto> {{
+    return this.loader.load(Number(id));
+  }}
+
+  loadMany(ids: number[]): Promise<({class_name}Dto | Error)[]> {{
+    return this.loader.loadMany(ids.map(Number));
+  }}
+}}
+""")
+
+LOADER_IMPORT_TEMPLATE = register('rest/loader_import', """import {{ {class_name}Loader }} from './{dash_name}.loader';
+""")
+
+MODULE_TEMPLATE = register('rest/module', """import {{ Module }} from '@nestjs/common';
 import {{ SharedModule }} from '../shared/shared.module';
-import {{ {snake_to_camel(tbl_name)}Service }} from './{snake_to_dash(tbl_name)}.service';
-import {{ {snake_to_camel(tbl_name)}Controller }} from './{snake_to_dash(tbl_name)}.controller';
-@Module({{
+import {{ {class_name}Service }} from './{dash_name}.service';
+import {{ {class_name}Controller }} from './{dash_name}.controller';
+{loader_import}@Module({{
   imports: [SharedModule],
-  providers: [{snake_to_camel(tbl_name)}Service],
-  exports: [{snake_to_camel(tbl_name)}Service],
-  controllers: [{snake_to_camel(tbl_name)}Controller],
+  providers: [{class_name}Service{loader_provider}],
+  exports: [{class_name}Service{loader_provider}],
+  controllers: [{class_name}Controller],
 }})
-export class {snake_to_camel(tbl_name)}Module {{}}
-"""
-    file_path = os.path.join('dist', 'api', snake_to_dash(tbl_name), f'{snake_to_dash(tbl_name)}.module.ts')
-    os.makedirs(os.path.join('dist', 'api', snake_to_dash(tbl_name)), exist_ok=True)
-    with open(file_path, 'w') as file:
-        file.write(ts_module)
+export class {class_name}Module {{}}
+""")
 
 
-# Generate whole api
-def generate_nestjs_api(schema_name: str, tbl_name: str, field_array: List):
-    # Create module directory
-    generate_model_dto(schema_name, tbl_name, field_array)
+# Template fields common for table files
+def table_context(schema_name: str, tbl_name: str) -> dict:
+    return {
+        'schema_name': schema_name,
+        'tbl_name': tbl_name,
+        'class_name': snake_to_camel(tbl_name),
+        'var_name': snake_to_camel(tbl_name, False),
+        'dash_name': snake_to_dash(tbl_name),
+    }
+
+
+@timed
+def generate_model_dto_field(item: FieldDefinition) -> str:
+    # Set swagger decorators
+    ts_type = 'string'
+    if is_number(item):
+        ts_type = 'number'
+    if is_boolean(item):
+        ts_type = 'boolean'
+    decorators = []
+    if item['not_null'] is True:
+        decorators.append('   @IsNotEmpty()\n')
+    if is_number(item):
+        decorators.append('   @IsNumber()\n')
+    if is_string(item):
+        decorators.append('   @IsString()\n')
+    if item['not_null'] is not True and (is_number(item) or is_string(item)):
+        decorators.append('   @IsOptional()\n')
+    return render(MODEL_DTO_FIELD_TEMPLATE, decorators=''.join(decorators), description=item['description'],
+                  ts_type=ts_type, field=item["field"])
+
+
+# Cursor field of dto, only with keyset pagination
+def keyset_field(template: str) -> str:
+    if get_options().pagination == 'keyset':
+        return render(template)
+    return ''
+
+
+def count_description(count_strategy: str) -> str:
+    match count_strategy:
+        case 'estimated':
+            return 'Count is estimated by database planner'
+        case 'capped':
+            return f'Count is exact up to {get_options().count_cap} items, capped - {get_options().count_cap} or more'
+        case _:
+            return 'Count is exact'
+
+
+# Generate API NestJS templates
+@timed
+def generate_model_dto(schema_name: str, tbl_name: str, field_array: List[FieldDefinition]):
+    # model dto
+    ts_dto = render(MODEL_DTO_TEMPLATE, dto_name=f"{snake_to_camel(tbl_name)}Dto",
+                    fields=''.join(generate_model_dto_field(item) for item in field_array))
+    file_path = os.path.join('api', snake_to_dash(tbl_name), 'dto', f'{snake_to_dash(tbl_name)}.dto.ts')
+    write_file(file_path, ts_dto)
+
+
+# FilterItem.dto.ts - NestJS global definition
+@timed
+def generate_filter_item_dto():
+    # FilterItem Dto
+    ts_filter_dto = render(FILTER_ITEM_DTO_TEMPLATE)
+    file_path = os.path.join('api', 'shared', 'dto', 'filter-item.dto.ts')
+    write_file(file_path, ts_filter_dto)
+
+
+# ListFilterRequest.dto  - NestJS global definition
+@timed
+def generate_list_filter_request_dto():
+    ts_item = render(LIST_FILTER_REQUEST_DTO_TEMPLATE, after=keyset_field(LIST_FILTER_REQUEST_AFTER_TEMPLATE))
+    file_path = os.path.join('api', 'shared', 'dto', 'list-filter-request.dto.ts')
+    write_file(file_path, ts_item)
+
+
+# List Response Dto
+@timed
+def generate_list_response_dto(schema_name: str, tbl_name: str):
+    count_strategy = get_options().count_strategy(schema_name, tbl_name)
+    ts_list_response_dto = render(LIST_RESPONSE_DTO_TEMPLATE, after=keyset_field(LIST_RESPONSE_AFTER_TEMPLATE),
+                                  count_strategy=count_strategy,
+                                  count_description=count_description(count_strategy),
+                                  **table_context(schema_name, tbl_name))
+    file_path = os.path.join('api', snake_to_dash(tbl_name), 'dto', f'{snake_to_dash(tbl_name)}-list-response.dto.ts')
+    write_file(file_path, ts_list_response_dto)
+
+
+# Controller
+@timed
+def generate_controller(schema_name: str, tbl_name: str):
+    context = table_context(schema_name, tbl_name)
+    options = get_options()
+    extra_imports = ['ParseArrayPipe'] if options.bulk or options.export else []
+    if options.export:
+        extra_imports += ['Query', 'Res']
+    if options.etag:
+        extra_imports += ['UseInterceptors']
+    ts_controller = render(CONTROLLER_TEMPLATE,
+                           extra_imports=f'  {", ".join(extra_imports)},\n' if extra_imports else '',
+                           bulk_endpoints=render(CONTROLLER_BULK_TEMPLATE, **context) if options.bulk else '',
+                           export_import=render(CONTROLLER_EXPORT_IMPORT_TEMPLATE) if options.export else '',
+                           export_endpoint=render(CONTROLLER_EXPORT_TEMPLATE, **context) if options.export else '',
+                           etag_import=render(CONTROLLER_ETAG_IMPORT_TEMPLATE) if options.etag else '',
+                           etag_decorators=render(CONTROLLER_ETAG_DECORATORS_TEMPLATE) if options.etag else '',
+                           **context)
+    file_path = os.path.join('api', snake_to_dash(tbl_name), f'{snake_to_dash(tbl_name)}.controller.ts')
+    write_file(file_path, ts_controller)
 
+
+@timed
+def generate_service(schema_name: str, tbl_name: str, field_array: List):
+    context = table_context(schema_name, tbl_name)
+    options = get_options()
+    cache = options.cache != 'none'
+    table = f'{schema_name}.{tbl_name}'
+    # With cache or coalescing queries of database are renamed, wrapper methods have original names
+    wrapped = ['list', 'get'] if options.coalesce else []
+    if cache:
+        wrapped += ['list', 'get', 'save', 'delete', 'save_many', 'delete_many']
+    names = dict((f'{method}_name', f'query{snake_to_camel(method)}' if method in wrapped
+                  else snake_to_camel(method, False))
+                 for method in ['list', 'get', 'save', 'delete', 'save_many', 'delete_many'])
+    pk = field_array[0]['field']
+    cache_bulk_methods = render(SERVICE_CACHE_BULK_TEMPLATE, pk=pk, **context) if cache else ''
+    bulk_methods = render(SERVICE_BULK_TEMPLATE, cache_bulk_methods=cache_bulk_methods, **names, **context) \
+        if options.bulk else ''
+    read_import = ''
+    wrapper_methods = ''
+    if wrapped:
+        list_read, get_read = 'this.queryList(filter)', 'this.queryGet(id)'
+        if cache:
+            read_import += render(SERVICE_CACHE_IMPORT_TEMPLATE)
+            list_read = f"cachedList('{table}', filter, () => {list_read})"
+            get_read = f"cachedGet('{table}', id, () => {get_read})"
+        if options.coalesce:
+            read_import += render(SERVICE_COALESCE_IMPORT_TEMPLATE)
+            list_read = f"coalescedList('{table}', filter, () => {list_read})"
+            get_read = f"coalescedGet('{table}', id, () => {get_read})"
+        wrapper_methods = render(SERVICE_READ_TEMPLATE, list_read=list_read, get_read=get_read, **context)
+    if cache:
+        wrapper_methods += render(SERVICE_CACHE_TEMPLATE, pk=pk, **context)
+    export_import = ''
+    export_method = ''
+    if options.export:
+        # CSV columns in table order
+        columns = ', '.join(f"'{item['field']}'" for item in field_array)
+        export_import = render(SERVICE_EXPORT_IMPORT_TEMPLATE)
+        export_method = render(SERVICE_EXPORT_TEMPLATE, columns=columns,
+                               export_param='{ filter }' if options.jsonb else 'JSON.stringify({ filter })', **context)
+    get_many_method = render(SERVICE_GET_MANY_TEMPLATE, **context) if options.loader else ''
+    # jsonb parameter gets object, pg driver serializes it. Arrays are sent as PostgreSQL arrays by the driver,
+    # so items of save_many are still stringified
+    save_param = context['var_name'] if options.jsonb else f'JSON.stringify({context["var_name"]})'
+    ts_service = render(SERVICE_TEMPLATE, save_param=save_param, bulk_methods=bulk_methods,
+                        get_many_method=get_many_method, export_import=export_import,
+                        export_method=export_method, read_import=read_import, wrapper_methods=wrapper_methods,
+                        **names, **context)
+    file_path = os.path.join('api', snake_to_dash(tbl_name), f'{snake_to_dash(tbl_name)}.service.ts')
+    write_file(file_path, ts_service)
+
+
+@timed
+def generate_loader(schema_name: str, tbl_name: str, field_array: List):
+    ts_loader = render(LOADER_TEMPLATE, pk=field_array[0]['field'], title=tbl_name.capitalize(),
+                       **table_context(schema_name, tbl_name))
+    file_path = os.path.join('api', snake_to_dash(tbl_name), f'{snake_to_dash(tbl_name)}.loader.ts')
+    write_file(file_path, ts_loader)
+
+
+@timed
+def generate_module(schema_name: str, tbl_name: str):
+    context = table_context(schema_name, tbl_name)
+    loader = get_options().loader
+    ts_module = render(MODULE_TEMPLATE, loader_import=render(LOADER_IMPORT_TEMPLATE, **context) if loader else '',
+                       loader_provider=f', {context["class_name"]}Loader' if loader else '', **context)
+    file_path = os.path.join('api', snake_to_dash(tbl_name), f'{snake_to_dash(tbl_name)}.module.ts')
+    write_file(file_path, ts_module)
+
+
+@timed
+def generate_export_stream():
+    ts_export_stream = render(EXPORT_STREAM_TEMPLATE)
+    file_path = os.path.join('api', 'shared', 'export-stream.ts')
+    write_file(file_path, ts_export_stream)
+
+
+@timed
+def generate_etag_interceptor():
+    file_path = os.path.join('api', 'shared', 'etag.interceptor.ts')
+    write_file(file_path, render(ETAG_INTERCEPTOR_TEMPLATE))
+
+
+@timed
+def generate_filter_hash():
+    file_path = os.path.join('api', 'shared', 'filter-hash.ts')
+    write_file(file_path, render(FILTER_HASH_TEMPLATE))
+
+
+@timed
+def generate_single_flight():
+    file_path = os.path.join('api', 'shared', 'single-flight.ts')
+    write_file(file_path, render(SINGLE_FLIGHT_TEMPLATE))
+
+
+@timed
+def generate_response_cache():
+    options = get_options()
+    if options.cache == 'redis':
+        store_import = "import Redis from 'ioredis';\n"
+        store = render(RESPONSE_CACHE_REDIS_TEMPLATE)
+    else:
+        store_import = ''
+        store = render(RESPONSE_CACHE_MEMORY_TEMPLATE, cache_size=options.cache_size)
+    ts_response_cache = render(RESPONSE_CACHE_TEMPLATE, store_import=store_import, store=store,
+                               cache_ttl=options.cache_ttl)
+    file_path = os.path.join('api', 'shared', 'response-cache.ts')
+    write_file(file_path, ts_response_cache)
+
+
+# Shared dto used by every table module, in batch mode generated once
+@timed
+def generate_nestjs_shared():
     generate_filter_item_dto()
 
     generate_list_filter_request_dto()
 
+    if get_options().export:
+        generate_export_stream()
+
+    if get_options().cache != 'none' or get_options().coalesce:
+        generate_filter_hash()
+
+    if get_options().cache != 'none':
+        generate_response_cache()
+
+    if get_options().coalesce:
+        generate_single_flight()
+
+    if get_options().etag:
+        generate_etag_interceptor()
+
+
+# Generate whole api
+@timed
+def generate_nestjs_api(schema_name: str, tbl_name: str, field_array: List, shared: bool = True):
+    # Create module directory
+    generate_model_dto(schema_name, tbl_name, field_array)
+
+    if shared:
+        generate_nestjs_shared()
+
     generate_list_response_dto(schema_name, tbl_name)
 
-    generate_service(schema_name, tbl_name)
+    generate_service(schema_name, tbl_name, field_array)
 
     generate_controller(schema_name, tbl_name)
 
+    if get_options().loader:
+        generate_loader(schema_name, tbl_name, field_array)
+
     generate_module(schema_name, tbl_name)
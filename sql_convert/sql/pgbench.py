@@ -0,0 +1,291 @@
+import os
+
+from constants import db_user, db_owner
+from sql_convert.common import is_string
+from sql_convert.includes.field_definition import FieldDefinition
+from sql_convert.options import get_options
+from sql_convert.output import write_file
+from sql_convert.profiling import timed
+from sql_convert.sql.pgsql import function_name, header
+from sql_convert.templates import register, render
+
+# pgbench workload of generated functions (--bench): dist/bench/<schema>.<table>_<function>.pgbench scripts,
+# seed_<schema>.<table>.sql with synthetic rows and runner bench/run.py. Scripts read number of rows from
+# pgbench variable rows (-D rows=10000) set by runner.
+
+SEED_TEMPLATE = register('bench/seed', """{header}
+-- Synthetic rows of {schema_name}.{tbl_name} for pgbench: psql -v rows=10000 -f seed_{schema_name}.{tbl_name}.sql
+-- Table is created when not exists (types without length) and all rows are replaced
+CREATE SCHEMA IF NOT EXISTS {schema_name};
+{sequence}CREATE TABLE IF NOT EXISTS {schema_name}.{tbl_name} (
+{columns}
+);
+TRUNCATE {schema_name}.{tbl_name};
+INSERT INTO {schema_name}.{tbl_name} (
+{field_list}
+)
+SELECT
+{values}
+  FROM generate_series(1, :rows) i;
+{sequence_reset}ANALYZE {schema_name}.{tbl_name};
+""")
+
+SEED_SEQUENCE_TEMPLATE = register('bench/seed_sequence', """CREATE SEQUENCE IF NOT EXISTS {sequence_name};
+""")
+
+SEED_SEQUENCE_RESET_TEMPLATE = register('bench/seed_sequence_reset', """SELECT setval('{sequence_name}', :rows);
+""")
+
+GET_SCRIPT_TEMPLATE = register('bench/get', """-- {fnc_name} of random row
+\\set id random(1, :rows)
+SELECT {fnc_name}(:id);
+""")
+
+# Update of random row with random values, number of rows stays the same
+SAVE_SCRIPT_TEMPLATE = register('bench/save', """-- {fnc_name} of random row with random values
+\\set id random(1, :rows)
+SELECT {fnc_name}(json_build_object(
+    '{pk}', :id,
+{values}
+  )::{param_type});
+""")
+
+# Random page of rows filtered by random prefix of search column
+SEARCH_SCRIPT_TEMPLATE = register('bench/search', """-- {fnc_name}, random page filtered by random prefix
+\\set page random(0, 9)
+SELECT {fnc_name}(json_build_object(
+    'filter', {filter},
+    'sort', {sort},
+    'sort_direction', 'asc',
+    'page_size', 25,
+    'page_index', :page
+  )::{param_type});
+""")
+
+# Deleted row is restored by ROLLBACK, number of rows stays the same
+DELETE_SCRIPT_TEMPLATE = register('bench/delete', """-- {fnc_name} of random row, rolled back
+\\set id random(1, :rows)
+BEGIN;
+SELECT {fnc_name}(:id);
+ROLLBACK;
+""")
+
+RUNNER_TEMPLATE = register('bench/run', """# Generated by sql-convert.py
+# pgbench benchmark of generated functions: creates tables with synthetic rows (seed_*.sql), indexes and functions
+# (../sql), runs every *.pgbench script and prints TPS and latency percentiles.
+#   python bench/run.py [--rows 10000] [--time 10] [--clients 4] [--only get,search] [--json result.json]
+# Without --dsn throwaway PostgreSQL instance is created in temporary directory (initdb, pg_ctl, psql and pgbench
+# from PATH or --bin). Database given by --dsn should be throwaway too, seeded tables are truncated.
+import os
+import sys
+import json
+import glob
+import math
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SQL_DIR = os.path.join(os.path.dirname(BENCH_DIR), 'sql')
+
+ROLES = \"\"\"DO $$
+BEGIN
+  CREATE ROLE {db_owner};
+EXCEPTION WHEN duplicate_object THEN NULL;
+END $$;
+DO $$
+BEGIN
+  CREATE ROLE {db_user};
+EXCEPTION WHEN duplicate_object THEN NULL;
+END $$;
+\"\"\"
+
+
+def tool(args, name):
+    return os.path.join(args.bin, name) if args.bin else name
+
+
+def psql(args, dsn, file_path=None, command=None):
+    call = [tool(args, 'psql'), '-X', '-q', '-v', 'ON_ERROR_STOP=1', '-v', 'rows=' + str(args.rows), '-d', dsn]
+    call += ['-f', file_path] if file_path else ['-c', command]
+    subprocess.run(call, check=True, stdout=subprocess.DEVNULL)
+
+
+def start_instance(args, directory):
+    data = os.path.join(directory, 'data')
+    subprocess.run([tool(args, 'initdb'), '-D', data, '-U', 'postgres', '-A', 'trust', '-E', 'UTF8'],
+                   check=True, stdout=subprocess.DEVNULL)
+    subprocess.run([tool(args, 'pg_ctl'), '-D', data, '-l', os.path.join(directory, 'server.log'), '-w',
+                    '-o', f"-k {{directory}} -c listen_addresses='' -c max_connections=200", 'start'],
+                   check=True, stdout=subprocess.DEVNULL)
+    return data, f'host={{directory}} user=postgres dbname=postgres'
+
+
+def percentile(latencies, percent):
+    return latencies[max(math.ceil(len(latencies) * percent / 100) - 1, 0)]
+
+
+def run_script(args, dsn, script, directory):
+    prefix = os.path.join(directory, 'log')
+    for file_path in glob.glob(prefix + '*'):
+        os.remove(file_path)
+    output = subprocess.run([tool(args, 'pgbench'), '-n', '-f', script, '-D', 'rows=' + str(args.rows),
+                             '-T', str(args.time), '-c', str(args.clients), '-j', str(args.clients),
+                             '--log', '--log-prefix', prefix, dsn],
+                            check=True, capture_output=True, text=True, cwd=directory).stdout
+    tps = next(float(line.split()[2]) for line in output.splitlines() if line.startswith('tps = '))
+    # Per transaction log: client, transaction, latency in microseconds, script, epoch, microseconds
+    latencies = []
+    for file_path in glob.glob(prefix + '*'):
+        with open(file_path) as file:
+            latencies += [int(line.split()[2]) / 1000 for line in file if line.strip()]
+    latencies.sort()
+    return dict(tps=tps, transactions=len(latencies), avg=sum(latencies) / max(len(latencies), 1),
+                p50=percentile(latencies, 50), p95=percentile(latencies, 95), p99=percentile(latencies, 99))
+
+
+def main():
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--dsn', help='Connection string of throwaway database, default creates new instance')
+    parser.add_argument('--bin', help='Directory of PostgreSQL programs')
+    parser.add_argument('--rows', type=int, default=10000, help='Rows of every table')
+    parser.add_argument('--time', type=int, default=10, help='Seconds of every script')
+    parser.add_argument('--clients', type=int, default=4, help='Concurrent pgbench clients')
+    parser.add_argument('--only', help='Comma separated functions, for example get,search')
+    parser.add_argument('--json', help='Write results into JSON file')
+    args = parser.parse_args()
+
+    scripts = sorted(glob.glob(os.path.join(BENCH_DIR, '*.pgbench')))
+    if args.only:
+        functions = args.only.split(',')
+        scripts = [script for script in scripts if script[:-len('.pgbench')].rsplit('_', 1)[-1] in functions]
+
+    directory = tempfile.mkdtemp(prefix='sql_convert_bench_')
+    data = None
+    try:
+        dsn = args.dsn
+        if dsn is None:
+            data, dsn = start_instance(args, directory)
+        psql(args, dsn, command=ROLES)
+        for pattern in [os.path.join(BENCH_DIR, 'seed_*.sql'), os.path.join(SQL_DIR, 'idx_*.sql'),
+                        os.path.join(SQL_DIR, 'fnc_*.sql')]:
+            for file_path in sorted(glob.glob(pattern)):
+                psql(args, dsn, file_path=file_path)
+
+        results = dict()
+        print(f'{{"script":<40}}{{"tps":>10}}{{"avg ms":>10}}{{"p50 ms":>10}}{{"p95 ms":>10}}{{"p99 ms":>10}}')
+        for script in scripts:
+            name = os.path.basename(script)[:-len('.pgbench')]
+            result = results[name] = run_script(args, dsn, script, directory)
+            print(f'{{name:<40}}{{result["tps"]:>10.1f}}{{result["avg"]:>10.3f}}{{result["p50"]:>10.3f}}'
+                  f'{{result["p95"]:>10.3f}}{{result["p99"]:>10.3f}}')
+        if args.json:
+            with open(args.json, 'w') as file:
+                json.dump(dict(rows=args.rows, time=args.time, clients=args.clients, results=results), file, indent=2)
+    except subprocess.CalledProcessError as e:
+        print(f'{{" ".join(e.cmd)}} failed: {{e.stderr or ""}}')
+        sys.exit(-1)
+    finally:
+        if data is not None:
+            subprocess.run([tool(args, 'pg_ctl'), '-D', data, '-m', 'fast', '-w', 'stop'], stdout=subprocess.DEVNULL)
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
+""")
+
+# Random value of column type in SQL, types not listed are NULL
+RANDOM_VALUES = {
+    'INT2': '(random() * 32000)::integer',
+    'SMALLINT': '(random() * 32000)::integer',
+    'INT4': '(random() * 1000000)::integer',
+    'INT': '(random() * 1000000)::integer',
+    'INTEGER': '(random() * 1000000)::integer',
+    'INT8': '(random() * 1000000000)::bigint',
+    'BIGINT': '(random() * 1000000000)::bigint',
+    'NUMERIC': 'round((random() * 10000)::numeric, 2)',
+    'FLOAT4': 'random() * 10000',
+    'FLOAT8': 'random() * 10000',
+    'VARCHAR': 'substr(md5(random()::text), 1, 12)',
+    'BPCHAR': 'substr(md5(random()::text), 1, 12)',
+    'TEXT': 'substr(md5(random()::text), 1, 12)',
+    'BOOL': 'random() < 0.5',
+    'BOOLEAN': 'random() < 0.5',
+    'DATE': 'current_date - (random() * 3650)::integer',
+    'TIMESTAMP': "now() - random() * interval '3650 days'",
+    'TIMESTAMPTZ': "now() - random() * interval '3650 days'",
+    'UUID': 'md5(random()::text)::uuid',
+}
+
+
+def random_value(item: FieldDefinition) -> str:
+    return RANDOM_VALUES.get(item['type'].upper(), 'NULL')
+
+
+def seed_column(item: FieldDefinition, pk: bool, sequence_name: str) -> str:
+    column = f'  {item["field"]} {item["type"].lower()}'
+    if pk:
+        column += ' PRIMARY KEY'
+        if sequence_name:
+            column += f" DEFAULT nextval('{sequence_name}'::regclass)"
+    elif item['not_null']:
+        column += ' NOT NULL'
+    return column
+
+
+@timed
+def generate_seed(schema_name: str, tbl_name: str, sequence_name: str, field_array: list):
+    context = dict(header=header, schema_name=schema_name, tbl_name=tbl_name, sequence_name=sequence_name)
+    sequence = render(SEED_SEQUENCE_TEMPLATE, **context) if sequence_name else ''
+    sequence_reset = render(SEED_SEQUENCE_RESET_TEMPLATE, **context) if sequence_name else ''
+    columns = ',\n'.join(seed_column(item, position == 0, sequence_name) for position, item in enumerate(field_array))
+    # Primary key is row number, scripts use random ids from 1 to rows
+    values = ',\n'.join(['       i'] + [f'       {random_value(item)}' for item in field_array[1:]])
+    sql_seed = render(SEED_TEMPLATE, sequence=sequence, sequence_reset=sequence_reset, columns=columns,
+                      field_list=',\n'.join(f'    {item["field"]}' for item in field_array), values=values, **context)
+    file_path = os.path.join('bench', f'seed_{schema_name}.{tbl_name}.sql')
+    write_file(file_path, sql_seed)
+
+
+@timed
+def generate_bench_scripts(schema_name: str, tbl_name: str, sequence_name: str, field_array: list):
+    pk = field_array[0]['field']
+    strings = [item['field'] for item in field_array if is_string(item)]
+    # Search column of list is second column, otherwise first text column
+    search_field = field_array[1]['field'] if len(field_array) > 1 and is_string(field_array[1]) \
+        else (strings[0] if strings else None)
+    if search_field:
+        search = dict(filter=f"json_build_array(json_build_object('field', '{search_field}', "
+                             f"'value', substr(md5(random()::text), 1, 2) || '%'))",
+                      sort=f"json_build_array('{search_field}')")
+    else:
+        search = dict(filter='json_build_array()', sort='json_build_array()')
+    save_values = ',\n'.join(f"    '{item['field']}', {random_value(item)}" for item in field_array[1:])
+    # Parameter of save and search, text is cast to character varying by function call
+    param_type = 'jsonb' if get_options().jsonb else 'text'
+
+    scripts = {
+        'get': render(GET_SCRIPT_TEMPLATE, fnc_name=function_name(schema_name, tbl_name, 'get')),
+        'save': render(SAVE_SCRIPT_TEMPLATE, fnc_name=function_name(schema_name, tbl_name, 'save'), pk=pk,
+                       values=save_values, param_type=param_type),
+        'search': render(SEARCH_SCRIPT_TEMPLATE, fnc_name=function_name(schema_name, tbl_name, 'search'),
+                         param_type=param_type, **search),
+        'delete': render(DELETE_SCRIPT_TEMPLATE, fnc_name=function_name(schema_name, tbl_name, 'delete')),
+    }
+    for name, script in scripts.items():
+        write_file(os.path.join('bench', f'{schema_name}.{tbl_name}_{name}.pgbench'), script)
+
+
+@timed
+def generate_bench(schema_name: str, tbl_name: str, sequence_name: str, field_array: list):
+    generate_seed(schema_name, tbl_name, sequence_name, field_array)
+
+    generate_bench_scripts(schema_name, tbl_name, sequence_name, field_array)
+
+
+# Runner common for all tables
+@timed
+def generate_bench_runner():
+    write_file(os.path.join('bench', 'run.py'), render(RUNNER_TEMPLATE, db_owner=db_owner, db_user=db_user))
@@ -3,119 +3,66 @@ import os
 from constants import db_user, db_owner
 from sql_convert.includes.field_definition import FieldDefinition
 from sql_convert.common import is_string
+from sql_convert.options import get_options
+from sql_convert.output import write_file
+from sql_convert.profiling import timed
+from sql_convert.templates import register, render
 
 header = '-- Generated by sql-convert.py \n-- Library created by Potapenko<vp@nsg.ovh> \n'
 
-
-# SQL functions GET, DELETE, LIST, SAVE create
-def get_function_list(arr: list) -> str:
-    field_list = ''
-    for item in arr:
-        field_list += f'          {item["field"]},\n'
-    return field_list[0:-2]
-
-
-def get_field_array(arr: list) -> str:
-    result = ''
-    for item in arr:
-        if is_string(item):
-            if result != '':
-                result += ','
-            result += '"' + item["field"] + '"'
-    return result
-
-
-def sql_data(elem: FieldDefinition) -> str:
-    match elem['type']:
-        case 'BOOLEAN' | 'BOOL':
-            return f'COALESCE( cast( f_data->>' + elem['field'] + ' as boolean), true)'
-        case 'DATE' | 'TIMESTAMP' | 'TIMESTAMPZ' | 'INT4' | 'INT8' | 'INTEGER':
-            return f'CAST( f_data->>' + elem['field'] + ' as ${elem.type})'
-        case 'VARCHAR' | 'BPCHAR':
-            return 'f_data->>' + elem['field']
-        case _:
-            return 'f_data->>' + elem['field']
-
-
-def generate_get(schema_name: str, tbl_name: str, sequence_name: str, field_array: list):
-    # GET
-    get_fnc_name = f'{schema_name}.{tbl_name}_get'
-    if schema_name == 'public':
-        get_fnc_name = f'{tbl_name}_get'
-
-    sql_get = f"""{header}
-CREATE OR REPLACE FUNCTION {get_fnc_name}( a_id integer )
-  RETURNS TEXT AS
+GET_TEMPLATE = register('sql/get', """{header}
+CREATE OR REPLACE FUNCTION {fnc_name}( a_id integer )
+  RETURNS {result_type} AS
 $BODY$
+DECLARE
+  f_result jsonb;
 BEGIN
-  PERFORM 1 FROM {schema_name}.{tbl_name} WHERE {field_array[0]["field"]} = a_id;
-  IF NOT FOUND THEN
-    RETURN jsonb_build_object('error', '{tbl_name.capitalize()} do not exists', 'code', 404);
-  END IF;
-  
-  RETURN to_jsonb( u ) FROM (
+  -- One index probe, not existing row is reported by FOUND
+  SELECT to_jsonb( u ) INTO f_result FROM (
     SELECT
-{get_function_list(field_array)} 
+{field_list} 
      FROM {schema_name}.{tbl_name}
-    WHERE {field_array[0]["field"]} = a_id
+    WHERE {pk} = a_id
   ) as u;
+  IF NOT FOUND THEN
+    RETURN jsonb_build_object('error', '{title} do not exists', 'code', 404);
+  END IF;
+  
+  RETURN f_result{etag};
 END;
 $BODY$
-  LANGUAGE plpgsql VOLATILE
+  LANGUAGE plpgsql STABLE
                    COST 100;
-COMMENT ON FUNCTION {get_fnc_name}(integer) IS 'Get {tbl_name}';
-ALTER FUNCTION {get_fnc_name}(integer) OWNER TO {db_owner};
-GRANT EXECUTE ON FUNCTION {get_fnc_name}(integer) TO {db_user};"""
-    file_path = os.path.join('dist', 'sql', f'fnc_{get_fnc_name}.sql')
-    os.makedirs(os.path.join('dist', 'sql'), exist_ok=True)
-    with open(file_path, 'w') as file:
-        file.write(sql_get)
+COMMENT ON FUNCTION {fnc_name}(integer) IS 'Get {tbl_name}';
+ALTER FUNCTION {fnc_name}(integer) OWNER TO {db_owner};
+GRANT EXECUTE ON FUNCTION {fnc_name}(integer) TO {db_user};""")
 
-
-def generate_delete(schema_name: str, tbl_name: str, sequence_name: str, field_array: list):
-    # DELETE
-    del_fnc_name = f'{schema_name}.{tbl_name}_delete'
-    if schema_name == 'public':
-        del_fnc_name = f'{tbl_name}_delete'
-
-    sql_delete = f"""{header}
-CREATE OR REPLACE FUNCTION {del_fnc_name} ( a_id integer )
-  RETURNS TEXT AS
+DELETE_TEMPLATE = register('sql/delete', """{header}
+CREATE OR REPLACE FUNCTION {fnc_name} ( a_id integer )
+  RETURNS {result_type} AS
 $BODY$
 BEGIN
-  PERFORM 1 FROM {schema_name}.{tbl_name} WHERE {field_array[0]["field"]} = a_id;
-  IF NOT FOUND THEN
-    RETURN jsonb_build_object('error', '{tbl_name.capitalize()} do not exists', 'code', 404);
-  END IF;
-
   BEGIN
-    DELETE FROM {schema_name}.{tbl_name} WHERE {field_array[0]["field"]} = a_id;
+    DELETE FROM {schema_name}.{tbl_name} WHERE {pk} = a_id;
   EXCEPTION WHEN OTHERS THEN
-    RETURN jsonb_build_object('error', 'Cannot delete current {tbl_name.lower()}', 'code', 403);
+    RETURN jsonb_build_object('error', 'Cannot delete current {tbl_lower}', 'code', 403);
   END;
+  -- One statement, not existing row is reported by FOUND
+  IF NOT FOUND THEN
+    RETURN jsonb_build_object('error', '{title} do not exists', 'code', 404);
+  END IF;
   RETURN jsonb_build_object('code', 202 );
 END;
 $BODY$
   LANGUAGE plpgsql VOLATILE
                    COST 100;
-COMMENT ON FUNCTION {del_fnc_name}(integer) IS 'Delete {tbl_name}';
-ALTER FUNCTION {del_fnc_name}(integer) OWNER TO {db_owner};
-GRANT EXECUTE ON FUNCTION {del_fnc_name}(integer) TO {db_user};"""
-    file_path = os.path.join('dist', 'sql', f'fnc_{del_fnc_name}.sql')
-    os.makedirs(os.path.join('dist', 'sql'), exist_ok=True)
-    with open(file_path, 'w') as file:
-        file.write(sql_delete)
-
-
-def generate_search(schema_name: str, tbl_name: str, sequence_name: str, field_array: list):
-    # SEARCH
-    search_fnc_name = f'{schema_name}.{tbl_name}_search'
-    if schema_name == 'public':
-        search_fnc_name = f'{tbl_name}_search'
+COMMENT ON FUNCTION {fnc_name}(integer) IS 'Delete {tbl_name}';
+ALTER FUNCTION {fnc_name}(integer) OWNER TO {db_owner};
+GRANT EXECUTE ON FUNCTION {fnc_name}(integer) TO {db_user};""")
 
-    sql_search = f"""{header}
-CREATE OR  REPLACE FUNCTION {search_fnc_name}( a_filter character varying )
-  RETURNS TEXT AS
+SEARCH_TEMPLATE = register('sql/search', """{header}
+CREATE OR  REPLACE FUNCTION {fnc_name}( a_filter {json_type} )
+  RETURNS {result_type} AS
 $BODY$
 DECLARE
   f_request   jsonb;
@@ -126,13 +73,15 @@ DECLARE
   f_sort      varchar; -- "sort": ["login", "active"]
   f_sql       varchar;
   f_result    jsonb;
-  f_cnt       integer;
-  f_sql_where varchar;
+  f_rows      integer;
+  f_cnt       bigint;
+  f_cnt_type  varchar; -- exact/estimated/capped
+{count_variables}  f_sql_where varchar;
   f_sql_order varchar;
   f_valid_search_fields varchar[];
   f_filter_field_type varchar;
 BEGIN
-  f_valid_search_fields = '{{{get_field_array(field_array)}}}'::varchar[];
+  f_valid_search_fields = '{{{valid_fields}}}'::varchar[];
   f_request = CAST(a_filter as jsonb);
   f_p_size = (f_request->>'page_size')::integer;
   f_p_offset = (f_request->>'page_index')::integer * f_p_size;
@@ -147,12 +96,8 @@ BEGIN
     IF NOT CAST(f_filter->>'field' as varchar) = ANY (f_valid_search_fields) THEN
       RETURN jsonb_build_object('error','Wrong filter field', 'code', 400);
     END IF;
-    SELECT data_type
-      INTO f_filter_field_type
-      FROM information_schema.columns
-     WHERE table_name = '{tbl_name}'
-       AND table_schema = '{schema_name}'
-       AND column_name = CAST(f_filter->>'field' as varchar);
+    -- Column types are known at generation time, no catalog query
+    f_filter_field_type = {filter_field_type};
     IF f_filter_field_type = 'character varying' THEN
       f_sql_where = f_sql_where || ' AND upper(' || CAST(f_filter->>'field' as varchar) || ') LIKE ' || quote_literal(upper(f_filter->>'value'));
     ELSEIF f_filter_field_type = 'boolean' THEN
@@ -177,93 +122,768 @@ BEGIN
   IF (f_sql_order <> '') THEN
     f_sql_order = ' ORDER BY ' || f_sql_order || ' ' || f_order;
   END IF;
-   f_sql = format('SELECT COALESCE(to_jsonb(array_agg( {tbl_name[0]} )),''[]''::jsonb) FROM (
+   f_sql = format('SELECT COALESCE(jsonb_agg(to_jsonb( {alias} ) - ''f_total''),''[]''::jsonb), max( {alias}.f_total ) FROM (
     SELECT
-{get_function_list(field_array)}
+{field_list},
+          {total_column} AS f_total
     FROM {schema_name}.{tbl_name}
     WHERE TRUE %s
     %s
     LIMIT $1
     OFFSET $2
-  ) as {tbl_name[0]}', f_sql_where, f_sql_order);
-  EXECUTE f_sql INTO f_result USING f_p_size, f_p_offset;
-  SELECT COUNT(*) INTO f_cnt FROM jsonb_array_elements(f_result);
-  RETURN jsonb_build_object('data', f_result, 'cnt', f_cnt);
+  ) as {alias}', f_sql_where, f_sql_order);
+  EXECUTE f_sql INTO f_result, f_cnt USING f_p_size, f_p_offset;
+  f_rows = jsonb_array_length(f_result);
+{count}
+  RETURN jsonb_build_object('data', f_result, 'cnt', f_cnt, 'cnt_type', f_cnt_type{etag});
+END;
+$BODY$
+  LANGUAGE plpgsql {volatility}
+                   COST 100;
+COMMENT ON FUNCTION {fnc_name}({json_type}) IS '{title} list';
+ALTER FUNCTION {fnc_name}({json_type}) OWNER TO {db_owner};
+GRANT EXECUTE ON FUNCTION {fnc_name}({json_type}) TO {db_user};""")
+
+# Bulk save of JSON array in one statement: rows are read by jsonb_populate_recordset, existing rows
+# (id > 0) are updated by UPDATE ... FROM, new rows get ids from sequence and are inserted by INSERT ... SELECT.
+# Result has id and code of every row in input order, rows not found are not saved (404). Batch is all or nothing,
+# database error of any row rolls back all rows. Rows are then saved again one by one in block which is always
+# rolled back, so error tells index (from 0) of the first failing row, index is null when the error is not repeated
+SAVE_MANY_TEMPLATE = register('sql/save_many', """{header}
+CREATE OR REPLACE FUNCTION {fnc_name}( a_data jsonb )
+    RETURNS {result_type} AS
+$BODY$
+DECLARE
+  f_result  jsonb;
+  f_error   text;
+  f_index   integer;
+BEGIN
+  IF jsonb_typeof(a_data) IS DISTINCT FROM 'array' THEN
+    RETURN jsonb_build_object('error', 'Array of {tbl_lower} expected', 'code', 400);
+  END IF;
+  WITH f_rows AS (
+    SELECT r.*,
+           COALESCE(r.{pk}, 0) > 0 AS f_update,
+           CASE WHEN COALESCE(r.{pk}, 0) > 0 THEN r.{pk} ELSE nextval('{sequence_name}'::regclass) END AS f_id
+      FROM jsonb_populate_recordset(NULL::{schema_name}.{tbl_name}, a_data) WITH ORDINALITY AS r
+  ), f_updated AS (
+    UPDATE {schema_name}.{tbl_name} AS t SET
+{update_set}
+      FROM f_rows AS r
+     WHERE r.f_update AND t.{pk} = r.f_id
+    RETURNING t.{pk}
+  ), f_inserted AS (
+    INSERT INTO {schema_name}.{tbl_name} (
+{field_list}
+    )
+    SELECT
+          r.f_id,
+{insert_values}
+      FROM f_rows AS r
+     WHERE NOT r.f_update
+     ORDER BY r.ordinality
+    RETURNING {pk}
+  )
+  SELECT COALESCE(jsonb_agg(
+           CASE WHEN r.f_update AND u.{pk} IS NULL
+             THEN jsonb_build_object('id', r.f_id, 'error', '{title} do not exists', 'code', 404)
+             ELSE jsonb_build_object('id', r.f_id, 'code', 200)
+           END ORDER BY r.ordinality), '[]'::jsonb)
+    INTO f_result
+    FROM f_rows AS r
+    LEFT JOIN f_updated AS u ON u.{pk} = r.f_id;
+  RETURN jsonb_build_object('data', f_result, 'code', 200);
+EXCEPTION WHEN OTHERS THEN
+  -- Whole batch is rolled back, rows are saved one by one to find the failing row
+  f_error := SQLERRM;
+  DECLARE
+    r  record;
+  BEGIN
+    FOR r IN SELECT s.*, s.ordinality - 1 AS f_index
+               FROM jsonb_populate_recordset(NULL::{schema_name}.{tbl_name}, a_data) WITH ORDINALITY AS s
+    LOOP
+      f_index := r.f_index;
+      IF COALESCE(r.{pk}, 0) > 0 THEN
+        UPDATE {schema_name}.{tbl_name} AS t SET
+{update_set}
+         WHERE t.{pk} = r.{pk};
+      ELSE
+        INSERT INTO {schema_name}.{tbl_name} (
+{field_list}
+        )
+        VALUES (
+          nextval('{sequence_name}'::regclass),
+{insert_values}
+        );
+      END IF;
+    END LOOP;
+    f_index := NULL;
+    -- All rows are saved, block is rolled back
+    RAISE EXCEPTION 'save_many check';
+  EXCEPTION WHEN OTHERS THEN
+    IF f_index IS NOT NULL THEN
+      f_error := SQLERRM;
+    END IF;
+  END;
+  RETURN jsonb_build_object('error', f_error, 'index', f_index, 'code', 400);
+END;
+$BODY$
+    LANGUAGE plpgsql VOLATILE
+                     COST 100;
+COMMENT ON FUNCTION {fnc_name}(jsonb) IS 'Save many {tbl_name}';
+ALTER FUNCTION {fnc_name}(jsonb) OWNER TO {db_owner};
+GRANT EXECUTE ON FUNCTION {fnc_name}(jsonb) TO {db_user};""")
+
+# Bulk delete by array of ids in one statement, result has code of every id in input order
+DELETE_MANY_TEMPLATE = register('sql/delete_many', """{header}
+CREATE OR REPLACE FUNCTION {fnc_name} ( a_ids integer[] )
+  RETURNS {result_type} AS
+$BODY$
+DECLARE
+  f_result  jsonb;
+BEGIN
+  WITH f_deleted AS (
+    DELETE FROM {schema_name}.{tbl_name} WHERE {pk} = ANY (a_ids) RETURNING {pk}
+  )
+  SELECT COALESCE(jsonb_agg(
+           CASE WHEN d.{pk} IS NULL
+             THEN jsonb_build_object('id', i.id, 'error', '{title} do not exists', 'code', 404)
+             ELSE jsonb_build_object('id', i.id, 'code', 202)
+           END ORDER BY i.n), '[]'::jsonb)
+    INTO f_result
+    FROM unnest(a_ids) WITH ORDINALITY AS i(id, n)
+    LEFT JOIN f_deleted AS d ON d.{pk} = i.id;
+  RETURN jsonb_build_object('data', f_result, 'code', 202);
+EXCEPTION WHEN OTHERS THEN
+  -- Whole batch is rolled back
+  RETURN jsonb_build_object('error', 'Cannot delete current {tbl_lower}', 'code', 403);
 END;
 $BODY$
   LANGUAGE plpgsql VOLATILE
                    COST 100;
-COMMENT ON FUNCTION {search_fnc_name}(character varying) IS '{tbl_name.capitalize()} list';
-ALTER FUNCTION {search_fnc_name}(character varying) OWNER TO {db_owner};
-GRANT EXECUTE ON FUNCTION {search_fnc_name}(character varying) TO {db_user};"""
-    file_path = os.path.join('dist', 'sql', f'fnc_{search_fnc_name}.sql')
-    os.makedirs(os.path.join('dist', 'sql'), exist_ok=True)
-    with open(file_path, 'w') as file:
-        file.write(sql_search)
+COMMENT ON FUNCTION {fnc_name}(integer[]) IS 'Delete many {tbl_name}';
+ALTER FUNCTION {fnc_name}(integer[]) OWNER TO {db_owner};
+GRANT EXECUTE ON FUNCTION {fnc_name}(integer[]) TO {db_user};""")
 
+# Rows of many ids in one index lookup, used by batching loader of NestJS. Not existing ids are missing in data
+GET_MANY_TEMPLATE = register('sql/get_many', """{header}
+CREATE OR REPLACE FUNCTION {fnc_name}( a_ids integer[] )
+  RETURNS {result_type} AS
+$BODY$
+BEGIN
+  RETURN jsonb_build_object('data', COALESCE(jsonb_agg(to_jsonb( u )), '[]'::jsonb), 'code', 200) FROM (
+    SELECT
+{field_list} 
+     FROM {schema_name}.{tbl_name}
+    WHERE {pk} = ANY (a_ids)
+  ) as u;
+END;
+$BODY$
+  LANGUAGE plpgsql STABLE
+                   COST 100;
+COMMENT ON FUNCTION {fnc_name}(integer[]) IS 'Get many {tbl_name}';
+ALTER FUNCTION {fnc_name}(integer[]) OWNER TO {db_owner};
+GRANT EXECUTE ON FUNCTION {fnc_name}(integer[]) TO {db_user};""")
 
-def generate_save(schema_name: str, tbl_name: str, sequence_name: str, field_array: list):
-    # SAVE
-    save_fnc_name = f'{schema_name}.{tbl_name}_save'
-    if schema_name == 'public':
-        save_fnc_name = f'{tbl_name}_save'
+# Keyset pagination: rows after cursor of previous page ("after") are found by row value comparison
+# (sort fields, {pk}) > (cursor values) which uses index on these fields, without reading skipped rows.
+# Page without cursor (first page or jump to page) is read with OFFSET
+SEARCH_KEYSET_TEMPLATE = register('sql/search_keyset', """{header}
+CREATE OR  REPLACE FUNCTION {fnc_name}( a_filter {json_type} )
+  RETURNS {result_type} AS
+$BODY$
+DECLARE
+  f_request   jsonb;
+  f_filter    jsonb; -- "filter":[{{"field": "login", "value": "John%"}}]
+  f_after     jsonb; -- "after": {{"login": "John", "{pk}": 125}} - sort fields and {pk} of last row of previous page
+  f_p_size    integer;
+  f_p_offset  integer;
+  f_order     varchar;  -- asc/desc
+  f_sort      varchar; -- "sort": ["login", "active"]
+  f_sql       varchar;
+  f_result    jsonb;
+  f_rows      integer;
+  f_skipped   integer; -- rows of previous pages before cursor
+  f_cnt       bigint;
+  f_cnt_type  varchar; -- exact/estimated/capped
+{count_variables}  f_next      jsonb;
+  f_sql_where varchar;
+  f_sql_after varchar;
+  f_sql_order varchar;
+  f_sort_fields varchar[];
+  f_valid_search_fields varchar[];
+  f_filter_field_type varchar;
+BEGIN
+  f_valid_search_fields = '{{{valid_fields}}}'::varchar[];
+  f_request = CAST(a_filter as jsonb);
+  f_p_size = (f_request->>'page_size')::integer;
+  f_p_offset = (f_request->>'page_index')::integer * f_p_size;
+  f_after = f_request->'after';
+  f_order = f_request->>'sort_direction';
+  IF (NOT ((f_order='asc') OR (f_order='desc') OR (f_order=''))) THEN
+    RETURN jsonb_build_object('error','Wrong order', 'code', 400);
+  END IF;
+  IF f_order = '' THEN
+    f_order = 'asc';
+  END IF;
+  f_sql_where = '';
+  FOR f_filter IN
+    SELECT * FROM jsonb_array_elements( f_request->'filter' )
+  LOOP
+    IF NOT CAST(f_filter->>'field' as varchar) = ANY (f_valid_search_fields) THEN
+      RETURN jsonb_build_object('error','Wrong filter field', 'code', 400);
+    END IF;
+    -- Column types are known at generation time, no catalog query
+    f_filter_field_type = {filter_field_type};
+    IF f_filter_field_type = 'character varying' THEN
+      f_sql_where = f_sql_where || ' AND upper(' || CAST(f_filter->>'field' as varchar) || ') LIKE ' || quote_literal(upper(f_filter->>'value'));
+    ELSEIF f_filter_field_type = 'boolean' THEN
+      f_sql_where = f_sql_where || ' AND ' || CAST(f_filter->>'field' as varchar) || ' = ' || CAST(f_filter->>'value' as varchar);
+    ELSE
+      RETURN jsonb_build_object('error','Wrong filter field type', 'code', 400);
+    END IF;
+  END LOOP;
+  f_sort_fields = '{{}}'::varchar[];
+  FOR f_sort IN
+    SELECT * FROM jsonb_array_elements_text( f_request->'sort')
+  LOOP
+    IF NOT CAST(f_sort as varchar) = ANY (f_valid_search_fields) THEN
+      RETURN jsonb_build_object('error','Wrong sort field', 'code', 400);
+    END IF;
+    f_sort_fields = f_sort_fields || f_sort;
+  END LOOP;
+  -- {pk} makes order unique, cursor points to exactly one row
+  f_sort_fields = f_sort_fields || '{pk}'::varchar;
+  SELECT ' ORDER BY ' || string_agg(f || ' ' || f_order, ', ' ORDER BY n)
+    INTO f_sql_order
+    FROM unnest(f_sort_fields) WITH ORDINALITY AS s(f, n);
+  f_sql_after = '';
+  f_skipped = 0;
+  IF jsonb_typeof(f_after) = 'object' THEN
+    SELECT format(' AND (%s) %s (%s)',
+                  string_agg(f, ', ' ORDER BY n),
+                  CASE WHEN f_order = 'desc' THEN '<' ELSE '>' END,
+                  string_agg(quote_nullable(f_after->>f), ', ' ORDER BY n))
+      INTO f_sql_after
+      FROM unnest(f_sort_fields) WITH ORDINALITY AS s(f, n);
+    f_skipped = f_p_offset;
+    f_p_offset = 0;
+  END IF;
+   f_sql = format('SELECT COALESCE(jsonb_agg(to_jsonb( {alias} ) - ''f_total''),''[]''::jsonb), max( {alias}.f_total ) FROM (
+    SELECT
+{field_list},
+          {total_column} AS f_total
+    FROM {schema_name}.{tbl_name}
+    WHERE TRUE %s %s
+    %s
+    LIMIT $1
+    OFFSET $2
+  ) as {alias}', f_sql_where, f_sql_after, f_sql_order);
+  EXECUTE f_sql INTO f_result, f_cnt USING f_p_size, f_p_offset;
+  f_rows = jsonb_array_length(f_result);
+{count}
+  -- Cursor of next page from last row
+  IF f_rows > 0 THEN
+    SELECT jsonb_object_agg(f, f_result->(f_rows - 1)->f)
+      INTO f_next
+      FROM unnest(f_sort_fields) AS s(f);
+  END IF;
+  RETURN jsonb_build_object('data', f_result, 'cnt', f_cnt, 'cnt_type', f_cnt_type, 'after', f_next{etag});
+END;
+$BODY$
+  LANGUAGE plpgsql {volatility}
+                   COST 100;
+COMMENT ON FUNCTION {fnc_name}({json_type}) IS '{title} list';
+ALTER FUNCTION {fnc_name}({json_type}) OWNER TO {db_owner};
+GRANT EXECUTE ON FUNCTION {fnc_name}({json_type}) TO {db_user};""")
 
-    sql_save = f"""{header}
-CREATE OR REPLACE FUNCTION {save_fnc_name}( a_data character varying )
-    RETURNS text AS
+# Search without dynamic SQL: filters are optional predicates with values in variables and sort is
+# whitelisted ORDER BY CASE, so PL/pgSQL keeps prepared plan of the query between calls
+SEARCH_STATIC_TEMPLATE = register('sql/search_static', """{header}
+CREATE OR  REPLACE FUNCTION {fnc_name}( a_filter {json_type} )
+  RETURNS {result_type} AS
+$BODY$
+DECLARE
+  f_request   jsonb;
+  f_filter    jsonb; -- "filter":[{{"field": "login", "value": "John%"}}]
+  f_p_size    integer;
+  f_p_offset  integer;
+  f_order     varchar;  -- asc/desc
+  f_sort      varchar; -- "sort": ["login"], one sort field
+  f_result    jsonb;
+  f_rows      integer;
+  f_cnt       bigint;
+  f_cnt_type  varchar; -- exact/estimated/capped
+{count_variables}  f_sql_where varchar; -- filter as text, only for planner estimate of count
+{filter_variables}
+BEGIN
+  f_request = CAST(a_filter as jsonb);
+  f_p_size = (f_request->>'page_size')::integer;
+  f_p_offset = (f_request->>'page_index')::integer * f_p_size;
+  f_order = f_request->>'sort_direction';
+  IF (NOT ((f_order='asc') OR (f_order='desc') OR (f_order=''))) THEN
+    RETURN jsonb_build_object('error','Wrong order', 'code', 400);
+  END IF;
+  f_sql_where = '';
+  FOR f_filter IN
+    SELECT * FROM jsonb_array_elements( f_request->'filter' )
+  LOOP
+    CASE CAST(f_filter->>'field' as varchar)
+{filter_assignments}
+      ELSE
+        RETURN jsonb_build_object('error','Wrong filter field', 'code', 400);
+    END CASE;
+    f_sql_where = f_sql_where || ' AND upper(' || CAST(f_filter->>'field' as varchar) || ') LIKE ' || quote_literal(upper(f_filter->>'value'));
+  END LOOP;
+  IF jsonb_array_length(COALESCE(f_request->'sort', '[]'::jsonb)) > 1 THEN
+    RETURN jsonb_build_object('error','Only one sort field', 'code', 400);
+  END IF;
+  f_sort = f_request->'sort'->>0;
+  IF f_sort IS NOT NULL AND NOT f_sort = ANY ('{{{valid_fields}}}'::varchar[]) THEN
+    RETURN jsonb_build_object('error','Wrong sort field', 'code', 400);
+  END IF;
+  SELECT COALESCE(jsonb_agg(to_jsonb( {alias} ) - 'f_total'),'[]'::jsonb), max( {alias}.f_total )
+    INTO f_result, f_cnt
+    FROM (
+    SELECT
+{field_list},
+          {total_column} AS f_total
+    FROM {schema_name}.{tbl_name}
+    WHERE TRUE
+{filter_predicates}
+    ORDER BY
+{sort_cases}
+    LIMIT f_p_size
+    OFFSET f_p_offset
+  ) as {alias};
+  f_rows = jsonb_array_length(f_result);
+{count}
+  RETURN jsonb_build_object('data', f_result, 'cnt', f_cnt, 'cnt_type', f_cnt_type{etag});
+END;
+$BODY$
+  LANGUAGE plpgsql {volatility}
+                   COST 100;
+COMMENT ON FUNCTION {fnc_name}({json_type}) IS '{title} list';
+ALTER FUNCTION {fnc_name}({json_type}) OWNER TO {db_owner};
+GRANT EXECUTE ON FUNCTION {fnc_name}({json_type}) TO {db_user};""")
+
+
+# Total count of filtered rows in search, f_cnt is set by page query for exact count (count(*) OVER ()),
+# it is NULL when page is empty
+COUNT_EXACT_TEMPLATE = register('sql/count_exact', """  f_cnt_type = 'exact';
+  IF f_cnt IS NULL THEN
+    -- Page after last row, count separately
+    EXECUTE format('SELECT count(*) FROM {schema_name}.{tbl_name} WHERE TRUE %s', f_sql_where) INTO f_cnt;
+  END IF;""")
+
+# Exact count of keyset search is separate query, count(*) OVER () in page query would read all rows after
+# cursor before LIMIT
+COUNT_EXACT_KEYSET_TEMPLATE = register('sql/count_exact_keyset', """  f_cnt_type = 'exact';
+  -- Separate query, page query reads only rows of the page
+  EXECUTE format('SELECT count(*) FROM {schema_name}.{tbl_name} WHERE TRUE %s', f_sql_where) INTO f_cnt;""")
+
+# Planner estimate, table statistics without filter, EXPLAIN with filter; at least rows already read
+COUNT_ESTIMATED_TEMPLATE = register('sql/count_estimated', """  f_cnt_type = 'estimated';
+  IF f_sql_where = '' THEN
+    SELECT reltuples::bigint INTO f_cnt FROM pg_class WHERE oid = '{schema_name}.{tbl_name}'::regclass;
+  END IF;
+  IF f_sql_where <> '' OR f_cnt < 0 THEN
+    -- Table without statistics (reltuples = -1) or filtered list
+    EXECUTE 'EXPLAIN (FORMAT JSON) SELECT 1 FROM {schema_name}.{tbl_name} WHERE TRUE ' || f_sql_where INTO f_plan;
+    f_cnt = (f_plan->0->'Plan'->>'Plan Rows')::bigint;
+  END IF;
+  f_cnt = GREATEST(f_cnt, {skipped}f_p_offset + f_rows);""")
+
+# Count stops after {count_cap} rows, then cnt is {count_cap} or more (one more than read rows for full page)
+COUNT_CAPPED_TEMPLATE = register('sql/count_capped', """  f_cnt_type = 'exact';
+  EXECUTE format('SELECT count(*) FROM (SELECT 1 FROM {schema_name}.{tbl_name} WHERE TRUE %s LIMIT {count_limit}) as {alias}',
+                 f_sql_where) INTO f_cnt;
+  IF f_cnt > {count_cap} THEN
+    f_cnt_type = 'capped';
+    f_cnt = GREATEST({count_cap}, {skipped}f_p_offset + f_rows + CASE WHEN f_rows = f_p_size THEN 1 ELSE 0 END);
+  END IF;""")
+
+# Counts of static search, with the same predicates as page query
+COUNT_EXACT_STATIC_TEMPLATE = register('sql/count_exact_static', """  f_cnt_type = 'exact';
+  IF f_cnt IS NULL THEN
+    -- Page after last row, count separately
+    SELECT count(*)
+      INTO f_cnt
+      FROM {schema_name}.{tbl_name}
+     WHERE TRUE
+{filter_predicates};
+  END IF;""")
+
+COUNT_CAPPED_STATIC_TEMPLATE = register('sql/count_capped_static', """  f_cnt_type = 'exact';
+  SELECT count(*)
+    INTO f_cnt
+    FROM (
+    SELECT 1
+      FROM {schema_name}.{tbl_name}
+     WHERE TRUE
+{filter_predicates}
+     LIMIT {count_limit}
+  ) as {alias};
+  IF f_cnt > {count_cap} THEN
+    f_cnt_type = 'capped';
+    f_cnt = GREATEST({count_cap}, {skipped}f_p_offset + f_rows + CASE WHEN f_rows = f_p_size THEN 1 ELSE 0 END);
+  END IF;""")
+
+COUNT_TEMPLATES = {
+    'exact': COUNT_EXACT_TEMPLATE,
+    'estimated': COUNT_ESTIMATED_TEMPLATE,
+    'capped': COUNT_CAPPED_TEMPLATE,
+}
+
+STATIC_COUNT_TEMPLATES = {
+    'exact': COUNT_EXACT_STATIC_TEMPLATE,
+    'estimated': COUNT_ESTIMATED_TEMPLATE,
+    'capped': COUNT_CAPPED_STATIC_TEMPLATE,
+}
+
+
+SAVE_TEMPLATE = register('sql/save', """{header}
+CREATE OR REPLACE FUNCTION {fnc_name}( a_data {json_type} )
+    RETURNS {result_type} AS
 $BODY$
 DECLARE
   f_id    integer;
   f_data  jsonb;
 BEGIN
   f_data = a_data::jsonb;
-  f_id   = COALESCE( CAST( f_data->>'{field_array[0]["field"]}' as INTEGER ), 0);
+  f_id   = COALESCE( CAST( f_data->>'{pk}' as INTEGER ), 0);
   IF f_id > 0 THEN
-      PERFORM 1 FROM {schema_name}.{tbl_name} WHERE {field_array[0]["field"]} = f_id;
+      -- One statement, not found row is reported by FOUND
+      UPDATE {schema_name}.{tbl_name} SET 
+{update_set}
+    WHERE {pk} = f_id;
       IF NOT FOUND THEN
-        RETURN jsonb_build_object('error', '{tbl_name.capitalize()} do not exists', 'code', 404);
+        RETURN jsonb_build_object('error', '{title} do not exists', 'code', 404);
       END IF;
-      UPDATE {schema_name}.{tbl_name} SET \n"""
-
-    for item in field_array:
-        if item["field"] == field_array[0]["field"]:
-            continue
-        sql_save += f'            {item["field"]} = {sql_data(item)},\n'
-
-    sql_save = sql_save[0:-2]
-    sql_save += f"""
-    WHERE {field_array[0]["field"]} = f_id;
   ELSE
-      f_id = nextval('{sequence_name}'::regclass);
       INSERT INTO {schema_name}.{tbl_name} (
-{get_function_list(field_array)}
+{field_list}
       ) VALUES (
-          f_id,\n"""
-
-    # Copy and remove first element (id), already filled as f_id
-    insert_array = list(field_array)
-    insert_array.pop(0)
-
-    for item in insert_array:
-        sql_save += f'          {sql_data(item)},\n'
-
-    sql_save = sql_save[0:-2]
-    sql_save += f"""
-    );
+          nextval('{sequence_name}'::regclass),
+{insert_values}
+    )
+    RETURNING {pk} INTO f_id;
   END IF;
   RETURN jsonb_build_object('id', f_id, 'code', 200 );
 END;
 $BODY$
     LANGUAGE plpgsql VOLATILE
                      COST 100;
-ALTER FUNCTION {save_fnc_name}(character varying) OWNER TO {db_owner};
-GRANT EXECUTE ON FUNCTION {save_fnc_name}(character varying) TO {db_user};"""
-    file_path = os.path.join('dist', 'sql', f'fnc_{save_fnc_name}.sql')
-    os.makedirs(os.path.join('dist', 'sql'), exist_ok=True)
-    with open(file_path, 'w') as file:
-        file.write(sql_save)
+ALTER FUNCTION {fnc_name}({json_type}) OWNER TO {db_owner};
+GRANT EXECUTE ON FUNCTION {fnc_name}({json_type}) TO {db_user};""")
+
+
+# Export of all rows matching filter as SETOF rows. Simple SQL function is inlined into the caller query, so
+# rows are read by cursor of caller in batches, without building one jsonb document. Filters of text fields
+# like in _search, other fields are ignored, rows are ordered by primary key
+EXPORT_TEMPLATE = register('sql/export', """{header}
+CREATE OR REPLACE FUNCTION {fnc_name}( a_filter {json_type} )
+  RETURNS SETOF {schema_name}.{tbl_name} AS
+$BODY$
+  SELECT
+{field_list}
+    FROM {schema_name}.{tbl_name}{filter_values}
+{filter_predicates}   ORDER BY {pk};
+$BODY$
+  LANGUAGE sql STABLE
+               COST 100;
+COMMENT ON FUNCTION {fnc_name}({json_type}) IS 'Export {tbl_name}';
+ALTER FUNCTION {fnc_name}({json_type}) OWNER TO {db_owner};
+GRANT EXECUTE ON FUNCTION {fnc_name}({json_type}) TO {db_user};""")
+
+# Filter values read once from "filter":[{"field": "login", "value": "John%"}], one row of NULL without filter
+EXPORT_FILTER_TEMPLATE = register('sql/export_filter', """,
+         (SELECT
+{filter_columns}
+            FROM jsonb_array_elements(COALESCE(CAST(a_filter as jsonb)->'filter', '[]'::jsonb)) f_filter) f""")
+
+# Indexes for filter and sort of search function. Kind of indexes is set by column comment annotation
+# @index=prefix,trgm,sort (or none), search column of list (second column) has prefix index by default
+INDEXES_TEMPLATE = register('sql/indexes', """{header}
+-- Indexes for {schema_name}.{tbl_name} search filters and sort
+{extensions}{indexes}""")
+
+# upper(col) LIKE 'VALUE%'
+INDEX_PREFIX_TEMPLATE = register('sql/index_prefix', """CREATE INDEX IF NOT EXISTS {index_name}
+    ON {schema_name}.{tbl_name} (upper({field}) text_pattern_ops);
+""")
+
+# upper(col) LIKE '%VALUE%'
+INDEX_TRGM_TEMPLATE = register('sql/index_trgm', """CREATE INDEX IF NOT EXISTS {index_name}
+    ON {schema_name}.{tbl_name} USING gin (upper({field}) gin_trgm_ops);
+""")
+
+# ORDER BY col, with keyset pagination (col, pk)
+INDEX_SORT_TEMPLATE = register('sql/index_sort', """CREATE INDEX IF NOT EXISTS {index_name}
+    ON {schema_name}.{tbl_name} ({columns});
+""")
+
+INDEX_KINDS = ['prefix', 'trgm', 'sort', 'none']
+
 
+# information_schema.columns.data_type of column types
+DATA_TYPES = {
+    'VARCHAR': 'character varying',
+    'BPCHAR': 'character',
+    'TEXT': 'text',
+    'BOOL': 'boolean',
+    'BOOLEAN': 'boolean',
+}
 
+
+# SQL functions GET, DELETE, LIST, SAVE create
+def get_function_list(arr: list) -> str:
+    return ',\n'.join(f'          {item["field"]}' for item in arr)
+
+
+def get_field_array(arr: list) -> str:
+    return ','.join('"' + item["field"] + '"' for item in arr if is_string(item))
+
+
+def sql_data(elem: FieldDefinition) -> str:
+    match elem['type']:
+        case 'BOOLEAN' | 'BOOL':
+            return f"COALESCE( cast( f_data->>'{elem['field']}' as boolean), true)"
+        case 'DATE' | 'TIMESTAMP' | 'TIMESTAMPZ' | 'INT4' | 'INT8' | 'INTEGER':
+            return f"CAST( f_data->>'{elem['field']}' as {elem['type']})"
+        case 'VARCHAR' | 'BPCHAR':
+            return f"f_data->>'{elem['field']}'"
+        case _:
+            return f"f_data->>'{elem['field']}'"
+
+
+# Type of filter field in search as CASE on field name, only searchable fields are accepted
+def get_filter_field_type(arr: list) -> str:
+    cases = ''.join(f"\n      WHEN '{item['field']}' THEN '{DATA_TYPES[item['type'].upper()]}'"
+                    for item in arr if is_string(item))
+    if not cases:
+        return 'NULL'
+    return f"CASE CAST(f_filter->>'field' as varchar){cases}\n    END"
+
+
+# Value of column in bulk save, read from record r
+def bulk_data(elem: FieldDefinition) -> str:
+    if elem['type'] in ['BOOLEAN', 'BOOL']:
+        return f'COALESCE( r.{elem["field"]}, true)'
+    return f'r.{elem["field"]}'
+
+
+# Function name, without schema for public
+def function_name(schema_name: str, tbl_name: str, suffix: str) -> str:
+    if schema_name == 'public':
+        return f'{tbl_name}_{suffix}'
+    return f'{schema_name}.{tbl_name}_{suffix}'
+
+
+# Template fields common for all functions
+def sql_context(schema_name: str, tbl_name: str, field_array: list) -> dict:
+    return {
+        'header': header,
+        'schema_name': schema_name,
+        'tbl_name': tbl_name,
+        'title': tbl_name.capitalize(),
+        'tbl_lower': tbl_name.lower(),
+        'alias': tbl_name[0],
+        'pk': field_array[0]["field"],
+        'field_list': get_function_list(field_array),
+        'db_owner': db_owner,
+        'db_user': db_user,
+        # Functions take and return jsonb with jsonb option, otherwise JSON text
+        'json_type': 'jsonb' if get_options().jsonb else 'character varying',
+        'result_type': 'jsonb' if get_options().jsonb else 'TEXT',
+    }
+
+
+@timed
+def generate_get(schema_name: str, tbl_name: str, sequence_name: str, field_array: list):
+    # GET
+    get_fnc_name = function_name(schema_name, tbl_name, 'get')
+    # ETag of response is md5 of row, removed from body by controller
+    etag = " || jsonb_build_object('_etag', md5(f_result::text))" if get_options().etag else ''
+    sql_get = render(GET_TEMPLATE, fnc_name=get_fnc_name, etag=etag,
+                     **sql_context(schema_name, tbl_name, field_array))
+    file_path = os.path.join('sql', f'fnc_{get_fnc_name}.sql')
+    write_file(file_path, sql_get)
+
+
+@timed
+def generate_get_many(schema_name: str, tbl_name: str, sequence_name: str, field_array: list):
+    get_many_fnc_name = function_name(schema_name, tbl_name, 'get_many')
+    sql_get_many = render(GET_MANY_TEMPLATE, fnc_name=get_many_fnc_name,
+                          **sql_context(schema_name, tbl_name, field_array))
+    file_path = os.path.join('sql', f'fnc_{get_many_fnc_name}.sql')
+    write_file(file_path, sql_get_many)
+
+
+@timed
+def generate_delete(schema_name: str, tbl_name: str, sequence_name: str, field_array: list):
+    # DELETE
+    del_fnc_name = function_name(schema_name, tbl_name, 'delete')
+    sql_delete = render(DELETE_TEMPLATE, fnc_name=del_fnc_name, **sql_context(schema_name, tbl_name, field_array))
+    file_path = os.path.join('sql', f'fnc_{del_fnc_name}.sql')
+    write_file(file_path, sql_delete)
+
+
+# Template fields of static search, filter variables, predicates and sort by searchable fields
+def static_search_context(field_array: list) -> dict:
+    fields = [item["field"] for item in field_array if is_string(item)]
+    pk = field_array[0]["field"]
+    sort_cases = []
+    for field in fields:
+        sort_cases.append(f"      CASE WHEN f_sort = '{field}' AND f_order <> 'desc' THEN {field} END ASC")
+        sort_cases.append(f"      CASE WHEN f_sort = '{field}' AND f_order = 'desc' THEN {field} END DESC")
+    sort_cases.append(f"      CASE WHEN f_order = 'desc' AND f_sort IS NULL THEN {pk} END DESC")
+    sort_cases.append(f"      CASE WHEN f_order <> 'desc' OR f_sort IS NOT NULL THEN {pk} END ASC")
+    return {
+        'filter_variables': '\n'.join(f'  f_filter_{field} varchar;' for field in fields),
+        'filter_assignments': '\n'.join(f"      WHEN '{field}' THEN\n"
+                                        f"        f_filter_{field} = upper(f_filter->>'value');" for field in fields),
+        'filter_predicates': '\n'.join(f'      AND (f_filter_{field} IS NULL OR upper({field}) LIKE f_filter_{field})'
+                                       for field in fields),
+        'sort_cases': ',\n'.join(sort_cases),
+    }
+
+
+@timed
+def generate_search(schema_name: str, tbl_name: str, sequence_name: str, field_array: list):
+    # SEARCH
+    search_fnc_name = function_name(schema_name, tbl_name, 'search')
+    options = get_options()
+    context = sql_context(schema_name, tbl_name, field_array)
+    count_strategy = options.count_strategy(schema_name, tbl_name)
+    keyset = options.pagination == 'keyset'
+    # Rows of previous pages before cursor are counted only by keyset search
+    count_context = dict(count_cap=options.count_cap, count_limit=options.count_cap + 1,
+                         skipped='f_skipped + ' if keyset else '')
+    count_variables = '  f_plan      json;\n' if count_strategy == 'estimated' else ''
+    # EXPLAIN of estimated count is not allowed in STABLE function, search is VOLATILE with this strategy
+    context['volatility'] = 'VOLATILE' if count_strategy == 'estimated' else 'STABLE'
+    total_column = 'count(*) OVER ()' if count_strategy == 'exact' and not keyset else 'NULL::bigint'
+    etag = ", '_etag', md5(concat_ws(':', f_result, f_cnt, f_cnt_type))" if options.etag else ''
+
+    # Static search needs one CASE per sortable column and direction, with many columns dynamic SQL is used
+    sortable = len([item for item in field_array if is_string(item)])
+    if options.search == 'static' and not keyset and 0 < sortable <= options.static_sort_limit:
+        context.update(static_search_context(field_array))
+        count = render(STATIC_COUNT_TEMPLATES[count_strategy], **count_context, **context)
+        sql_search = render(SEARCH_STATIC_TEMPLATE, fnc_name=search_fnc_name, valid_fields=get_field_array(field_array),
+                            count=count, count_variables=count_variables, total_column=total_column, etag=etag,
+                            **context)
+    else:
+        template = SEARCH_KEYSET_TEMPLATE if keyset else SEARCH_TEMPLATE
+        count_template = COUNT_EXACT_KEYSET_TEMPLATE if keyset and count_strategy == 'exact' \
+            else COUNT_TEMPLATES[count_strategy]
+        count = render(count_template, **count_context, **context)
+        sql_search = render(template, fnc_name=search_fnc_name, valid_fields=get_field_array(field_array),
+                            filter_field_type=get_filter_field_type(field_array), count=count,
+                            count_variables=count_variables, total_column=total_column, etag=etag, **context)
+    file_path = os.path.join('sql', f'fnc_{search_fnc_name}.sql')
+    write_file(file_path, sql_search)
+
+
+@timed
+def generate_save(schema_name: str, tbl_name: str, sequence_name: str, field_array: list):
+    # SAVE
+    save_fnc_name = function_name(schema_name, tbl_name, 'save')
+
+    # First element (id) is not updated and in insert filled as f_id
+    update_set = ',\n'.join(f'            {item["field"]} = {sql_data(item)}' for item in field_array[1:])
+    insert_values = ',\n'.join(f'          {sql_data(item)}' for item in field_array[1:])
+
+    context = sql_context(schema_name, tbl_name, field_array)
+    # Result type of save functions is written in lower case
+    context['result_type'] = context['result_type'].lower()
+    sql_save = render(SAVE_TEMPLATE, fnc_name=save_fnc_name, sequence_name=sequence_name, update_set=update_set,
+                      insert_values=insert_values, **context)
+    file_path = os.path.join('sql', f'fnc_{save_fnc_name}.sql')
+    write_file(file_path, sql_save)
+
+
+@timed
+def generate_save_many(schema_name: str, tbl_name: str, sequence_name: str, field_array: list):
+    save_many_fnc_name = function_name(schema_name, tbl_name, 'save_many')
+    update_set = ',\n'.join(f'            {item["field"]} = {bulk_data(item)}' for item in field_array[1:])
+    insert_values = ',\n'.join(f'          {bulk_data(item)}' for item in field_array[1:])
+    context = sql_context(schema_name, tbl_name, field_array)
+    context['result_type'] = context['result_type'].lower()
+    sql_save_many = render(SAVE_MANY_TEMPLATE, fnc_name=save_many_fnc_name, sequence_name=sequence_name,
+                           update_set=update_set, insert_values=insert_values, **context)
+    file_path = os.path.join('sql', f'fnc_{save_many_fnc_name}.sql')
+    write_file(file_path, sql_save_many)
+
+
+@timed
+def generate_delete_many(schema_name: str, tbl_name: str, sequence_name: str, field_array: list):
+    del_many_fnc_name = function_name(schema_name, tbl_name, 'delete_many')
+    sql_delete_many = render(DELETE_MANY_TEMPLATE, fnc_name=del_many_fnc_name,
+                             **sql_context(schema_name, tbl_name, field_array))
+    file_path = os.path.join('sql', f'fnc_{del_many_fnc_name}.sql')
+    write_file(file_path, sql_delete_many)
+
+
+@timed
+def generate_export(schema_name: str, tbl_name: str, sequence_name: str, field_array: list):
+    export_fnc_name = function_name(schema_name, tbl_name, 'export')
+    fields = [item["field"] for item in field_array if is_string(item)]
+    filter_values = ''
+    filter_predicates = ''
+    if fields:
+        filter_columns = ',\n'.join(f"            max(upper(f_filter->>'value')) FILTER (WHERE f_filter->>'field' = "
+                                    f"'{field}') AS f_filter_{field}" for field in fields)
+        filter_values = render(EXPORT_FILTER_TEMPLATE, filter_columns=filter_columns)
+        filter_predicates = ''.join(f'   {"WHERE" if position == 0 else "  AND"} (f_filter_{field} IS NULL '
+                                    f'OR upper({field}) LIKE f_filter_{field})\n'
+                                    for position, field in enumerate(fields))
+    sql_export = render(EXPORT_TEMPLATE, fnc_name=export_fnc_name, filter_values=filter_values,
+                        filter_predicates=filter_predicates, **sql_context(schema_name, tbl_name, field_array))
+    file_path = os.path.join('sql', f'fnc_{export_fnc_name}.sql')
+    write_file(file_path, sql_export)
+
+
+# Index kinds of field from @index annotation, default prefix for search column
+def index_kinds(item: FieldDefinition, search_field: bool) -> list:
+    kinds = item.get('index', ['prefix'] if search_field and is_string(item) else [])
+    for kind in kinds:
+        if kind not in INDEX_KINDS:
+            raise ValueError(f'Unknown index kind of {item["field"]}: {kind}, use {", ".join(INDEX_KINDS)}')
+        if kind in ['prefix', 'trgm'] and not is_string(item):
+            raise ValueError(f'Index {kind} of {item["field"]} needs text column')
+    return [kind for kind in kinds if kind != 'none']
+
+
+@timed
+def generate_indexes(schema_name: str, tbl_name: str, sequence_name: str, field_array: list):
+    context = sql_context(schema_name, tbl_name, field_array)
+    indexes = []
+    trgm = False
+    for position, item in enumerate(field_array):
+        for kind in index_kinds(item, position == 1):
+            index_name = f'{tbl_name}_{item["field"]}_{kind}_idx'
+            match kind:
+                case 'prefix':
+                    indexes.append(render(INDEX_PREFIX_TEMPLATE, index_name=index_name, field=item["field"], **context))
+                case 'trgm':
+                    trgm = True
+                    indexes.append(render(INDEX_TRGM_TEMPLATE, index_name=index_name, field=item["field"], **context))
+                case 'sort':
+                    columns = item["field"]
+                    if get_options().pagination == 'keyset' and position > 0:
+                        columns += f', {context["pk"]}'
+                    indexes.append(render(INDEX_SORT_TEMPLATE, index_name=index_name, columns=columns, **context))
+    if not indexes:
+        return
+    extensions = 'CREATE EXTENSION IF NOT EXISTS pg_trgm;\n' if trgm else ''
+    sql_indexes = render(INDEXES_TEMPLATE, extensions=extensions, indexes=''.join(indexes), **context)
+    file_path = os.path.join('sql', f'idx_{schema_name}.{tbl_name}.sql')
+    write_file(file_path, sql_indexes)
+
+
+@timed
 def generate_pgsql(schema_name: str, tbl_name: str, sequence_name: str, field_array: list):
     generate_get(schema_name, tbl_name, sequence_name, field_array)
 
@@ -272,3 +892,16 @@ def generate_pgsql(schema_name: str, tbl_name: str, sequence_name: str, field_ar
     generate_save(schema_name, tbl_name, sequence_name, field_array)
 
     generate_search(schema_name, tbl_name, sequence_name, field_array)
+
+    if get_options().loader:
+        generate_get_many(schema_name, tbl_name, sequence_name, field_array)
+
+    if get_options().bulk:
+        generate_save_many(schema_name, tbl_name, sequence_name, field_array)
+
+        generate_delete_many(schema_name, tbl_name, sequence_name, field_array)
+
+    if get_options().export:
+        generate_export(schema_name, tbl_name, sequence_name, field_array)
+
+    generate_indexes(schema_name, tbl_name, sequence_name, field_array)
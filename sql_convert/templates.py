@@ -0,0 +1,103 @@
+import os
+import hashlib
+from string import Formatter
+from typing import Dict, List, Optional, Tuple
+
+# Templates of generated files. Text uses str.format syntax with simple names only: {name}, braces are
+# doubled: {{ }}. Builtin templates are registered by generator modules, user templates with the same
+# name are read from template directory: <template_dir>/<name>.tpl, for example templates/sql/get.tpl
+
+TEMPLATE_EXTENSION = '.tpl'
+
+
+class Template:
+    def __init__(self, name: str, text: str):
+        self.name = name
+        # Compiled template, list of (literal, field name)
+        self.parts: List[Tuple[str, Optional[str]]] = []
+        for literal, field_name, format_spec, conversion in Formatter().parse(text):
+            if field_name is not None and (not field_name.isidentifier() or format_spec or conversion):
+                raise ValueError(f'Template {name}: wrong field {{{field_name}}}, only simple names are allowed')
+            self.parts.append((literal, field_name))
+
+    def render(self, context: Dict[str, object]) -> str:
+        buffer = []
+        for literal, field_name in self.parts:
+            buffer.append(literal)
+            if field_name is None:
+                continue
+            try:
+                buffer.append(str(context[field_name]))
+            except KeyError:
+                raise KeyError(f'Template {self.name}: unknown field {{{field_name}}}') from None
+        return ''.join(buffer)
+
+
+_builtin: Dict[str, str] = dict()
+
+# Compiled templates, shared by all tables in batch
+_cache: Dict[str, Template] = dict()
+
+_template_dir: Optional[str] = None
+
+
+# Register builtin template, returns template name
+def register(name: str, text: str) -> str:
+    _builtin[name] = text
+    _cache.pop(name, None)
+    return name
+
+
+def set_template_dir(template_dir: Optional[str]):
+    global _template_dir
+    _template_dir = template_dir
+    _cache.clear()
+
+
+def get_template_dir() -> Optional[str]:
+    return _template_dir
+
+
+def get_template(name: str) -> Template:
+    template = _cache.get(name)
+    if template is not None:
+        return template
+    text = _builtin[name]
+    if _template_dir:
+        file_path = os.path.join(_template_dir, *name.split('/')) + TEMPLATE_EXTENSION
+        if os.path.exists(file_path):
+            with open(file_path, 'r') as file:
+                text = file.read()
+    template = Template(name, text)
+    _cache[name] = template
+    return template
+
+
+def render(name: str, **context) -> str:
+    return get_template(name).render(context)
+
+
+# Write builtin templates to directory, as start point for own templates
+def save_builtin_templates(template_dir: str):
+    for name, text in sorted(_builtin.items()):
+        file_path = os.path.join(template_dir, *name.split('/')) + TEMPLATE_EXTENSION
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'w') as file:
+            file.write(text)
+
+
+# Hash of user templates, part of generation options
+def templates_fingerprint(template_dir: Optional[str]) -> str:
+    if not template_dir:
+        return ''
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(template_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if not name.endswith(TEMPLATE_EXTENSION):
+                continue
+            file_path = os.path.join(root, name)
+            digest.update(os.path.relpath(file_path, template_dir).replace(os.sep, '/').encode())
+            with open(file_path, 'rb') as file:
+                digest.update(file.read())
+    return digest.hexdigest()
@@ -0,0 +1,82 @@
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sql_convert.batch import BatchResult, collect_sql_files, create_executor, generate_tables, merge_tables
+from sql_convert.includes.table_definition import TableDefinition
+from sql_convert.output import OutputSink
+from sql_convert.parser import parse_file
+
+# Watch mode. Input files are polled with os.stat, only changed files are parsed again and parsed tables are
+# kept between generations; the manifest skips tables which did not change, so after edit only tables from
+# the edited file are generated.
+
+
+class Watcher:
+    def __init__(self, paths: List[str], targets: List[str], jobs: int = 1, sink: Optional[OutputSink] = None,
+                 interval: float = 0.05, force: bool = False):
+        self.paths = paths
+        self.targets = targets
+        self.jobs = jobs
+        self.sink = sink
+        self.interval = interval
+        # file path -> (modification time, size)
+        self.stats: Dict[str, Tuple[int, int]] = dict()
+        # file path -> parsed tables
+        self.models: Dict[str, List[TableDefinition]] = dict()
+        self.files: List[str] = []
+        self.executor = None
+        # First generation ignores manifest, used also for output directory not generated by sql_convert
+        self.force = force
+
+    # Parse new and changed files, returns list of changed files
+    def scan(self) -> List[str]:
+        self.files = collect_sql_files(self.paths)
+        changed = []
+        for sql_file_path in self.files:
+            try:
+                stat = os.stat(sql_file_path)
+            except OSError:
+                continue
+            if self.stats.get(sql_file_path) == (stat.st_mtime_ns, stat.st_size):
+                continue
+            self.stats[sql_file_path] = (stat.st_mtime_ns, stat.st_size)
+            self.models[sql_file_path] = parse_file(sql_file_path)
+            changed.append(sql_file_path)
+        for sql_file_path in list(self.models):
+            if sql_file_path not in self.files:
+                del self.models[sql_file_path]
+                del self.stats[sql_file_path]
+                changed.append(sql_file_path)
+        return changed
+
+    def generate(self) -> BatchResult:
+        tables = merge_tables([(sql_file_path, self.models[sql_file_path])
+                               for sql_file_path in self.files if sql_file_path in self.models])
+        result = generate_tables(tables, self.targets, self.jobs, force=self.force, sink=self.sink,
+                                 executor=self.executor)
+        self.force = False
+        return result
+
+    def run(self):
+        if self.jobs != 1:
+            self.executor = create_executor(self.jobs)
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    changed = self.scan()
+                    if changed:
+                        result = self.generate()
+                        elapsed = (time.perf_counter() - start) * 1000
+                        for target, error in result.errors:
+                            print(error)
+                        print(f'{", ".join(changed)}: table outputs generated {result.generated}, '
+                              f'files written {result.files.written}, removed {result.files.removed} '
+                              f'({elapsed:.0f} ms)', flush=True)
+                except (OSError, ValueError) as e:
+                    print(e, flush=True)
+                time.sleep(self.interval)
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown()
@@ -3,46 +3,40 @@ import os
 from constants import date_placeholder
 from sql_convert.common import is_number, is_boolean, snake_to_dash, snake_to_camel, is_date, capitalize
 from sql_convert.includes.field_definition import FieldDefinition
+from sql_convert.options import get_options
+from sql_convert.output import write_file
+from sql_convert.profiling import timed
+from sql_convert.templates import register, render
 
-
-# Module
-def generate_module(schema_name: str, tbl_name: str):
-    module_ts = f"""import {{ NgModule }} from '@angular/core';
+MODULE_TEMPLATE = register('web/module', """import {{ NgModule }} from '@angular/core';
 import {{ CommonModule }} from '@angular/common';
-import {{ {snake_to_camel(tbl_name)}ListComponent }} from './{snake_to_dash(tbl_name)}-list/{snake_to_dash(tbl_name)}-list.component';
-import {{ {snake_to_camel(tbl_name)}EditComponent }} from './{snake_to_dash(tbl_name)}-edit/{snake_to_dash(tbl_name)}-edit.component';
+import {{ {class_name}ListComponent }} from './{dash_name}-list/{dash_name}-list.component';
+import {{ {class_name}EditComponent }} from './{dash_name}-edit/{dash_name}-edit.component';
 import {{ MaterialModule }} from '../shared/material.module';
-import {{ {snake_to_camel(tbl_name)}Service }} from './{snake_to_dash(tbl_name)}.service';
-import {{ {snake_to_camel(tbl_name)}RoutingModule }} from './{snake_to_dash(tbl_name)}-routing.module';
+import {{ {class_name}Service }} from './{dash_name}.service';
+import {{ {class_name}RoutingModule }} from './{dash_name}-routing.module';
 
 @NgModule({{
   declarations: [
-    {snake_to_camel(tbl_name)}ListComponent,
-    {snake_to_camel(tbl_name)}EditComponent,
+    {class_name}ListComponent,
+    {class_name}EditComponent,
   ],
   imports: [
     CommonModule,
     MaterialModule,
-    {snake_to_camel(tbl_name)}RoutingModule,
+    {class_name}RoutingModule,
   ],
   providers: [
-    {snake_to_camel(tbl_name)}Service,
+    {class_name}Service,
   ],
 }})
 
-export class {snake_to_camel(tbl_name)}Module { {} }"""
-    file_path = os.path.join('dist', 'www', f'{snake_to_dash(tbl_name)}.module.ts')
-    os.makedirs(os.path.join('dist', 'www'), exist_ok=True)
-    with open(file_path, 'w') as file:
-        file.write(module_ts)
-
+export class {class_name}Module {{}}""")
 
-# Routing module
-def generate_routing(schema_name: str, tbl_name: str):
-    module_ts = f"""import {{ NgModule }} from '@angular/core';
+ROUTING_TEMPLATE = register('web/routing', """import {{ NgModule }} from '@angular/core';
 import {{ RouterModule, Routes }} from '@angular/router';
-import {{ {snake_to_camel(tbl_name)}ListComponent }} from './{snake_to_dash(tbl_name)}-list/{snake_to_dash(tbl_name)}-list.component';
-import {{ {snake_to_camel(tbl_name)}EditComponent }} from './{snake_to_dash(tbl_name)}-edit/{snake_to_dash(tbl_name)}-edit.component';
+import {{ {class_name}ListComponent }} from './{dash_name}-list/{dash_name}-list.component';
+import {{ {class_name}EditComponent }} from './{dash_name}-edit/{dash_name}-edit.component';
 
 const routes: Routes = [
   {{
@@ -52,11 +46,11 @@ const routes: Routes = [
   }},
   {{
     path: 'list',
-    component: {snake_to_camel(tbl_name)}ListComponent,
+    component: {class_name}ListComponent,
   }},
   {{
     path: 'edit/:id',
-    component: {snake_to_camel(tbl_name)}EditComponent,
+    component: {class_name}EditComponent,
   }},
 ];
 
@@ -66,37 +60,30 @@ const routes: Routes = [
     RouterModule.forChild(routes),
   ],
 }})
-export class {snake_to_camel(tbl_name)}RoutingModule {{}}"""
-    file_path = os.path.join('dist', 'www', f'{snake_to_dash(tbl_name)}-routing.module.ts')
-    os.makedirs(os.path.join('dist', 'www'), exist_ok=True)
-    with open(file_path, 'w') as file:
-        file.write(module_ts)
-
+export class {class_name}RoutingModule {{}}""")
 
-# Service
-def generate_service(schema_name: str, tbl_name: str):
-    service_ts = f"""import {{ Injectable }} from '@angular/core';
+SERVICE_TEMPLATE = register('web/service', """import {{ Injectable }} from '@angular/core';
 import {{ HttpClient }} from '@angular/common/http';
 import {{ Observable }} from 'rxjs';
 import {{
   Configuration,
   ListFilterRequestDto,
-  {snake_to_camel(tbl_name)}Dto,
-  {snake_to_camel(tbl_name)}ListResponseDto,
-  {snake_to_camel(tbl_name)}Service as Api{snake_to_camel(tbl_name)}Service,
+  {class_name}Dto,
+  {class_name}ListResponseDto,
+  {class_name}Service as Api{class_name}Service,
 }} from '../api';
-import {{ environment }} from '../../environments/environment'; \n
+import {{ environment }} from '../../environments/environment'; \n{etag_import}
 @Injectable({{
   providedIn: 'root',
 }})
-export class {snake_to_camel(tbl_name)}Service {{
+export class {class_name}Service {{
   constructor(
     private httpClient: HttpClient,
-    private api{snake_to_camel(tbl_name)}Service: Api{snake_to_camel(tbl_name)}Service,
+    private api{class_name}Service: Api{class_name}Service,
   ) {{
     const basePath = environment.apiUrl;
     const conf = new Configuration();
-    this.api{snake_to_camel(tbl_name)}Service = new Api{snake_to_camel(tbl_name)}Service(this.httpClient, basePath, conf);
+    this.api{class_name}Service = new Api{class_name}Service(this.httpClient, basePath, conf);
   }}
 
   public savedFilter: ListFilterRequestDto = {{
@@ -107,7 +94,7 @@ export class {snake_to_camel(tbl_name)}Service {{
     page_index: 0,
   }};
   
-  public getFilterValue(fieldName: string): string {{
+{etag_field}  public getFilterValue(fieldName: string): string {{
     let result = this.savedFilter.filter?.find((item) => item.field === fieldName)?.value;
     if ( !result ) {{
       result = '';
@@ -115,42 +102,87 @@ export class {snake_to_camel(tbl_name)}Service {{
     return result;
   }}
   
-  public list(body: ListFilterRequestDto): Observable< {snake_to_camel(tbl_name)}ListResponseDto > {{
-    return this.api{snake_to_camel(tbl_name)}Service.{snake_to_camel(tbl_name, False)}ControllerList(body);
+  public list(body: ListFilterRequestDto): Observable< {class_name}ListResponseDto > {{
+    return {list_call};
   }}
   
   public delete(id: number) {{
-    return this.api{snake_to_camel(tbl_name)}Service.{snake_to_camel(tbl_name, False)}ControllerDelete(id);
+    return this.api{class_name}Service.{var_name}ControllerDelete(id);
   }}
   
-  public save(body: {snake_to_camel(tbl_name)}Dto) {{
-    return this.api{snake_to_camel(tbl_name)}Service.{snake_to_camel(tbl_name, False)}ControllerAdd(body);
+  public save(body: {class_name}Dto) {{
+    return this.api{class_name}Service.{var_name}ControllerAdd(body);
   }}
   
-  public view(id: number): Observable< {snake_to_camel(tbl_name)}Dto> {{
-    return this.api{snake_to_camel(tbl_name)}Service.{snake_to_camel(tbl_name, False)}ControllerGet(id);
+  public view(id: number): Observable< {class_name}Dto> {{
+    return {view_call};
   }}
   
   // public getGroups() {{
-  //   return this.api{snake_to_camel(tbl_name)}Service.{snake_to_camel(tbl_name, False)}ControllerGetGroups();
+  //   return this.api{class_name}Service.{var_name}ControllerGetGroups();
   // }}
-}}"""
-    file_path = os.path.join('dist', 'www', f'{snake_to_dash(tbl_name)}.service.ts')
-    os.makedirs(os.path.join('dist', 'www'), exist_ok=True)
-    with open(file_path, 'w') as file:
-        file.write(service_ts)
+}}""")
 
+# Conditional requests, with etag option: list and view are sent with If-None-Match of cached response
+SERVICE_ETAG_IMPORT_TEMPLATE = register('web/service_etag_import', """import {{ EtagCache }} from '../shared/etag-cache';
+""")
 
-# Datasource for list
-def generate_data_source(schema_name: str, tbl_name: str):
-    ds_ts = f"""import {{ CollectionViewer, DataSource }} from '@angular/cdk/collections';
+SERVICE_ETAG_FIELD_TEMPLATE = register('web/service_etag_field', """  private etagCache = new EtagCache(this.httpClient);
+  
+""")
+
+# Last responses with ETag by request, 304 Not Modified returns cached body. Server on other origin should
+# expose ETag header (Access-Control-Expose-Headers)
+ETAG_CACHE_TEMPLATE = register('web/etag_cache', """import {{ HttpClient, HttpErrorResponse, HttpHeaders }} from '@angular/common/http';
+import {{ Observable, of, throwError }} from 'rxjs';
+import {{ catchError, map }} from 'rxjs/operators';
+
+const MAX_ENTRIES = 100;
+
+export class EtagCache {{
+  private entries = new Map<string, {{ etag: string; body: unknown }}>();
+
+  constructor(private httpClient: HttpClient) {{}}
+
+  request<T>(method: 'GET' | 'POST', url: string, body?: unknown): Observable<T> {{
+    const key = `${{method}} ${{url}} ${{JSON.stringify(body ?? null)}}`;
+    const cached = this.entries.get(key);
+    const headers = cached ? new HttpHeaders({{ 'If-None-Match': cached.etag }}) : undefined;
+    return this.httpClient.request<T>(method, url, {{ body, headers, observe: 'response' }}).pipe(
+      map((response) => {{
+        if (response.body === null && cached) {{
+          // Not modified answered with empty body instead of 304
+          return cached.body as T;
+        }}
+        const etag = response.headers.get('ETag');
+        this.entries.delete(key);
+        if (etag) {{
+          this.entries.set(key, {{ etag, body: response.body }});
+          if (this.entries.size > MAX_ENTRIES) {{
+            this.entries.delete(this.entries.keys().next().value as string);
+          }}
+        }}
+        return response.body as T;
+      }}),
+      catchError((error: HttpErrorResponse) => {{
+        if (error.status === 304 && cached) {{
+          return of(cached.body as T);
+        }}
+        return throwError(() => error);
+      }}),
+    );
+  }}
+}}
+""")
+
+DATA_SOURCE_TEMPLATE = register('web/data_source', """import {{ CollectionViewer, DataSource }} from '@angular/cdk/collections';
 import {{ BehaviorSubject, Observable, of }} from 'rxjs';
 import {{ catchError, finalize }} from 'rxjs/operators';
-import {{ {snake_to_camel(tbl_name)}Dto, ListFilterRequestDto }} from '../api';
-import {{ {snake_to_camel(tbl_name)}Service }} from './{snake_to_dash(tbl_name)}.service';
+import {{ {class_name}Dto, ListFilterRequestDto }} from '../api';
+import {{ {class_name}Service }} from './{dash_name}.service';
 
-export class {snake_to_camel(tbl_name)}Datasource extends DataSource< {snake_to_camel(tbl_name)}Dto> {{
-  private {snake_to_camel(tbl_name, False)}Subject = new BehaviorSubject<{snake_to_camel(tbl_name)}Dto[]>([]);
+export class {class_name}Datasource extends DataSource< {class_name}Dto> {{
+  private {var_name}Subject = new BehaviorSubject<{class_name}Dto[]>([]);
   
   private loadingSubject = new BehaviorSubject<boolean>(false);
   
@@ -158,8 +190,8 @@ export class {snake_to_camel(tbl_name)}Datasource extends DataSource< {snake_to_
   
   public cntSubject = new BehaviorSubject<number>(0);
   
-  constructor(
-    private {snake_to_camel(tbl_name, False)}Service: {snake_to_camel(tbl_name)}Service,
+{cursor_field}  constructor(
+    private {var_name}Service: {class_name}Service,
     private alertService: AlertService,
   ) {{
     super();
@@ -168,9 +200,9 @@ export class {snake_to_camel(tbl_name)}Datasource extends DataSource< {snake_to_
   load(filter?: ListFilterRequestDto) {{
     this.loadingSubject.next(true);
     if (filter) {{
-      this.{snake_to_camel(tbl_name, False)}Service.savedFilter = filter;
+      this.{var_name}Service.savedFilter = filter;
     }}
-    this.{snake_to_camel(tbl_name, False)}Service.list(this.{snake_to_camel(tbl_name, False)}Service.savedFilter)
+{cursor_request}    this.{var_name}Service.list(this.{var_name}Service.savedFilter)
       .pipe(
         catchError((err) => {{
           this.alertService.clear();
@@ -183,76 +215,75 @@ export class {snake_to_camel(tbl_name)}Datasource extends DataSource< {snake_to_
         next: (items) => {{
           if ('data' in items) {{
             this.cntSubject.next(items.cnt);
-            this.{snake_to_camel(tbl_name, False)}Subject.next(items.data);
-          }}
+            this.{var_name}Subject.next(items.data);
+{cursor_response}          }}
         }},
       }});
   }}
   
   // eslint-disable-next-line @typescript-eslint/no-unused-vars-experimental
-  connect(collectionViewer: CollectionViewer): Observable<{snake_to_camel(tbl_name)}Dto[]> {{
-    return this.{snake_to_camel(tbl_name, False)}Subject.asObservable();
+  connect(collectionViewer: CollectionViewer): Observable<{class_name}Dto[]> {{
+    return this.{var_name}Subject.asObservable();
   }}
   
   // eslint-disable-next-line @typescript-eslint/no-unused-vars-experimental
   disconnect(collectionViewer: CollectionViewer): void {{
-    this.{snake_to_camel(tbl_name, False)}Subject.complete();
+    this.{var_name}Subject.complete();
     this.loadingSubject.complete();
     this.cntSubject.complete();
   }}
-}}"""
-    file_path = os.path.join('dist', 'www', f'{snake_to_dash(tbl_name)}.datasource.ts')
-    os.makedirs(os.path.join('dist', 'www'), exist_ok=True)
-    with open(file_path, 'w') as file:
-        file.write(ds_ts)
+}}""")
+
+# Keyset pagination: cursor of each visited page is kept, page without cursor is read by page index
+DATA_SOURCE_CURSOR_FIELD_TEMPLATE = register('web/data_source_cursor_field', """  // Keyset pagination cursors by page index, valid for page size
+  private cursors: Record<string, any>[] = [];
+  
+  private cursorsPageSize = 0;
+  
+""")
+
+DATA_SOURCE_CURSOR_REQUEST_TEMPLATE = register('web/data_source_cursor_request', """    const savedFilter = this.{var_name}Service.savedFilter;
+    // First page is loaded after change of filter or sort, cursors are not valid anymore
+    if (savedFilter.page_index === 0 || savedFilter.page_size !== this.cursorsPageSize) {{
+      this.cursors = [];
+      this.cursorsPageSize = savedFilter.page_size;
+    }}
+    const pageIndex = savedFilter.page_index;
+    savedFilter.after = this.cursors[pageIndex];
+""")
 
+DATA_SOURCE_CURSOR_RESPONSE_TEMPLATE = register('web/data_source_cursor_response', """            this.cursors[pageIndex + 1] = items.after;
+""")
 
-def generate_edit_ts(schema_name: str, tbl_name: str, field_array: list):
-    edit_ts = f"""import {{ Component, OnDestroy }} from '@angular/core';
+EDIT_TS_TEMPLATE = register('web/edit_ts', """import {{ Component, OnDestroy }} from '@angular/core';
 import {{ ActivatedRoute, Router }} from '@angular/router';
 import {{ filter, takeUntil }} from 'rxjs/operators';
 import {{ Subject }} from 'rxjs';
 import {{ FormBuilder, FormGroup, Validators }} from '@angular/forms';
 import {{ AlertService }} from '../../shared/alert/alert.service';
-import {{ {snake_to_camel(tbl_name)}Dto }} from '../../api';
-import {{ {snake_to_camel(tbl_name)}Service }} from '../{snake_to_dash(tbl_name)}.service';
+import {{ {class_name}Dto }} from '../../api';
+import {{ {class_name}Service }} from '../{dash_name}.service';
 
 @Component({{
-  selector: 'app-{snake_to_dash(tbl_name)}-edit',
-  templateUrl: './{snake_to_dash(tbl_name)}-edit.component.html',
-  styleUrls: ['./{snake_to_dash(tbl_name)}-edit.component.scss'],
+  selector: 'app-{dash_name}-edit',
+  templateUrl: './{dash_name}-edit.component.html',
+  styleUrls: ['./{dash_name}-edit.component.scss'],
 }})
-export class {snake_to_camel(tbl_name)}EditComponent implements OnDestroy {{
+export class {class_name}EditComponent implements OnDestroy {{
   form: FormGroup;
   
   private destroy$ = new Subject<void>();
   
-  item: {snake_to_camel(tbl_name)}Dto | undefined;
+  item: {class_name}Dto | undefined;
   
   constructor(
-    private {snake_to_camel(tbl_name, False)}Service: {snake_to_camel(tbl_name)}Service,
+    private {var_name}Service: {class_name}Service,
     private route: ActivatedRoute,
     private router: Router,
     private fb: FormBuilder,
     private alert: AlertService,
   ) {{
-    this.form = this.fb.group({{\n"""
-
-    for item in field_array:
-        edit_ts += f'      {item["field"]}: ['
-        if is_number(item):
-            edit_ts += "0"
-        elif is_boolean(item):
-            edit_ts += "true"
-        else:
-            edit_ts += '\'\''
-
-        if item["not_null"] is True:
-            edit_ts += ', Validators.required'
-
-        edit_ts += '],\n'
-
-    edit_ts += f"""    }});
+    this.form = this.fb.group({{\n{form_controls}    }});
     this.route.params
       .pipe(
         takeUntil(this.destroy$),
@@ -260,7 +291,7 @@ export class {snake_to_camel(tbl_name)}EditComponent implements OnDestroy {{
       )
       .subscribe((params) => {{
         if (params.id.toString() === '0') {{ return; }}
-        this.{snake_to_camel(tbl_name, False)}Service.view(params.id).subscribe({{
+        this.{var_name}Service.view(params.id).subscribe({{
           next: (item) => {{
             this.item = item;
             this.form.patchValue(item);
@@ -284,11 +315,11 @@ export class {snake_to_camel(tbl_name)}EditComponent implements OnDestroy {{
       return;
     }}
     
-    this.{snake_to_camel(tbl_name, False)}Service.save(this.form.value)
+    this.{var_name}Service.save(this.form.value)
       .pipe(takeUntil(this.destroy$))
       .subscribe({{
         next: () => {{
-          this.router.navigate(['/{snake_to_dash(tbl_name)}/list']).then();
+          this.router.navigate(['/{dash_name}/list']).then();
         }},
         error: (error) => {{
           this.alert.error(error.error.message);
@@ -297,78 +328,53 @@ export class {snake_to_camel(tbl_name)}EditComponent implements OnDestroy {{
   }}
   
   close() {{
-    this.router.navigate(['/{snake_to_dash(tbl_name)}/list']).then();
+    this.router.navigate(['/{dash_name}/list']).then();
   }}
-}}"""
-    file_path = os.path.join('dist', 'www', f'{snake_to_dash(tbl_name)}-edit', f'{snake_to_dash(tbl_name)}-edit.component.ts')
-    os.makedirs(os.path.join('dist', 'www', f'{snake_to_dash(tbl_name)}-edit'), exist_ok=True)
-    with open(file_path, 'w') as file:
-        file.write(edit_ts)
-
+}}""")
 
-def generate_edit_scss(tbl_name: str):
-    scss = """mat-form-field {
+EDIT_SCSS_TEMPLATE = register('web/edit_scss', """mat-form-field {{
   display: block;
-}
-mat-card-footer {
+}}
+mat-card-footer {{
   justify-content: flex-end;
-}"""
-    file_path = os.path.join('dist', 'www', f'{snake_to_dash(tbl_name)}-edit', f'{tbl_name.lower()}-edit.component.scss')
-    os.makedirs(os.path.join('dist', 'www', f'{snake_to_dash(tbl_name)}-edit'), exist_ok=True)
-    with open(file_path, 'w') as file:
-        file.write(scss)
-
+}}""")
 
-def generate_form_field(item: FieldDefinition) -> str:
-    if is_boolean(item):
-        return f"""<mat-form-field class="full-width-input">
-        <mat-slide-toggle formControlName="{item["field"]}">TODO: {item["description"]}</mat-slide-toggle>
+FORM_FIELD_BOOLEAN_TEMPLATE = register('web/form_field_boolean', """<mat-form-field class="full-width-input">
+        <mat-slide-toggle formControlName="{field}">TODO: {description}</mat-slide-toggle>
         <textarea matInput hidden></textarea>
         <mat-error></mat-error>
-      </mat-form-field>"""
-    if is_date(item):
-        return f""" <mat-form-field class="full-width-input">
-        <mat-label>TODO: {item["description"]}</mat-label>
-        <input matInput formControlName="{item["field"]}" [matDatepicker]="picker{snake_to_camel(item["field"])}" placeholder="{date_placeholder}"/>
-        <mat-datepicker-toggle matSuffix [for]="picker{snake_to_camel(item["field"])}"></mat-datepicker-toggle>
-        <mat-datepicker #picker{snake_to_camel(item["field"])}></mat-datepicker>
-        <mat-error></mat-error>
-      </mat-form-field>`;"""
-    return f""" <mat-form-field class="full-width-input">
-        <mat-label>TODO: {item["description"]}</mat-label>
-        <input matInput formControlName="{item["field"]}" />
+      </mat-form-field>""")
+
+FORM_FIELD_DATE_TEMPLATE = register('web/form_field_date', """ <mat-form-field class="full-width-input">
+        <mat-label>TODO: {description}</mat-label>
+        <input matInput formControlName="{field}" [matDatepicker]="picker{picker_name}" placeholder="{date_placeholder}"/>
+        <mat-datepicker-toggle matSuffix [for]="picker{picker_name}"></mat-datepicker-toggle>
+        <mat-datepicker #picker{picker_name}></mat-datepicker>
         <mat-error></mat-error>
-      </mat-form-field>"""
+      </mat-form-field>`;""")
 
+FORM_FIELD_TEMPLATE = register('web/form_field', """ <mat-form-field class="full-width-input">
+        <mat-label>TODO: {description}</mat-label>
+        <input matInput formControlName="{field}" />
+        <mat-error></mat-error>
+      </mat-form-field>""")
 
-def generate_edit_html(schema_name: str, tbl_name: str, field_array: list):
-    edit_html = f"""<mat-card>
+EDIT_HTML_TEMPLATE = register('web/edit_html', """<mat-card>
   <mat-card-header>
     <h2 *ngIf="item">Edit</h2>
     <h2 *ngIf="!item">Add</h2>
   </mat-card-header>
   <mat-card-content>
-    <form [formGroup]="form">\n"""
-
-    for item in field_array:
-        edit_html += generate_form_field(item)
-
-    edit_html += f"""
+    <form [formGroup]="form">\n{form_fields}
     </form>
   </mat-card-content>
   <mat-card-footer>
     <button mat-button (click)="close()"><mat-icon>close</mat-icon>Close</button>
     <button mat-button (click)="save()"><mat-icon>save</mat-icon>Save</button>
   </mat-card-footer>
-</mat-card>"""
-    file_path = os.path.join('dist', 'www', f'{snake_to_dash(tbl_name)}-edit', f'{snake_to_dash(tbl_name)}-edit.component.html')
-    os.makedirs(os.path.join('dist', 'www', f'{snake_to_dash(tbl_name)}-edit'), exist_ok=True)
-    with open(file_path, 'w') as file:
-        file.write(edit_html)
-
+</mat-card>""")
 
-def generate_list_ts(schema_name: str, tbl_name: str, field_array: list):
-    list_ts = f"""import {{
+LIST_TS_TEMPLATE = register('web/list_ts', """import {{
   AfterViewInit, Component, OnInit, ViewChild, OnDestroy
 }} from '@angular/core';
 import {{ MatSort, SortDirection }} from '@angular/material/sort';
@@ -380,33 +386,28 @@ import {{ debounceTime, distinctUntilChanged, tap, takeUntil }} from 'rxjs/opera
 import {{ FormBuilder, FormGroup }} from '@angular/forms';
 import {{ DeleteDialogComponent }} from '../../shared/delete-dialog/delete-dialog.component';
 import {{ AlertService }} from '../../shared/alert/alert.service';
-import {{ {snake_to_camel(tbl_name)}Service }} from '../{snake_to_dash(tbl_name)}.service';
-import {{ {snake_to_camel(tbl_name)}Dto, FilterItemDto }} from '../../api';
-import {{ {snake_to_camel(tbl_name)}Datasource }} from '../{snake_to_dash(tbl_name)}.datasource';
+import {{ {class_name}Service }} from '../{dash_name}.service';
+import {{ {class_name}Dto, FilterItemDto }} from '../../api';
+import {{ {class_name}Datasource }} from '../{dash_name}.datasource';
 /**
  * Server side pagination list based on
  * https://github.com/angular-university/angular-material-course/tree/2-data-table-finished
  * https://blog.angular-university.io/angular-material-data-table/
  */
 @Component({{
-  selector: 'app-{snake_to_dash(tbl_name)}-list',
-  templateUrl: './{snake_to_dash(tbl_name)}-list.component.html',
-  styleUrls: ['./{snake_to_dash(tbl_name)}-list.component.scss'],
+  selector: 'app-{dash_name}-list',
+  templateUrl: './{dash_name}-list.component.html',
+  styleUrls: ['./{dash_name}-list.component.scss'],
 }})
-export class {snake_to_camel(tbl_name)}ListComponent implements OnInit, AfterViewInit, OnDestroy {{
-  list: {snake_to_camel(tbl_name)}Dto[] = [];
+export class {class_name}ListComponent implements OnInit, AfterViewInit, OnDestroy {{
+  list: {class_name}Dto[] = [];
   
   private destroy$ = new Subject<void>();
   // TODO: Remove unnecessary columns, (leave actions)
-  displayedColumns = ["""
-
-    for item in field_array:
-        list_ts += f"""'{item["field"]}', """
-
-    list_ts += f"""'actions'];
+  displayedColumns = [{columns}'actions'];
     
   // @ts-ignore
-  public listTable: {snake_to_camel(tbl_name)}Datasource;
+  public listTable: {class_name}Datasource;
   
   @ViewChild(MatSort, {{ static: false }}) sort!: MatSort;
   
@@ -431,19 +432,19 @@ export class {snake_to_camel(tbl_name)}ListComponent implements OnInit, AfterVie
     }};
     
   constructor(
-    private {snake_to_camel(tbl_name, False)}Service: {snake_to_camel(tbl_name)}Service,
+    private {var_name}Service: {class_name}Service,
     private router: Router,
     public dialog: MatDialog,
     private alertService: AlertService,
     private fb: FormBuilder,
   ) {{
     this.searchForm = this.fb.group({{
-      in{capitalize(field_array[1]["field"])}: [this.{snake_to_camel(tbl_name, False)}Service.getFilterValue('{field_array[1]["field"]}')],
+      in{search_control}: [this.{var_name}Service.getFilterValue('{search_field}')],
     }});
   }}
   
   ngOnInit(): void {{
-    this.listTable = new {snake_to_camel(tbl_name)}Datasource(this.{snake_to_camel(tbl_name, False)}Service, this.alertService);
+    this.listTable = new {class_name}Datasource(this.{var_name}Service, this.alertService);
     this.listTable.cntSubject
       .pipe(takeUntil(this.destroy$))
       .subscribe({{
@@ -453,12 +454,12 @@ export class {snake_to_camel(tbl_name)}ListComponent implements OnInit, AfterVie
         }},
       }});
       
-    if (this.{snake_to_camel(tbl_name, False)}Service.savedFilter) {{
-      this.filter.pageIndex = this.{snake_to_camel(tbl_name, False)}Service.savedFilter.page_index;
-      this.filter.pageSize = this.{snake_to_camel(tbl_name, False)}Service.savedFilter.page_size;
-      this.filter.sortDirection = this.{snake_to_camel(tbl_name, False)}Service.savedFilter.sort_direction;
-      if (this.{snake_to_camel(tbl_name, False)}Service.savedFilter.sort) {{
-        this.filter.sortActive = this.{snake_to_camel(tbl_name, False)}Service.savedFilter.sort[0];
+    if (this.{var_name}Service.savedFilter) {{
+      this.filter.pageIndex = this.{var_name}Service.savedFilter.page_index;
+      this.filter.pageSize = this.{var_name}Service.savedFilter.page_size;
+      this.filter.sortDirection = this.{var_name}Service.savedFilter.sort_direction;
+      if (this.{var_name}Service.savedFilter.sort) {{
+        this.filter.sortActive = this.{var_name}Service.savedFilter.sort[0];
       }}
     }}
     this.listTable.load();
@@ -485,7 +486,7 @@ export class {snake_to_camel(tbl_name)}ListComponent implements OnInit, AfterVie
       arrEvents.push(control.valueChanges);
     }});
     
-    // fromEvent(this.search{capitalize(field_array[1]["field"])}Input.nativeElement, 'keyup'),
+    // fromEvent(this.search{search_control}Input.nativeElement, 'keyup'),
     merge(
       ...arrEvents,
     ).pipe(
@@ -543,11 +544,11 @@ export class {snake_to_camel(tbl_name)}ListComponent implements OnInit, AfterVie
     this.router.navigate([`{tbl_name}/edit/${{id}}`]).then();
   }}
   
-  deleteDlg(row: {snake_to_camel(tbl_name)}Dto) {{
-    const dlg = this.dialog.open(DeleteDialogComponent, {{ data: {{ title: `${{row.{field_array[1]["field"]} }}` }} }});
+  deleteDlg(row: {class_name}Dto) {{
+    const dlg = this.dialog.open(DeleteDialogComponent, {{ data: {{ title: `${{row.{search_field} }}` }} }});
     dlg.afterClosed().pipe(takeUntil(this.destroy$)).subscribe((result) => {{
       if (!result) {{ return; }}
-      this.{snake_to_camel(tbl_name, False)}Service.delete(parseInt(row.{field_array[0]["field"]})).subscribe({{
+      this.{var_name}Service.delete(parseInt(row.{pk})).subscribe({{
         next: () => {{
           this.alertService.success('Item deleted');
           this.load();
@@ -558,61 +559,49 @@ export class {snake_to_camel(tbl_name)}ListComponent implements OnInit, AfterVie
       }});
     }});
   }}
-}}"""
-    file_path = os.path.join('dist', 'www', f'{snake_to_dash(tbl_name)}-list', f'{snake_to_dash(tbl_name)}-list.component.ts')
-    os.makedirs(os.path.join('dist', 'www', f'{snake_to_dash(tbl_name)}-list'), exist_ok=True)
-    with open(file_path, 'w') as file:
-        file.write(list_ts)
-
+}}""")
 
-def generate_list_scss(tbl_name: str):
-    list_scss = """table {
+LIST_SCSS_TEMPLATE = register('web/list_scss', """table {{
   width: 100%;
-}
+}}
 
-.mat-row .mat-cell {
+.mat-row .mat-cell {{
   border-bottom: 1px solid transparent;
   border-top: 1px solid transparent;
-}
+}}
 
-.mat-row:hover .mat-cell {
+.mat-row:hover .mat-cell {{
   border-color: currentColor;
-}
+}}
 
-.column-desc {
+.column-desc {{
   cursor: pointer;
-}
+}}
 
-.column-dt {
+.column-dt {{
   cursor: pointer;
-}
+}}
 
-.column-actions {
+.column-actions {{
   width: 120px;
-}
+}}
 
-.spinner-container {
+.spinner-container {{
   height: 360px;
   width: 390px;
   position: fixed;
-}
+}}
 
-.spinner-container mat-spinner {
+.spinner-container mat-spinner {{
   margin: 130px auto 0 auto;
-}
+}}
 
-.header-item {
+.header-item {{
   margin-left: 5px;
   margin-right: 5px;
-}"""
-    file_path = os.path.join('dist', 'www', f'{snake_to_dash(tbl_name)}-list', f'{snake_to_dash(tbl_name)}-list.component.scss')
-    os.makedirs(os.path.join('dist', 'www', f'{snake_to_dash(tbl_name)}-list'), exist_ok=True)
-    with open(file_path, 'w') as file:
-        file.write(list_scss)
-
+}}""")
 
-def generate_list_html(schema_name: str, tbl_name: str, field_array: list):
-    list_html = f"""<mat-card class="mat-elevation-z4">
+LIST_HTML_TEMPLATE = register('web/list_html', """<mat-card class="mat-elevation-z4">
   <mat-card-content>
     <form [formGroup]="searchForm">
       <div class="flex-container">
@@ -625,8 +614,8 @@ def generate_list_html(schema_name: str, tbl_name: str, field_array: list):
           Add
         </button>
         <mat-form-field class="header-item">
-          <mat-label>Search {field_array[1]["field"]}</mat-label>
-          <input matInput placeholder="Search field" formControlName="in{capitalize(field_array[1]["field"])}">
+          <mat-label>Search {search_field}</mat-label>
+          <input matInput placeholder="Search field" formControlName="in{search_control}">
         </mat-form-field>
       </div>
     </div>
@@ -640,26 +629,10 @@ def generate_list_html(schema_name: str, tbl_name: str, field_array: list):
       <mat-spinner></mat-spinner>
     </div>
     
-    <table mat-table matSort [dataSource]="listTable">\n\n"""
-
-    for item in field_array:
-        list_html += f"""      <ng-container matColumnDef="{item["field"]}">
-        <th mat-header-cell mat-sort-header *matHeaderCellDef>
-          TODO: {item["field"]}
-        </th>
-        <td
-          (click)="edit(item.{field_array[0]["field"]})" 
-          mat-cell 
-          *matCellDef="let item" class="column-dt">
-          {{item.{item["field"]}}}
-        </td>
-      </ng-container>"""
-        list_html += "\n\n"
-
-    list_html += f"""`      <ng-container matColumnDef="actions" stickyEnd>
+    <table mat-table matSort [dataSource]="listTable">\n\n{columns}`      <ng-container matColumnDef="actions" stickyEnd>
         <th mat-header-cell *matHeaderCellDef></th>
         <td mat-cell *matCellDef="let item" class="column-actions">
-          <button mat-icon-button (click)="edit(item.{field_array[0]["field"]})"><mat-icon>edit</mat-icon></button>
+          <button mat-icon-button (click)="edit(item.{pk})"><mat-icon>edit</mat-icon></button>
           <button mat-icon-button (click)="deleteDlg(item)"><mat-icon>delete</mat-icon></button>
         </td>
       </ng-container>
@@ -678,13 +651,171 @@ def generate_list_html(schema_name: str, tbl_name: str, field_array: list):
       aria-label="Choose page">
     </mat-paginator>
   </mat-card-content>
-</mat-card>"""
-    file_path = os.path.join('dist', 'www', f'{snake_to_dash(tbl_name)}-list', f'{snake_to_dash(tbl_name)}-list.component.html')
-    os.makedirs(os.path.join('dist', 'www', f'{snake_to_dash(tbl_name)}-list'), exist_ok=True)
-    with open(file_path, 'w') as file:
-        file.write(list_html)
+</mat-card>""")
+
+LIST_COLUMN_TEMPLATE = register('web/list_column', """      <ng-container matColumnDef="{field}">
+        <th mat-header-cell mat-sort-header *matHeaderCellDef>
+          TODO: {field}
+        </th>
+        <td
+          (click)="edit(item.{pk})" 
+          mat-cell 
+          *matCellDef="let item" class="column-dt">
+          {{item.{field}}}
+        </td>
+      </ng-container>""")
+
+
+# Template fields common for table files
+def table_context(schema_name: str, tbl_name: str, field_array: list = None) -> dict:
+    context = {
+        'schema_name': schema_name,
+        'tbl_name': tbl_name,
+        'class_name': snake_to_camel(tbl_name),
+        'var_name': snake_to_camel(tbl_name, False),
+        'dash_name': snake_to_dash(tbl_name),
+    }
+    if field_array:
+        # Second element is searchable on list
+        context['pk'] = field_array[0]["field"]
+        context['search_field'] = field_array[1]["field"]
+        context['search_control'] = capitalize(field_array[1]["field"])
+    return context
+
+
+# Module
+@timed
+def generate_module(schema_name: str, tbl_name: str):
+    module_ts = render(MODULE_TEMPLATE, **table_context(schema_name, tbl_name))
+    file_path = os.path.join('www', f'{snake_to_dash(tbl_name)}.module.ts')
+    write_file(file_path, module_ts)
+
+
+# Files common for all modules, in batch mode generated once
+@timed
+def generate_angular_shared():
+    if get_options().etag:
+        file_path = os.path.join('www', 'shared', 'etag-cache.ts')
+        write_file(file_path, render(ETAG_CACHE_TEMPLATE))
+
+
+# Routing module
+@timed
+def generate_routing(schema_name: str, tbl_name: str):
+    module_ts = render(ROUTING_TEMPLATE, **table_context(schema_name, tbl_name))
+    file_path = os.path.join('www', f'{snake_to_dash(tbl_name)}-routing.module.ts')
+    write_file(file_path, module_ts)
+
+
+# Service
+@timed
+def generate_service(schema_name: str, tbl_name: str):
+    context = table_context(schema_name, tbl_name)
+    if get_options().etag:
+        etag_import = render(SERVICE_ETAG_IMPORT_TEMPLATE)
+        etag_field = render(SERVICE_ETAG_FIELD_TEMPLATE)
+        list_call = f"this.etagCache.request('POST', `${{environment.apiUrl}}/{tbl_name}/list`, body)"
+        view_call = f"this.etagCache.request('GET', `${{environment.apiUrl}}/{tbl_name}/${{id}}`)"
+    else:
+        etag_import = ''
+        etag_field = ''
+        list_call = f'this.api{context["class_name"]}Service.{context["var_name"]}ControllerList(body)'
+        view_call = f'this.api{context["class_name"]}Service.{context["var_name"]}ControllerGet(id)'
+    service_ts = render(SERVICE_TEMPLATE, etag_import=etag_import, etag_field=etag_field, list_call=list_call,
+                        view_call=view_call, **context)
+    file_path = os.path.join('www', f'{snake_to_dash(tbl_name)}.service.ts')
+    write_file(file_path, service_ts)
+
+
+# Datasource for list
+@timed
+def generate_data_source(schema_name: str, tbl_name: str):
+    context = table_context(schema_name, tbl_name)
+    cursor = dict(cursor_field='', cursor_request='', cursor_response='')
+    if get_options().pagination == 'keyset':
+        cursor = dict(cursor_field=render(DATA_SOURCE_CURSOR_FIELD_TEMPLATE),
+                      cursor_request=render(DATA_SOURCE_CURSOR_REQUEST_TEMPLATE, **context),
+                      cursor_response=render(DATA_SOURCE_CURSOR_RESPONSE_TEMPLATE))
+    ds_ts = render(DATA_SOURCE_TEMPLATE, **cursor, **context)
+    file_path = os.path.join('www', f'{snake_to_dash(tbl_name)}.datasource.ts')
+    write_file(file_path, ds_ts)
+
+
+@timed
+def generate_form_control(item: FieldDefinition) -> str:
+    value = "''"
+    if is_number(item):
+        value = "0"
+    elif is_boolean(item):
+        value = "true"
+
+    if item["not_null"] is True:
+        value += ', Validators.required'
+
+    return f'      {item["field"]}: [{value}],\n'
+
+
+@timed
+def generate_edit_ts(schema_name: str, tbl_name: str, field_array: list):
+    edit_ts = render(EDIT_TS_TEMPLATE, form_controls=''.join(generate_form_control(item) for item in field_array),
+                     **table_context(schema_name, tbl_name))
+    file_path = os.path.join('www', f'{snake_to_dash(tbl_name)}-edit', f'{snake_to_dash(tbl_name)}-edit.component.ts')
+    write_file(file_path, edit_ts)
+
+
+@timed
+def generate_edit_scss(tbl_name: str):
+    scss = render(EDIT_SCSS_TEMPLATE)
+    file_path = os.path.join('www', f'{snake_to_dash(tbl_name)}-edit', f'{tbl_name.lower()}-edit.component.scss')
+    write_file(file_path, scss)
+
+
+@timed
+def generate_form_field(item: FieldDefinition) -> str:
+    context = {
+        'field': item["field"],
+        'description': item["description"],
+    }
+    if is_boolean(item):
+        return render(FORM_FIELD_BOOLEAN_TEMPLATE, **context)
+    if is_date(item):
+        return render(FORM_FIELD_DATE_TEMPLATE, picker_name=snake_to_camel(item["field"]),
+                      date_placeholder=date_placeholder, **context)
+    return render(FORM_FIELD_TEMPLATE, **context)
+
+
+@timed
+def generate_edit_html(schema_name: str, tbl_name: str, field_array: list):
+    edit_html = render(EDIT_HTML_TEMPLATE, form_fields=''.join(generate_form_field(item) for item in field_array))
+    file_path = os.path.join('www', f'{snake_to_dash(tbl_name)}-edit', f'{snake_to_dash(tbl_name)}-edit.component.html')
+    write_file(file_path, edit_html)
+
+
+@timed
+def generate_list_ts(schema_name: str, tbl_name: str, field_array: list):
+    list_ts = render(LIST_TS_TEMPLATE, columns=''.join(f"""'{item["field"]}', """ for item in field_array),
+                     **table_context(schema_name, tbl_name, field_array))
+    file_path = os.path.join('www', f'{snake_to_dash(tbl_name)}-list', f'{snake_to_dash(tbl_name)}-list.component.ts')
+    write_file(file_path, list_ts)
+
+
+@timed
+def generate_list_scss(tbl_name: str):
+    list_scss = render(LIST_SCSS_TEMPLATE)
+    file_path = os.path.join('www', f'{snake_to_dash(tbl_name)}-list', f'{snake_to_dash(tbl_name)}-list.component.scss')
+    write_file(file_path, list_scss)
+
+
+@timed
+def generate_list_html(schema_name: str, tbl_name: str, field_array: list):
+    columns = ''.join(render(LIST_COLUMN_TEMPLATE, field=item["field"], pk=field_array[0]["field"]) + "\n\n"
+                      for item in field_array)
+    list_html = render(LIST_HTML_TEMPLATE, columns=columns, **table_context(schema_name, tbl_name, field_array))
+    file_path = os.path.join('www', f'{snake_to_dash(tbl_name)}-list', f'{snake_to_dash(tbl_name)}-list.component.html')
+    write_file(file_path, list_html)
 
 
+@timed
 def generate_angular_module(schema_name: str, tbl_name: str, field_array: list):
     generate_module(schema_name, tbl_name)
 
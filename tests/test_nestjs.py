@@ -0,0 +1,38 @@
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sql_convert.generator import render
+from sql_convert.options import GeneratorOptions, set_options
+from sql_convert.parser import parse_ddl
+
+DDL = """CREATE TABLE auth.user (
+    id serial NOT NULL,
+    login varchar(50) NOT NULL,
+    notes varchar(200),
+    active boolean DEFAULT true
+);"""
+
+# Function called by service query, for example SELECT auth.user_get($1) or SELECT * FROM auth.user_export($1)
+QUERY_FUNCTION = re.compile(r"'SELECT (?:\* FROM )?([\w.]+)\(")
+
+
+# Files of test table rendered for target with options, file name -> source
+def render_target(target: str, **options) -> dict:
+    set_options(GeneratorOptions(**options))
+    try:
+        return render(parse_ddl(DDL)[0], target)
+    finally:
+        set_options(GeneratorOptions())
+
+
+def test_service_calls_generated_functions():
+    options = dict(bulk=True, loader=True, export=True)
+    service = render_target('rest', **options)['api/user/user.service.ts']
+    sql_files = render_target('sql', **options)
+    functions = QUERY_FUNCTION.findall(service)
+    assert 'auth.user_search' in functions
+    for function in functions:
+        assert f'sql/fnc_{function}.sql' in sql_files
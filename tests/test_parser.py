@@ -0,0 +1,59 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sql_convert.parser import parse_ddl
+
+
+# Field definitions of parsed tables by schema.table name
+def parse_fields(sql: str) -> dict:
+    return dict((f'{table.schema_name}.{table.tbl_name}', table.field_array) for table in parse_ddl(sql))
+
+
+def test_tables_on_one_line():
+    fields = parse_fields('CREATE TABLE a.b (id int); CREATE TABLE a.c (id int, name varchar);')
+    assert list(fields) == ['a.b', 'a.c']
+    assert [field['field'] for field in fields['a.c']] == ['id', 'name']
+
+
+def test_statements_after_table_body_are_read():
+    fields = parse_fields("""CREATE TABLE a.b (
+    id int,
+    name varchar DEFAULT 'x;y'
+) WITH (fillfactor=70); COMMENT ON COLUMN a.b.name IS 'Name; text';""")
+    assert [field['field'] for field in fields['a.b']] == ['id', 'name']
+    assert fields['a.b'][1]['description'] == 'Name; text'
+
+
+def test_comment_with_escaped_quote():
+    fields = parse_fields("""CREATE TABLE auth.user (id serial, login varchar(50));
+COMMENT ON COLUMN auth.user.login IS 'User''s login @index=prefix';""")
+    login = fields['auth.user'][1]
+    assert login['description'] == "User's login"
+    assert login['index'] == ['prefix']
+
+
+def test_comment_is_case_insensitive_and_line_comment_is_stripped():
+    fields = parse_fields("""CREATE TABLE Auth.User (
+    id serial NOT NULL, -- key, (not a column)
+    Login varchar(50)
+);
+comment on column AUTH.USER.LOGIN is 'Login -- name';""")
+    assert [field['field'] for field in fields['Auth.User']] == ['id', 'Login']
+    assert fields['Auth.User'][0]['not_null']
+    assert fields['Auth.User'][1]['description'] == 'Login -- name'
+
+
+def test_unfinished_comment_is_skipped():
+    fields = parse_fields("""CREATE TABLE a.b (id int);
+COMMENT ON COLUMN id IS 'Without table';
+COMMENT ON COLUMN a.b.id IS""")
+    assert fields['a.b'][0]['description'] == 'id'
+
+
+def test_sequence_after_table_on_one_line():
+    tables = parse_ddl("CREATE TABLE x AS SELECT 1; CREATE TABLE a.e (id int); "
+                       "ALTER TABLE ONLY a.e ALTER COLUMN id SET DEFAULT nextval('a.e_seq'::regclass);")
+    assert [table.tbl_name for table in tables] == ['e']
+    assert tables[0].sequence_name == 'a.e_seq'
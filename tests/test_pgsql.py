@@ -0,0 +1,58 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sql_convert.generator import render
+from sql_convert.options import GeneratorOptions, set_options
+from sql_convert.parser import parse_ddl
+
+DDL = """CREATE TABLE auth.user (
+    id serial NOT NULL,
+    login varchar(50) NOT NULL,
+    notes varchar(200),
+    active boolean DEFAULT true
+);"""
+
+
+# Functions of test table rendered with options, file name -> source
+def render_sql(**options) -> dict:
+    set_options(GeneratorOptions(**options))
+    try:
+        return render(parse_ddl(DDL)[0], 'sql')
+    finally:
+        set_options(GeneratorOptions())
+
+
+@pytest.mark.parametrize('pagination, search', [('offset', 'dynamic'), ('keyset', 'dynamic'), ('offset', 'static')])
+def test_search_estimated_count_is_volatile(pagination, search):
+    sql = render_sql(count='estimated', pagination=pagination, search=search)['sql/fnc_auth.user_search.sql']
+    assert 'EXPLAIN' in sql
+    assert 'LANGUAGE plpgsql VOLATILE' in sql
+    assert 'STABLE' not in sql
+
+
+@pytest.mark.parametrize('count', ['exact', 'capped'])
+def test_search_without_explain_is_stable(count):
+    sql = render_sql(count=count)['sql/fnc_auth.user_search.sql']
+    assert 'EXPLAIN' not in sql
+    assert 'LANGUAGE plpgsql STABLE' in sql
+
+
+def test_table_count_strategy_sets_volatility():
+    sql = render_sql(table_count=(('auth.user', 'estimated'),))['sql/fnc_auth.user_search.sql']
+    assert 'LANGUAGE plpgsql VOLATILE' in sql
+
+
+def test_save_many_error_has_row_index():
+    sql = render_sql(bulk=True)['sql/fnc_auth.user_save_many.sql']
+    batch, check = sql.split('EXCEPTION WHEN OTHERS THEN', 1)
+    # Rows are saved one by one after the batch error, the check block is always rolled back
+    assert 'FOR r IN SELECT s.*, s.ordinality - 1 AS f_index' in check
+    assert 'WHERE t.id = r.id;' in check
+    assert "RAISE EXCEPTION 'save_many check';" in check
+    assert check.index('f_index := NULL;') < check.index('RAISE EXCEPTION')
+    assert "RETURN jsonb_build_object('error', f_error, 'index', f_index, 'code', 400);" in check
+    assert "'code', 404" in batch